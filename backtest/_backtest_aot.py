@@ -0,0 +1,38 @@
+"""AOT-сборка численного ядра бэктеста (numba.pycc).
+
+Собирает расширение backtest/backtest_core.*.so с функциями
+``run_core`` (float64-матрицы) и ``run_core_f4`` (BACKTEST_FLOAT32),
+чтобы не платить за JIT-компиляцию при каждом запуске процесса
+(особенно заметно в режиме CROSS_SYMBOL_RISK = False).
+
+Запуск (нужна установленная numba):
+    python backtest/_backtest_aot.py
+
+Если расширение не собрано, backtester_full использует обычный @njit.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from numba.pycc import CC  # noqa: E402
+
+from backtest.backtester_full import _run_core  # noqa: E402
+
+# Аргументы как у _run_core: close, atr, signals, lengths, warmup, balance, fee_rate,
+# risk_per_trade, leverage, max_positions, eff_max_positions, atr_sl_mult,
+# atr_tp_mult_1, atr_ts_mult, mtf_max_bars, min_notional, qty_step, out_equity
+_SIG = "f8({p}[:,:],{p}[:,:],i1[:,:],i8[:],i8,f8,f8,f8,f8,i8,i8,f8,f8,f8,i8,f8,f8,f8[:])"
+
+cc = CC("backtest_core")
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+cc.export("run_core", _SIG.format(p="f8"))(_run_core.py_func)
+cc.export("run_core_f4", _SIG.format(p="f4"))(_run_core.py_func)
+
+
+if __name__ == "__main__":
+    cc.compile()
+    print("[AOT] backtest_core built in", cc.output_dir)
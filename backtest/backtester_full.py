@@ -1,12 +1,318 @@
 import numpy as np
 import pandas as pd
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 import config as cfg
-from indicators import compute_indicators
-from strategy import signal_from_indicators
+from indicators import compute_indicators_batch
+from numba_compat import njit, prange
+from strategy import signal_series_from_bars
+from strategies.base import BarWindow
 from risk import RiskManager
-from position import PositionState as Position
+
+
+# ======================================================================
+# Численное ядро бэктеста (numba, если установлена)
+# ======================================================================
+# Открытые позиции хранятся параллельными массивами длины n_symbols:
+#   pos_side  int8     +1 = long, -1 = short, 0 = нет позиции
+#   pos_entry float64  цена входа
+#   pos_qty   float64  текущее количество
+#   pos_sl    float64  стоп-лосс (NaN = не задан)
+#   pos_tp1   float64  первая цель (NaN = уже исполнена)
+#   pos_ts    float64  трейлинг-стоп (NaN = ещё не включён)
+#   pos_open  float64  индекс бара открытия (для тайм-стопа)
+
+
+@njit(cache=True)
+def _close_pnl(side, entry, qty, price, fee_rate):
+    """PnL закрытия qty по цене price за вычетом комиссии (0.0, если qty <= 0).
+
+    side — знак позиции (+1 long, -1 short), PnL считается без ветвления.
+    """
+    if qty <= 0:
+        return 0.0
+
+    pnl = side * (price - entry) * qty
+
+    notional_entry = entry * qty
+    notional_exit = price * qty
+    fee = (notional_entry + notional_exit) * fee_rate
+    return pnl - fee
+
+
+@njit(cache=True)
+def _manage_position(
+    s, i, price, a, signal, atr_ts_mult, mtf_max_bars, fee_rate,
+    pos_side, pos_entry, pos_qty, pos_sl, pos_tp1, pos_ts, pos_open,
+    delta_tp, delta_close,
+):
+    """SL / TP1 / трейлинг / тайм-стоп / реверс для позиции символа s на баре i.
+
+    Баланс здесь не меняется: PnL частичного выхода пишется в delta_tp[s],
+    полного закрытия — в delta_close[s]. Символы друг от друга не зависят,
+    поэтому функцию можно вызывать из prange.
+    """
+    side = pos_side[s]
+
+    # 1) Жёсткий SL
+    sl = pos_sl[s]
+    if not np.isnan(sl):
+        if side * (price - sl) <= 0:
+            delta_close[s] = _close_pnl(side, pos_entry[s], pos_qty[s], price, fee_rate)
+            pos_side[s] = 0
+            return
+
+    # 2) Первая цель по прибыли (частичный выход 0.5 + безубыток + включение трейлинга)
+    tp1 = pos_tp1[s]
+    if not np.isnan(tp1):
+        if side * (price - tp1) >= 0:
+            if pos_qty[s] > 0:
+                qty_close = pos_qty[s] * 0.5
+                delta_tp[s] = _close_pnl(side, pos_entry[s], qty_close, price, fee_rate)
+                pos_qty[s] -= qty_close
+                if pos_qty[s] < 0:
+                    pos_qty[s] = 0.0
+            pos_sl[s] = pos_entry[s]
+            new_ts = price - side * atr_ts_mult * a
+            if np.isnan(pos_ts[s]) or side * (new_ts - pos_ts[s]) > 0:
+                pos_ts[s] = new_ts
+            pos_tp1[s] = np.nan
+
+    # 3) Трейлинг: стоп двигается только в сторону прибыли
+    if not np.isnan(pos_ts[s]):
+        new_ts = price - side * atr_ts_mult * a
+        if side * (new_ts - pos_ts[s]) > 0:
+            pos_ts[s] = new_ts
+        if side * (price - pos_ts[s]) <= 0:
+            delta_close[s] = _close_pnl(side, pos_entry[s], pos_qty[s], price, fee_rate)
+            pos_side[s] = 0
+            return
+
+    # 3.5) Тайм-стоп: возраст позиции в барах LTF
+    if mtf_max_bars > 0:
+        if int(i - pos_open[s]) >= mtf_max_bars:
+            delta_close[s] = _close_pnl(side, pos_entry[s], pos_qty[s], price, fee_rate)
+            pos_side[s] = 0
+            return
+
+    # 4) Обратный сигнал стратегии полностью закрывает позицию
+    if signal == -side:
+        delta_close[s] = _close_pnl(side, pos_entry[s], pos_qty[s], price, fee_rate)
+        pos_side[s] = 0
+
+
+@njit(cache=True)
+def _mark_to_market(balance, close_row, i, lengths, pos_side, pos_entry, pos_qty, active_idx, n_active):
+    """Equity = баланс + плавающий PnL открытых позиций по ценам бара i.
+
+    Обходит только активные символы active_idx[:n_active] (по возрастанию индекса),
+    PnL считается без ветвления по стороне. Пропускаются символы, чья история
+    уже закончилась (close = NaN).
+    """
+    equity = balance
+    for k in range(n_active):
+        s = active_idx[k]
+        if i < lengths[s]:
+            equity += pos_side[s] * (close_row[s] - pos_entry[s]) * pos_qty[s]
+    return equity
+
+
+@njit(cache=True)
+def _calc_size_from_risk(equity, price, stop_distance_pct, risk_per_trade, leverage, min_notional, qty_step):
+    """Повторяет RiskManager.calc_futures_size_from_risk + calc_size на скалярах.
+
+    Возвращает (notional, qty); (0.0, 0.0), если размер слишком мал.
+    """
+    if equity <= 0 or price <= 0 or stop_distance_pct <= 0 or risk_per_trade <= 0 or leverage <= 0:
+        return 0.0, 0.0
+
+    risk_amount = equity * risk_per_trade
+    notional_by_risk = risk_amount * 100.0 / stop_distance_pct
+    max_notional_by_lev = equity * leverage
+    notional = min(notional_by_risk, max_notional_by_lev)
+    if notional <= 0:
+        return 0.0, 0.0
+
+    notional = max(notional, min_notional)
+    qty = notional / price
+    if qty_step > 0:
+        qty = np.floor(qty / qty_step) * qty_step
+    if qty <= 0:
+        return 0.0, 0.0
+
+    notional = qty * price
+    if notional < min_notional:
+        return 0.0, 0.0
+    return notional, qty
+
+
+def _run_core_impl(
+    close,
+    atr,
+    signals,
+    lengths,
+    warmup,
+    balance,
+    fee_rate,
+    risk_per_trade,
+    leverage,
+    max_positions,
+    eff_max_positions,
+    atr_sl_mult,
+    atr_tp_mult_1,
+    atr_ts_mult,
+    mtf_max_bars,
+    min_notional,
+    qty_step,
+    out_equity,
+):
+    """Побарный цикл SL/TP1/трейлинг/тайм-стоп/реверс по всем символам.
+
+    Выходы по открытым позициям независимы по символам и идут через prange;
+    открытие новых позиций остаётся последовательным из-за лимита max_positions.
+
+    close, atr: (max_len, n_symbols) float64; signals: (max_len, n_symbols) int8
+    (+1 buy, -1 sell, 0 нет сигнала); lengths: длина истории каждого символа.
+    Equity по барам пишется в out_equity[i - warmup]. Возвращает итоговый
+    баланс после закрытия всех позиций по последней цене.
+    """
+    max_len = close.shape[0]
+    n_sym = close.shape[1]
+
+    pos_side = np.zeros(n_sym, dtype=np.int8)
+    pos_entry = np.zeros(n_sym, dtype=np.float64)
+    pos_qty = np.zeros(n_sym, dtype=np.float64)
+    pos_sl = np.full(n_sym, np.nan)
+    pos_tp1 = np.full(n_sym, np.nan)
+    pos_ts = np.full(n_sym, np.nan)
+    pos_open = np.zeros(n_sym, dtype=np.float64)
+    delta_tp = np.zeros(n_sym, dtype=np.float64)
+    delta_close = np.zeros(n_sym, dtype=np.float64)
+    # Индексы символов с открытой позицией (по возрастанию): циклы по позициям
+    # стоят O(открытых позиций), а не O(всех символов)
+    active_idx = np.empty(n_sym, dtype=np.int64)
+    n_active = 0
+
+    for i in range(warmup, max_len):
+        # считаем equity: баланс + плавающий PnL по открытым позициям
+        equity = _mark_to_market(balance, close[i], i, lengths, pos_side, pos_entry, pos_qty, active_idx, n_active)
+        out_equity[i - warmup] = equity
+
+        # --- управление открытыми позициями (символы независимы -> prange) ---
+        for k in prange(n_active):
+            s = active_idx[k]
+            delta_tp[s] = 0.0
+            delta_close[s] = 0.0
+            if i >= lengths[s]:
+                continue
+            a = atr[i, s]
+            if a <= 0:
+                continue
+            _manage_position(
+                s, i, close[i, s], a, signals[i, s], atr_ts_mult, mtf_max_bars, fee_rate,
+                pos_side, pos_entry, pos_qty, pos_sl, pos_tp1, pos_ts, pos_open,
+                delta_tp, delta_close,
+            )
+
+        # PnL закрытий применяем последовательно в порядке символов:
+        # тот же порядок сложений, что и без распараллеливания.
+        # Заодно убираем закрытые позиции из active_idx (порядок сохраняется).
+        n_keep = 0
+        for k in range(n_active):
+            s = active_idx[k]
+            balance = balance + delta_tp[s] + delta_close[s]
+            if pos_side[s] != 0:
+                active_idx[n_keep] = s
+                n_keep += 1
+        n_active = n_keep
+
+        # пересчитываем equity после возможных закрытий
+        equity = _mark_to_market(balance, close[i], i, lengths, pos_side, pos_entry, pos_qty, active_idx, n_active)
+
+        # --- ограничение по количеству одновременных позиций ---
+        open_count = n_active
+        can_open_more = open_count < eff_max_positions
+        opened = False
+
+        # --- открытие новых позиций по сигналам ---
+        for s in range(n_sym):
+            if not can_open_more:
+                break
+            if pos_side[s] != 0 or i >= lengths[s]:
+                continue
+            price = close[i, s]
+            a = atr[i, s]
+            if a <= 0:
+                continue
+
+            sig = signals[i, s]
+            if sig == 0:
+                continue
+
+            # расстояние до стопа в процентах
+            stop_distance_pct = atr_sl_mult * a / price * 100.0
+            if stop_distance_pct <= 0:
+                continue
+
+            notional, qty = _calc_size_from_risk(
+                equity, price, stop_distance_pct, risk_per_trade, leverage, min_notional, qty_step
+            )
+            if notional <= 0 or qty <= 0:
+                continue
+
+            pos_side[s] = sig
+            pos_sl[s] = price - sig * atr_sl_mult * a
+            pos_tp1[s] = price + sig * atr_tp_mult_1 * a
+            pos_entry[s] = price
+            pos_qty[s] = qty
+            pos_ts[s] = np.nan
+            pos_open[s] = i
+            opened = True
+            open_count += 1
+            can_open_more = open_count < max_positions
+
+        # новые позиции могли встать в середину списка — пересобираем его по порядку
+        if opened:
+            n_active = 0
+            for s in range(n_sym):
+                if pos_side[s] != 0:
+                    active_idx[n_active] = s
+                    n_active += 1
+
+    # Закрываем всё по последней цене
+    for k in range(n_active):
+        s = active_idx[k]
+        price = close[lengths[s] - 1, s]
+        balance += _close_pnl(pos_side[s], pos_entry[s], pos_qty[s], price, fee_rate)
+        pos_side[s] = 0
+
+    return balance
+
+
+# Последовательная и многопоточная (BACKTEST_PARALLEL) версии одного и того же ядра.
+# Без parallel=True prange работает как обычный range.
+_run_core = njit(cache=True)(_run_core_impl)
+_run_core_parallel = njit(parallel=True, cache=True)(_run_core_impl)
+
+
+# AOT-сборка ядра (python backtest/_backtest_aot.py) убирает JIT-прогрев;
+# если расширение не собрано — используем _run_core (@njit или чистый Python).
+try:
+    from backtest.backtest_core import run_core as _run_core_aot, run_core_f4 as _run_core_aot_f4
+except ImportError:  # pragma: no cover - расширение собирается опционально
+    _run_core_aot = None
+    _run_core_aot_f4 = None
+
+
+def _select_core(dtype, parallel: bool = False):
+    """Выбрать реализацию ядра под dtype ценовых матриц и режим распараллеливания."""
+    if parallel:
+        return _run_core_parallel
+    if dtype == np.float32 and _run_core_aot_f4 is not None:
+        return _run_core_aot_f4
+    if dtype == np.float64 and _run_core_aot is not None:
+        return _run_core_aot
+    return _run_core
 
 
 class Backtester:
@@ -22,18 +328,49 @@ class Backtester:
       - ATR_TP_MULT_1
       - ATR_TS_MULT
     * возможен частичный выход по TP1 (0.5 позиции)
+
+    Побарная логика выполняется в ``_run_core`` (numba @njit, если доступна).
     """
 
-    def __init__(self, data: Dict[str, pd.DataFrame]):
-        """data[symbol] = DataFrame: open, high, low, close, volume"""
+    def __init__(self, data: Dict[str, pd.DataFrame], initial_balance: Optional[float] = None):
+        """data[symbol] = DataFrame: open, high, low, close, volume
+
+        initial_balance по умолчанию берётся из cfg.INITIAL_BALANCE_USDT.
+        """
         self.raw_data = data
         self.risk = RiskManager()
-        self.initial_balance = float(getattr(cfg, "INITIAL_BALANCE_USDT", 5000.0))
+        if initial_balance is None:
+            initial_balance = getattr(cfg, "INITIAL_BALANCE_USDT", 5000.0)
+        self.initial_balance = float(initial_balance)
         self.fee_rate = float(getattr(cfg, "FUTURES_FEE_RATE", 0.0004))
+        # Цены и индикаторы в float32 (balance/equity всё равно считаются в float64)
+        self.price_dtype = np.float32 if getattr(cfg, "BACKTEST_FLOAT32", False) else np.float64
+        # Управление позициями по символам внутри бара — в потоках numba (prange)
+        self.parallel = bool(getattr(cfg, "BACKTEST_PARALLEL", False))
+
+        # Конфиг читаем один раз: в цикле по барам он не меняется
+        self.risk_per_trade = float(getattr(cfg, "RISK_PER_TRADE", 0.01))
+        self.leverage = int(getattr(cfg, "FUTURES_LEVERAGE_DEFAULT", 5))
+        self.max_positions = int(getattr(cfg, "MAX_OPEN_POSITIONS", 3))
+
+        self.atr_sl_mult = float(getattr(cfg, "ATR_SL_MULT", 4.0))
+        self.atr_tp_mult_1 = float(getattr(cfg, "ATR_TP_MULT_1", 8.0))
+        self.atr_ts_mult = float(getattr(cfg, "ATR_TS_MULT", 4.0))
+
+        # Для MTF-стратегии: тайм-стоп по возрасту позиции и отдельный, более строгий
+        # лимит MTF_MAX_OPEN_POSITIONS.
+        strategy_name = str(getattr(cfg, "STRATEGY_NAME", "htf_breakout")).lower()
+        self._is_mtf = strategy_name in {"mtf_breakout", "mtf"}
+        self._mtf_max_bars = int(getattr(cfg, "MTF_MAX_BARS_IN_POSITION", 0) or 0) if self._is_mtf else 0
+        mtf_max_pos = int(getattr(cfg, "MTF_MAX_OPEN_POSITIONS", self.max_positions))
+        self.eff_max_positions = (
+            min(self.max_positions, mtf_max_pos) if self._is_mtf else self.max_positions
+        )
 
     # ------------------------------------------------------------------
     def _prepare(self) -> Dict[str, pd.DataFrame]:
-        out: Dict[str, pd.DataFrame] = {}
+        syms: List[str] = []
+        frames: List[pd.DataFrame] = []
         for sym, df in self.raw_data.items():
             if df is None or df.empty:
                 continue
@@ -43,256 +380,119 @@ class Backtester:
                 for col in ["open", "high", "low", "close", "volume"]:
                     df2[col] = df2[col].astype(float)
                 df = df2[["open", "high", "low", "close", "volume"]].copy()
-            out[sym] = compute_indicators(df)
+            syms.append(sym)
+            frames.append(df)
+
+        # индикаторы по всем символам одним вызовом (с numba — параллельно по символам)
+        out: Dict[str, pd.DataFrame] = {}
+        for sym, df in zip(syms, compute_indicators_batch(frames)):
+            if self.price_dtype == np.float32:
+                # индикаторы считаем в float64, а храним в float32: вдвое меньше памяти
+                # и трафика через кэш в цикле по барам
+                for col in df.columns:
+                    if df[col].dtype == np.float64:
+                        df[col] = df[col].astype(np.float32)
+            out[sym] = df
         return out
 
     # ------------------------------------------------------------------
-    def run(self) -> Dict[str, float]:
+    def _build_matrices(self, data: Dict[str, pd.DataFrame], symbols: List[str], max_len: int) -> Dict[str, np.ndarray]:
+        """Собрать SoA-матрицы формы (max_len, n_symbols) для горячего цикла.
+
+        Столбец s соответствует symbols[s]. Бары за пределами истории символа
+        остаются NaN. Отсутствующий ATR заполняется нулём (как раньше row.get("ATR", 0.0)).
+        Тип элементов — self.price_dtype (float64 или float32 при BACKTEST_FLOAT32).
+        """
+        n_sym = len(symbols)
+        dt = self.price_dtype
+        cols = {
+            "close": np.full((max_len, n_sym), np.nan, dtype=dt),
+            "high": np.full((max_len, n_sym), np.nan, dtype=dt),
+            "low": np.full((max_len, n_sym), np.nan, dtype=dt),
+            "atr": np.full((max_len, n_sym), np.nan, dtype=dt),
+        }
+        for s, sym in enumerate(symbols):
+            df = data[sym]
+            n = len(df)
+            cols["close"][:n, s] = df["close"].to_numpy(dtype=dt)
+            cols["high"][:n, s] = df["high"].to_numpy(dtype=dt)
+            cols["low"][:n, s] = df["low"].to_numpy(dtype=dt)
+            if "ATR" in df.columns:
+                cols["atr"][:n, s] = df["ATR"].to_numpy(dtype=dt)
+            else:
+                cols["atr"][:n, s] = 0.0
+        return cols
+
+    # ------------------------------------------------------------------
+    def _precompute_signals(
+        self, data: Dict[str, pd.DataFrame], symbols: List[str], max_len: int, warmup: int
+    ) -> np.ndarray:
+        """Один раз посчитать сигналы стратегии по всем барам всех символов.
+
+        Возвращает int8-матрицу (max_len, n_symbols): +1 buy, -1 sell, 0 нет сигнала.
+        Стратегия не хранит состояния, поэтому сигнал на баре i зависит только
+        от истории до i включительно и его можно посчитать заранее. Серию по
+        всем барам символа стратегия считает сама (MTF — одним вызовом numba-ядра)
+        по BarWindow, собранному один раз на символ.
+        """
+        signals = np.zeros((max_len, len(symbols)), dtype=np.int8)
+        for s, sym in enumerate(symbols):
+            bars = BarWindow.from_frame(data[sym])
+            signals[:len(bars), s] = signal_series_from_bars(bars, warmup)
+        return signals
+
+    # ------------------------------------------------------------------
+    def run(self, equity_csv: Optional[str] = "equity_curve.csv") -> Dict[str, float]:
+        """Прогнать бэктест. equity_csv=None — не писать equity по барам в CSV.
+
+        result["equity_curve"] — np.ndarray float64 длины max_len - warmup.
+        """
         data = self._prepare()
         if not data:
             return {"total_pnl": 0.0, "roi": 0.0, "max_drawdown": 0.0}
 
         symbols = sorted(data.keys())
-        max_len = max(len(df) for df in data.values())
+        n_sym = len(symbols)
+        lengths = np.array([len(data[sym]) for sym in symbols], dtype=np.int64)
+        max_len = int(lengths.max())
         warmup = min(200, max_len - 1)
 
-        positions: Dict[str, Optional[Position]] = {s: None for s in symbols}
-        balance = self.initial_balance
-        equity_curve = []
-
-        risk_per_trade = float(getattr(cfg, "RISK_PER_TRADE", 0.01))
-        leverage = int(getattr(cfg, "FUTURES_LEVERAGE_DEFAULT", 5))
-        max_positions = int(getattr(cfg, "MAX_OPEN_POSITIONS", 3))
-
-        atr_sl_mult = float(getattr(cfg, "ATR_SL_MULT", 4.0))
-        atr_tp_mult_1 = float(getattr(cfg, "ATR_TP_MULT_1", 8.0))
-        atr_ts_mult = float(getattr(cfg, "ATR_TS_MULT", 4.0))
-
-        # основной цикл по времени
-        for i in range(warmup, max_len):
-            prices: Dict[str, float] = {}
-            atrs: Dict[str, float] = {}
-            df_slices: Dict[str, pd.DataFrame] = {}
-
-            for sym in symbols:
-                df = data[sym]
-                if i >= len(df):
-                    continue
-                row = df.iloc[i]
-                prices[sym] = float(row["close"])
-                atrs[sym] = float(row.get("ATR", 0.0))
-                df_slices[sym] = df.iloc[: i + 1]
-
-            if not prices:
-                continue
-
-            # считаем equity: баланс + плавающий PnL по открытым позициям
-            equity = balance
-            for sym, pos in positions.items():
-                if pos is None:
-                    continue
-                price = prices.get(sym)
-                if price is None:
-                    continue
-                if pos.side == "long":
-                    pnl = (price - pos.entry_price) * pos.qty
-                else:  # short
-                    pnl = (pos.entry_price - price) * pos.qty
-                equity += pnl
-            equity_curve.append(equity)
-
-            with open("equity_curve.csv", "a") as f:
-                f.write(f"{equity}\n")
-
-            # --- управление открытыми позициями ---
-            for sym, pos in list(positions.items()):
-                if pos is None:
-                    continue
-                price = prices.get(sym)
-                atr = atrs.get(sym, 0.0)
-                df_slice = df_slices.get(sym)
-                if price is None or atr <= 0 or df_slice is None:
-                    continue
-
-                # 1) Жёсткий SL
-                if pos.stop_loss is not None:
-                    if pos.side == "long" and price <= pos.stop_loss:
-                        balance = self._close_position(balance, sym, pos, price)
-                        positions[sym] = None
-                        continue
-                    if pos.side == "short" and price >= pos.stop_loss:
-                        balance = self._close_position(balance, sym, pos, price)
-                        positions[sym] = None
-                        continue
-
-                # 2) Первая цель по прибыли (частичный выход + перевод в безубыток + включение трейлинга)
-                if pos.tp1 is not None:
-                    if pos.side == "long" and price >= pos.tp1:
-                        balance = self._close_fraction(balance, sym, pos, price, fraction=0.5)
-                        pos.stop_loss = pos.entry_price
-                        new_ts = price - atr_ts_mult * atr
-                        if pos.trailing_stop is None or new_ts > pos.trailing_stop:
-                            pos.trailing_stop = new_ts
-                        pos.tp1 = None
-                    elif pos.side == "short" and price <= pos.tp1:
-                        balance = self._close_fraction(balance, sym, pos, price, fraction=0.5)
-                        pos.stop_loss = pos.entry_price
-                        new_ts = price + atr_ts_mult * atr
-                        if pos.trailing_stop is None or new_ts < pos.trailing_stop:
-                            pos.trailing_stop = new_ts
-                        pos.tp1 = None
-
-                # 3) Трейлинг
-                if pos.trailing_stop is not None:
-                    if pos.side == "long":
-                        new_ts = price - atr_ts_mult * atr
-                        if new_ts > pos.trailing_stop:
-                            pos.trailing_stop = new_ts
-                        if price <= pos.trailing_stop:
-                            balance = self._close_position(balance, sym, pos, price)
-                            positions[sym] = None
-                            continue
-                    else:  # short
-                        new_ts = price + atr_ts_mult * atr
-                        if new_ts < pos.trailing_stop:
-                            pos.trailing_stop = new_ts
-                        if price >= pos.trailing_stop:
-                            balance = self._close_position(balance, sym, pos, price)
-                            positions[sym] = None
-                            continue
-
-
-                # 3.5) Ограничение максимального времени жизни позиции (тайм-стоп)
-                # Для MTF-стратегии считаем возраст позиции в барах LTF (индекс i - open_time),
-                # и принудительно закрываем, если он превышает порог.
-                mtf_max_bars = int(getattr(cfg, "MTF_MAX_BARS_IN_POSITION", 0) or 0)
-                strategy_name = str(getattr(cfg, "STRATEGY_NAME", "htf_breakout")).lower()
-                if mtf_max_bars > 0 and strategy_name in {"mtf_breakout", "mtf"}:
-                    try:
-                        age_bars = int(i - pos.open_time)
-                    except Exception:
-                        age_bars = 0
-                    if age_bars >= mtf_max_bars:
-                        balance = self._close_position(balance, sym, pos, price)
-                        positions[sym] = None
-                        continue
-
-                # 4) Обратный сигнал стратегии полностью закрывает позицию
-                sig = signal_from_indicators(df_slice)
-                if pos.side == "long" and sig == "sell":
-                    balance = self._close_position(balance, sym, pos, price)
-                    positions[sym] = None
-                    continue
-                if pos.side == "short" and sig == "buy":
-                    balance = self._close_position(balance, sym, pos, price)
-                    positions[sym] = None
-                    continue
-
-            # пересчитываем equity после возможных закрытий
-            equity = balance
-            for sym, pos in positions.items():
-                if pos is None:
-                    continue
-                price = prices.get(sym)
-                if price is None:
-                    continue
-                if pos.side == "long":
-                    pnl = (price - pos.entry_price) * pos.qty
-                else:
-                    pnl = (pos.entry_price - price) * pos.qty
-                equity += pnl
-
-            # --- ограничение по количеству одновременных позиций ---
-            open_count = sum(1 for p in positions.values() if p is not None)
-
-            # Для MTF-стратегии можно ввести отдельный, более строгий лимит MTF_MAX_OPEN_POSITIONS.
-            strategy_name = str(getattr(cfg, "STRATEGY_NAME", "htf_breakout")).lower()
-            mtf_max_pos = int(getattr(cfg, "MTF_MAX_OPEN_POSITIONS", max_positions))
-            if strategy_name in {"mtf_breakout", "mtf"}:
-                eff_max_positions = min(max_positions, mtf_max_pos)
-            else:
-                eff_max_positions = max_positions
-
-            can_open_more = open_count < eff_max_positions
-
-            # --- открытие новых позиций по сигналам ---
-            for sym in symbols:
-                if not can_open_more:
-                    break
-                if positions[sym] is not None:
-                    continue
-                price = prices.get(sym)
-                atr = atrs.get(sym, 0.0)
-                df_slice = df_slices.get(sym)
-                if price is None or atr <= 0 or df_slice is None:
-                    continue
-
-                signal = signal_from_indicators(df_slice)
-                if signal not in {"buy", "sell"}:
-                    continue
-
-                side = "long" if signal == "buy" else "short"
-
-                # расстояние до стопа в процентах
-                stop_distance_pct = atr_sl_mult * atr / price * 100.0
-                if stop_distance_pct <= 0:
-                    continue
-
-                notional, qty = self.risk.calc_futures_size_from_risk(
-                    equity=equity,
-                    price=price,
-                    stop_distance_pct=stop_distance_pct,
-                    risk_per_trade=risk_per_trade,
-                    leverage=leverage,
-                )
-                if notional <= 0 or qty <= 0:
-                    continue
-
-                if side == "long":
-                    stop_loss = price - atr_sl_mult * atr
-                    tp1 = price + atr_tp_mult_1 * atr
-                else:
-                    stop_loss = price + atr_sl_mult * atr
-                    tp1 = price - atr_tp_mult_1 * atr
-
-                positions[sym] = Position(
-                    symbol=sym,
-                    entry_price=price,
-                    qty=qty,
-                    notional=notional,
-                    side=side,
-                    mode="futures",
-                    open_time=float(i),
-                    stop_loss=stop_loss,
-                    tp1=tp1,
-                    tp2=None,
-                    peak_price=price,
-                    trailing_stop=None,
-                    pyramid_level=0,
-                )
-                open_count += 1
-                can_open_more = open_count < max_positions
-
-        # Закрываем всё по последней цене
-        last_prices: Dict[str, float] = {}
-        for sym, df in data.items():
-            if df is None or df.empty:
-                continue
-            last_prices[sym] = float(df.iloc[-1]["close"])
-
-        for sym, pos in positions.items():
-            if pos is None:
-                continue
-            price = last_prices.get(sym)
-            if price is None:
-                continue
-            balance = self._close_position(balance, sym, pos, price)
+        self.cols = self._build_matrices(data, symbols, max_len)
+
+        signals = self._precompute_signals(data, symbols, max_len, warmup)
+
+        # equity по барам: предвыделенный буфер, в CSV пишется один раз после цикла
+        equity_curve = np.empty(max_len - warmup, dtype=np.float64)
+
+        core = _select_core(self.price_dtype, self.parallel)
+        balance = core(
+            self.cols["close"],
+            self.cols["atr"],
+            signals,
+            lengths,
+            warmup,
+            self.initial_balance,
+            self.fee_rate,
+            self.risk_per_trade,
+            float(self.leverage),
+            self.max_positions,
+            self.eff_max_positions,
+            self.atr_sl_mult,
+            self.atr_tp_mult_1,
+            self.atr_ts_mult,
+            self._mtf_max_bars,
+            self.risk.min_notional,
+            self.risk.qty_step,
+            equity_curve,
+        )
+
+        if equity_csv:
+            np.savetxt(equity_csv, equity_curve, fmt="%.6f")
 
         total_pnl = balance - self.initial_balance
         roi = total_pnl / self.initial_balance * 100.0 if self.initial_balance > 0 else 0.0
 
-        equity_arr = np.array(equity_curve, dtype=float)
-        max_dd = self._max_drawdown(equity_arr) if len(equity_arr) > 1 else 0.0
+        max_dd = self._max_drawdown(equity_curve) if len(equity_curve) > 1 else 0.0
 
         return {
             "total_pnl": float(total_pnl),
@@ -302,61 +502,16 @@ class Backtester:
         }
 
     # ------------------------------------------------------------------
-    def _close_fraction(self, balance: float, sym: str, pos: Position, price: float, fraction: float) -> float:
-        """Закрыть часть позиции (fraction от qty), вернуть новый баланс и скорректировать позицию."""
-        if fraction <= 0 or fraction >= 1 or pos.qty <= 0:
-            return balance
-
-        qty_close = pos.qty * fraction
-        if qty_close <= 0:
-            return balance
-
-        if pos.side == "long":
-            pnl = (price - pos.entry_price) * qty_close
-        else:
-            pnl = (pos.entry_price - price) * qty_close
-
-        notional_entry = pos.entry_price * qty_close
-        notional_exit = price * qty_close
-        fee = (notional_entry + notional_exit) * self.fee_rate
-        pnl_after_fee = pnl - fee
-
-        new_balance = balance + pnl_after_fee
-
-        # уменьшаем позицию
-        pos.qty -= qty_close
-        if pos.qty < 0:
-            pos.qty = 0
-        pos.notional = pos.entry_price * pos.qty
-
-        return new_balance
-
-    # ------------------------------------------------------------------
-    def _close_position(self, balance: float, sym: str, pos: Position, price: float) -> float:
-        """Полное закрытие позиции и возврат обновлённого баланса с учётом комиссии."""
-        if pos.qty <= 0:
-            return balance
-
-        if pos.side == "long":
-            pnl = (price - pos.entry_price) * pos.qty
-        else:
-            pnl = (pos.entry_price - price) * pos.qty
-
-        notional_entry = pos.entry_price * pos.qty
-        notional_exit = price * pos.qty
-        fee = (notional_entry + notional_exit) * self.fee_rate
-        pnl_after_fee = pnl - fee
-        return balance + pnl_after_fee
-
-    # ------------------------------------------------------------------
-    def _max_drawdown(self, equity: np.ndarray) -> float:
-        peak = float(equity[0])
-        max_dd = 0.0
-        for x in equity:
-            x = float(x)
-            if x > peak:
-                peak = x
-            dd = (peak - x) / peak * 100.0
-            if dd > max_dd:
-                max_dd = dd
-        return max_dd
+    @staticmethod
+    def _max_drawdown(equity: np.ndarray) -> float:
+        """Максимальная просадка в % от пика equity (векторно, без Python-цикла)."""
+        equity = np.asarray(equity, dtype=np.float64)
+        if equity.size == 0:
+            return 0.0
+        peaks = np.maximum.accumulate(equity)
+        # бары с неположительным пиком просадку не определяют
+        valid = peaks > 0
+        if not valid.any():
+            return 0.0
+        dd = (peaks[valid] - equity[valid]) / peaks[valid]
+        return max(float(dd.max() * 100.0), 0.0)
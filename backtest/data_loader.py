@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import aiohttp
 import asyncio
@@ -17,22 +18,29 @@ class HistoricalDataLoader:
         async with session.get(url) as resp:
             data = await resp.json()
 
-        df = pd.DataFrame(data, columns=[
-            "open_time","open","high","low","close","volume",
-            "close_time","qav","num_trades","tbbav","tbqav","ignore"
-        ])
+        if not data:
+            return pd.DataFrame(columns=["time","open","high","low","close","volume"])
 
-        df = df[["open_time","open","high","low","close","volume"]]
-        df.columns = ["time","open","high","low","close","volume"]
-
-        df["time"] = pd.to_datetime(df["time"], unit="ms")
-        df = df.astype({
-            "open": float, "high": float, "low": float,
-            "close": float, "volume": float,
-        })
+        # одно преобразование всего блока OHLCV вместо astype по колонкам
+        arr = np.asarray(data, dtype=object)
+        ohlcv = arr[:, 1:6].astype(np.float64)
+        df = pd.DataFrame(ohlcv, columns=["open","high","low","close","volume"])
+        df.insert(0, "time", pd.to_datetime(arr[:, 0].astype(np.int64), unit="ms"))
 
         return df
 
+    async def fetch_many(self, symbols, interval, limit=1000):
+        """Параллельно загрузить свечи по нескольким символам через одну keep-alive сессию.
+
+        Возвращает dict symbol -> DataFrame.
+        """
+        connector = aiohttp.TCPConnector(limit=max(len(symbols), 1), keepalive_timeout=60)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            frames = await asyncio.gather(
+                *(self.fetch_binance_klines(session, s, interval, limit) for s in symbols)
+            )
+        return dict(zip(symbols, frames))
+
     def load_csv(self, path):
         df = pd.read_csv(path)
         df["time"] = pd.to_datetime(df["time"])
@@ -1,24 +1,31 @@
+import numpy as np
 import pandas as pd
 from binance.client import Client
 
+# Один клиент на процесс: переиспользуем его requests.Session (keep-alive, TLS)
+_CLIENT = None
+
+
+def _get_client() -> Client:
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = Client()
+    return _CLIENT
+
+
 def fetch_klines(symbol: str, interval: str = "1m", limit: int = 1500):
     """
     Загружает реальные свечи с Binance Spot.
     """
-    client = Client()
-    raw = client.get_klines(symbol=symbol, interval=interval, limit=limit)
-
-    df = pd.DataFrame(raw, columns=[
-        "open_time","open","high","low","close","volume",
-        "close_time","qav","trades","tbbav","tbqav","ignore"
-    ])
+    raw = _get_client().get_klines(symbol=symbol, interval=interval, limit=limit)
 
-    df["open"] = df["open"].astype(float)
-    df["high"] = df["high"].astype(float)
-    df["low"] = df["low"].astype(float)
-    df["close"] = df["close"].astype(float)
-    df["volume"] = df["volume"].astype(float)
+    if not raw:
+        return pd.DataFrame(columns=["time","open","high","low","close","volume"])
 
-    df["time"] = pd.to_datetime(df["open_time"], unit="ms")
+    # один проход приведения типов по блоку OHLCV вместо astype по каждой колонке
+    arr = np.asarray(raw, dtype=object)
+    ohlcv = arr[:, 1:6].astype(np.float64)
+    df = pd.DataFrame(ohlcv, columns=["open","high","low","close","volume"])
+    df.insert(0, "time", pd.to_datetime(arr[:, 0].astype(np.int64), unit="ms"))
 
-    return df[["time","open","high","low","close","volume"]]
+    return df
@@ -13,8 +13,10 @@
 import os
 import sys
 import time
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict
 
+import numpy as np
 import pandas as pd
 
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -62,17 +64,11 @@ def load_mtf_symbol(symbol: str) -> pd.DataFrame:
             raise ValueError(f"{symbol}_1h.csv missing column {need}")
 
     # Считаем индикаторы на HTF (1h)
-    df_1h_ind = compute_indicators(df_1h.copy())
+    df_1h_ind = compute_indicators(df_1h)
 
-    # Ставим open_time индексом и растягиваем по M15-времени
     if "open_time" not in df_1h_ind.columns or "open_time" not in df_15m.columns:
         raise ValueError("Both HTF and LTF data must have open_time column for MTF mode")
 
-    df_1h_ind = df_1h_ind.set_index("open_time")
-    df_15m_idx = df_15m.set_index("open_time")
-
-    df_1h_sync = df_1h_ind.reindex(df_15m_idx.index, method="pad")
-
     # Выберем ключевые HTF-индикаторы и префиксуем их
     htf_cols = [
         "SMA_TREND",
@@ -83,19 +79,73 @@ def load_mtf_symbol(symbol: str) -> pd.DataFrame:
         "ADX",
         "RSI",
     ]
+    present = [c for c in htf_cols if c in df_1h_ind.columns]
+    htf = df_1h_ind[["open_time"] + present].rename(columns={c: f"HTF_{c}" for c in present})
+
+    # Для каждого M15-бара берём последний H1-бар с open_time <= его open_time
+    # (то же, что reindex(method="pad"), но одним проходом)
+    df_out = pd.merge_asof(df_15m, htf, on="open_time", direction="backward")
     for col in htf_cols:
-        hcol = f"HTF_{col}"
-        if col in df_1h_sync.columns:
-            df_15m_idx[hcol] = df_1h_sync[col]
-        else:
-            df_15m_idx[hcol] = pd.NA
+        if col not in present:
+            df_out[f"HTF_{col}"] = pd.NA
 
-    df_out = df_15m_idx.reset_index()  # вернём open_time как колонку
     return df_out
 
 
+def run_single_symbol(symbol: str, df: pd.DataFrame, initial_balance: float, strategy_name: str) -> dict:
+    """Бэктест одного символа в отдельном процессе (режим CROSS_SYMBOL_RISK = False).
+
+    STRATEGY_NAME передаём явно: при spawn-старте воркер заново импортирует config.
+    """
+    setattr(cfg, "STRATEGY_NAME", strategy_name)
+    bt = Backtester({symbol: df}, initial_balance=initial_balance)
+    return bt.run(equity_csv=None)
+
+
+def run_independent(data: Dict[str, pd.DataFrame]) -> dict:
+    """Прогнать символы независимо и параллельно, затем собрать портфельный результат.
+
+    Начальный баланс делится поровну между символами, equity-кривые
+    складываются по барам (короткие кривые дополняются последним значением),
+    просадка считается один раз по суммарной кривой.
+    """
+    initial_balance = float(getattr(cfg, "INITIAL_BALANCE_USDT", 5000.0))
+    share = initial_balance / len(data)
+    strategy_name = str(getattr(cfg, "STRATEGY_NAME", "mtf_breakout"))
+    workers = int(getattr(cfg, "BACKTEST_WORKERS", 0) or 0) or os.cpu_count() or 1
+    workers = min(workers, len(data))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            sym: pool.submit(run_single_symbol, sym, df, share, strategy_name)
+            for sym, df in data.items()
+        }
+        results = {sym: fut.result() for sym, fut in futures.items()}
+
+    curves = [np.asarray(r.get("equity_curve", []), dtype=np.float64) for r in results.values()]
+    n = max((len(c) for c in curves), default=0)
+    equity = np.zeros(n, dtype=np.float64)
+    for c in curves:
+        if len(c) == 0:
+            continue
+        equity[: len(c)] += c
+        equity[len(c):] += c[-1]
+
+    total_pnl = sum(float(r["total_pnl"]) for r in results.values())
+    roi = total_pnl / initial_balance * 100.0 if initial_balance > 0 else 0.0
+    max_dd = Backtester._max_drawdown(equity) if n > 1 else 0.0
+
+    np.savetxt("equity_curve.csv", equity, fmt="%.6f")
+
+    return {
+        "total_pnl": float(total_pnl),
+        "roi": float(roi),
+        "max_drawdown": float(max_dd),
+        "equity_curve": equity,
+    }
+
+
 def main():
-    open("equity_curve.csv", "w").close()
     # В MTF-режиме принудительно используем mtf_breakout
     setattr(cfg, "STRATEGY_NAME", "mtf_breakout")
 
@@ -134,7 +184,11 @@ def main():
     print(f"Loop count: {max_len - history}")
 
     t0 = time.time()
-    result = bt.run()
+    if getattr(cfg, "CROSS_SYMBOL_RISK", True):
+        result = bt.run()
+    else:
+        # символы независимы: считаем каждый в своём процессе
+        result = run_independent(data)
     dt = time.time() - t0
 
     print(f"Backtest (MTF) finished in {dt:.1f}s")
@@ -5,8 +5,9 @@
 """
 
 import asyncio
+import functools
 import logging
-import random
+from random import random as _random
 from typing import Any, Callable, TypeVar, Awaitable, Optional
 
 try:
@@ -23,6 +24,8 @@ T = TypeVar("T")
 class BinanceClientWrapper:
     """Асинхронная обёртка над синхронным python-binance-клиентом.
 
+    Сами запросы выполняются в default executor (пул потоков), поэтому
+    несколько вызовов через asyncio.gather идут параллельно.
     Используется простой экспоненциальный backoff и разделение "временных" и
     "фатальных" ошибок.
     """
@@ -38,24 +41,28 @@ class BinanceClientWrapper:
         self.max_retries = max_retries
         self.base_delay = base_delay
         self.max_delay = max_delay
+        # Расписание задержек backoff по номеру попытки (attempt - 1), считается один раз
+        self._delays = [min(base_delay * (2 ** k), max_delay) for k in range(max_retries + 1)]
 
     async def call(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
         """Вызывает метод клиента с retry/backoff.
 
         func — это обычно client.futures_... или client.get_...
         """
+        loop = asyncio.get_running_loop()
         attempt = 0
         while True:
             attempt += 1
             try:
-                return func(*args, **kwargs)
+                # синхронный HTTP-вызов уходит в пул потоков, event loop не блокируется
+                return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
             except (BinanceRequestException, BinanceAPIException) as e:  # type: ignore[misc]
                 if attempt > self.max_retries:
                     logger.exception("[BINANCE] giving up after %s attempts: %s", attempt - 1, e)
                     raise
 
-                delay = min(self.base_delay * 2 ** (attempt - 1), self.max_delay)
-                jitter = delay * 0.1 * random.random()
+                delay = self._delays[attempt - 1]
+                jitter = delay * 0.1 * _random()
                 sleep_for = delay + jitter
                 logger.warning(
                     "[BINANCE] error on attempt %s/%s: %s — retrying in %.2fs",
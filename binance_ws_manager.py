@@ -11,17 +11,54 @@
 """
 
 import asyncio
-import os
 import json
 import logging
-from typing import Any, Awaitable, Callable, Dict, List, Optional
+import ssl
+from typing import Any, Awaitable, Callable, Dict, Final, List, Optional, Tuple
 
 import aiohttp
 
-logger = logging.getLogger(__name__)
-WS_DEBUG = os.getenv("WS_DEBUG", "0") == "1"
+from config import WS_DEBUG as _WS_DEBUG_CFG
+
+try:  # orjson заметно быстрее stdlib json и принимает как str, так и bytes
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:  # pragma: no cover - orjson опционален
+    _json_loads = json.loads
 
+logger = logging.getLogger(__name__)
+# флаг читается из окружения один раз — в config.py
+WS_DEBUG: Final[bool] = _WS_DEBUG_CFG
+
+# Параметры ws_connect. heartbeat=20: PING каждые 20 с, нет PONG — соединение рвётся.
+# Таймаут чтения 60 с: полуоткрытый сокет обнаруживается за минуту, а не за
+# WS_STALE_SECONDS, и сразу уходит в обычный путь reconnect/backoff.
+# compress=0: без permessage-deflate — kline-кадры маленькие, распаковка дороже.
+_WS_RECEIVE_TIMEOUT = 60.0
+_WS_CONNECT_KWARGS: Dict[str, Any] = {
+    "heartbeat": 20,
+    "autoping": True,
+    "compress": 0,
+    "max_msg_size": 4 * 1024 * 1024,
+}
+if hasattr(aiohttp, "ClientWSTimeout"):  # aiohttp >= 3.10: receive_timeout устарел
+    _WS_CONNECT_KWARGS["timeout"] = aiohttp.ClientWSTimeout(ws_receive=_WS_RECEIVE_TIMEOUT, ws_close=10.0)
+else:  # pragma: no cover
+    _WS_CONNECT_KWARGS["receive_timeout"] = _WS_RECEIVE_TIMEOUT
+
+_KLINE_CLOSED_FMT = "[WS] kline closed %s %s close=%s"
+# Префильтр кадров до JSON-разбора: "...@kline_..." в первых байтах multiplex-кадра
+_KLINE_MARKER = "@kline_"
+_KLINE_MARKER_B = b"@kline_"
+_KLINE_MARKER_SCAN = 200
+
+# Контракт колбека: k — объект "k" kline-события Binance (s, i, t, x, ...). У закрытых
+# свечей (x == True) поля o/h/l/c/v уже приведены к float, t — int (Binance присылает
+# цены строками; приведение делается один раз здесь, при разборе кадра).
+# Незакрытые обновления колбекам не передаются.
 KlineCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+_KLINE_FLOAT_FIELDS: Final[Tuple[str, ...]] = ("o", "h", "l", "c", "v")
 
 
 class BinanceWSManager:
@@ -49,6 +86,28 @@ class BinanceWSManager:
         self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
         self._task: Optional[asyncio.Task] = None
         self._stopped = asyncio.Event()
+        # флаг отладки сырых сообщений фиксируем один раз (логирование уже настроено к этому моменту)
+        self._debug_raw = WS_DEBUG and logger.isEnabledFor(logging.DEBUG)
+
+        # Набор стримов и multiplex-URL фиксированы на всё время работы процесса;
+        # имена стримов в нижнем регистре считаем один раз
+        self._lower_symbols = [sym.lower() for sym in symbols]
+        self._streams = tuple(self._build_streams())
+        self._url = self._build_url(list(self._streams))
+
+        # Очереди между чтением WS и колбеками: медленный колбек не останавливает
+        # чтение сокета (иначе Binance может разорвать соединение). В них попадают
+        # только закрытые свечи (одна на символ за интервал), поэтому очереди без
+        # лимита — закрытую свечу никогда не отбрасываем
+        self._q15: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self._q1h: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self._workers: List[asyncio.Task] = []
+
+        # имя стрима -> очередь его таймфрейма; строится один раз, стримы фиксированы на старте
+        self._dispatch: Dict[str, "asyncio.Queue[Dict[str, Any]]"] = {}
+        for s in self._lower_symbols:
+            self._dispatch[f"{s}@kline_15m"] = self._q15
+            self._dispatch[f"{s}@kline_1h"] = self._q1h
 
     # ====== публичные методы ======
 
@@ -57,6 +116,14 @@ class BinanceWSManager:
         if self._task is not None:
             return
         self._stopped.clear()
+        # Одна сессия на всё время работы: DNS-кеш коннектора и SSL-контекст
+        # переиспользуются между переподключениями
+        if self._session is None or self._session.closed:
+            self._session = self._new_session()
+        self._workers = [
+            asyncio.create_task(self._worker(self._q15, self.on_kline_15m), name="binance-ws-15m"),
+            asyncio.create_task(self._worker(self._q1h, self.on_kline_1h), name="binance-ws-1h"),
+        ]
         self._task = asyncio.create_task(self._run_loop(), name="binance-ws-main")
 
     async def stop(self) -> None:
@@ -64,13 +131,18 @@ class BinanceWSManager:
         self._stopped.set()
         if self._task is not None:
             self._task.cancel()
-            try:
-                await self._task
-            except asyncio.CancelledError:
-                pass
+            # Дожидаемся полного выхода из _run_loop (async with ws_connect сам закрывает ws).
+            # shield: отмена самого stop() не должна оборвать это ожидание на середине.
+            await asyncio.shield(asyncio.gather(self._task, return_exceptions=True))
             self._task = None
 
-        # закрываем WebSocket и сессию
+        for w in self._workers:
+            w.cancel()
+        if self._workers:
+            await asyncio.shield(asyncio.gather(*self._workers, return_exceptions=True))
+        self._workers = []
+
+        # закрываем WebSocket (если цикл не успел закрыть его сам) и сессию
         if self._ws is not None and not self._ws.closed:
             try:
                 await self._ws.close()
@@ -90,38 +162,22 @@ class BinanceWSManager:
     async def _run_loop(self) -> None:
         """Основной цикл: подключение, чтение, reconnect при ошибках."""
         delay = self.reconnect_delay
-        streams = self._build_streams()
-        url = self._build_url(streams)
+        url = self._url
         logger.info("[WS] multiplex URL: %s", url)
 
         while not self._stopped.is_set():
             try:
                 if self._session is None or self._session.closed:
-                    self._session = aiohttp.ClientSession()
+                    # сессию закрыли снаружи — пересоздаём один раз
+                    self._session = self._new_session()
 
                 logger.info("[WS] connecting to Binance multiplex streams...")
-                async with self._session.ws_connect(url, heartbeat=30) as ws:
+                async with self._session.ws_connect(url, **_WS_CONNECT_KWARGS) as ws:
                     self._ws = ws
                     logger.info("[WS] connected to Binance streams")
                     delay = self.reconnect_delay  # сброс backoff после успешного подключения
 
-                    async for msg in ws:
-                        if self._stopped.is_set():
-                            break
-
-                        if msg.type == aiohttp.WSMsgType.TEXT:
-                            try:
-                                data = json.loads(msg.data)
-                            except Exception as e:
-                                logger.warning("[WS] failed to parse message: %s", e)
-                                continue
-                            await self._handle_message(data)
-                        elif msg.type == aiohttp.WSMsgType.ERROR:
-                            logger.error("[WS] websocket error: %s", ws.exception())
-                            break
-                        elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.CLOSING):
-                            logger.info("[WS] websocket closed by server")
-                            break
+                    await self._read_loop(ws)
 
             except asyncio.CancelledError:
                 # нормальное завершение по stop()
@@ -144,69 +200,145 @@ class BinanceWSManager:
 
     # ====== утилиты ======
 
+    @staticmethod
+    def _new_session() -> aiohttp.ClientSession:
+        """Сессия с SSL-контекстом, собранным один раз (создание контекста блокирует loop).
+
+        DNS кешируется на 5 минут, а простаивающие соединения живут 75 с —
+        переподключение не повторяет резолв и лишние TCP/TLS-рукопожатия.
+        """
+        connector = aiohttp.TCPConnector(
+            ssl=ssl.create_default_context(),
+            ttl_dns_cache=300,
+            keepalive_timeout=75,
+            limit=10,
+        )
+        return aiohttp.ClientSession(connector=connector)
+
     def _build_streams(self) -> List[str]:
-        streams: List[str] = []
-        for sym in self.symbols:
-            s = sym.lower()
-            streams.append(f"{s}@kline_15m")
-            streams.append(f"{s}@kline_1h")
-        return streams
+        return [f"{s}@kline_{tf}" for s in self._lower_symbols for tf in ("15m", "1h")]
 
     def _build_url(self, streams: List[str]) -> str:
         # пример: wss://fstream.binance.com/stream?streams=btcusdt@kline_15m/ethusdt@kline_1h
         stream_str = "/".join(streams)
         return f"{self.BASE_URL}?streams={stream_str}"
 
-    async def _handle_message(self, payload: Dict[str, Any]) -> None:
-        """Обработка входящего сообщения от multiplex-стрима."""
+    def _route(self, payload: Dict[str, Any]) -> Optional[Tuple["asyncio.Queue[Dict[str, Any]]", Dict[str, Any]]]:
+        """Найти очередь и kline для входящего multiplex-сообщения (None — пропустить)."""
         # формат multiplex:
         # {
         #   "stream": "btcusdt@kline_15m",
         #   "data": { "e": "kline", "E": 123456789, "s": "BTCUSDT", "k": {...} }
         # }
-        if WS_DEBUG:
-            try:
-                logger.debug("[WS][DEBUG] raw msg: %s", payload)
-            except Exception:
-                pass
-
-        data = payload.get("data")
-        if data is None:
-            data = payload
-        if not isinstance(data, dict):
-            return
+        if self._debug_raw:
+            # %r: форматирование payload откладывается до хендлера
+            logger.debug("[WS][DEBUG] raw msg: %r", payload)
 
-        # интересуют только kline события (в multiplex может прилететь что-то ещё)
-        ev = data.get("e")
-        if ev is not None and ev != "kline":
-            return
+        # набор стримов фиксирован, поэтому очередь находим одним lookup по имени стрима;
+        # всё, что не наш kline-стрим, отбрасывается здесь же
+        q = self._dispatch.get(payload.get("stream"))
+        if q is None:
+            return None
 
-        k = data.get("k")
-        if not isinstance(k, dict):
-            return
+        try:
+            data = payload["data"]
+            k = data["k"]
+        except (KeyError, TypeError):
+            return None
 
         # В некоторых ответах symbol есть только на верхнем уровне data["s"]
-        if "s" not in k and "s" in data:
+        if "s" not in k:
             k["s"] = data.get("s")
 
-        interval = k.get("i")
-        symbol = k.get("s") or data.get("s")
+        # незакрытые обновления колбеки всё равно игнорируют — в очередь их не кладём
+        if k.get("x") is not True:
+            return None
 
-        # Логируем только закрытые свечи — это главный признак, что бот получает данные
+        # закрытая свеча: числа приводим здесь, колбеки получают готовые float/int
         try:
-            if k.get("x") and symbol and interval in ("15m", "1h"):
-                close_px = k.get("c")
-                logger.info("[WS] kline closed %s %s close=%s", symbol, interval, close_px)
-        except Exception:
-            pass
+            for f in _KLINE_FLOAT_FIELDS:
+                k[f] = float(k[f])
+            k["t"] = int(k["t"])
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning("[WS] malformed kline %s %s: %r", k.get("s"), k.get("i"), e)
+            return None
+
+        # Логируем закрытые свечи — это главный признак, что бот получает данные.
+        interval = k.get("i")
+        if isinstance(interval, str) and logger.isEnabledFor(logging.INFO):
+            logger.info(_KLINE_CLOSED_FMT, k.get("s"), interval, k["c"])
+
+        return q, k
 
-        if interval == "15m":
-            await self._safe_call(self.on_kline_15m, k)
-        elif interval == "1h":
-            await self._safe_call(self.on_kline_1h, k)
+    async def _worker(self, q: "asyncio.Queue[Dict[str, Any]]", cb: KlineCallback) -> None:
+        """Последовательно отдаёт kline из очереди в колбек таймфрейма."""
+        while True:
+            k = await q.get()
+            try:
+                await self._safe_call(cb, k)
+            finally:
+                q.task_done()
+
+    async def _read_loop(self, ws: aiohttp.ClientWebSocketResponse) -> None:
+        """Чтение кадров с пакетной выборкой уже буферизованных сообщений.
+
+        После каждого ожидания забираем все кадры, которые aiohttp уже положил
+        в буфер, и разбираем их одним проходом. Колбеки выполняются воркерами
+        из очередей, поэтому чтение сокета на них не ждёт.
+        """
+        while not self._stopped.is_set():
+            msg = await ws.receive()
+            done = self._collect(ws, msg)
+            while not done and self._has_buffered(ws):
+                msg = await ws.receive()  # кадр уже в буфере — возвращается без ожидания
+                done = self._collect(ws, msg)
+            if done:
+                return
+
+    def _collect(self, ws: aiohttp.ClientWebSocketResponse, msg: aiohttp.WSMessage) -> bool:
+        """Разобрать кадр и поставить kline в очередь. True — соединение надо завершить."""
+        if msg.type in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+            raw = msg.data
+            # имя стрима идёт в начале кадра: всё, что не kline, отбрасываем до разбора JSON
+            marker = _KLINE_MARKER_B if isinstance(raw, (bytes, bytearray)) else _KLINE_MARKER
+            if marker not in raw[:_KLINE_MARKER_SCAN]:
+                return False
+            try:
+                data = _json_loads(raw)
+            except ValueError as e:  # json.JSONDecodeError / orjson.JSONDecodeError
+                logger.warning("[WS] failed to parse message: %s", e)
+                return False
+            if type(data) is not dict:
+                return False
+            routed = self._route(data)
+            if routed is not None:
+                q, k = routed
+                q.put_nowait(k)
+            return False
+        if msg.type == aiohttp.WSMsgType.ERROR:
+            logger.error("[WS] websocket error: %s", ws.exception())
+            return True
+        if msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.CLOSING):
+            logger.info("[WS] websocket closed by server")
+            return True
+        return False
+
+    @staticmethod
+    def _has_buffered(ws: aiohttp.ClientWebSocketResponse) -> bool:
+        """Есть ли в ридере aiohttp уже принятые, но не прочитанные кадры.
+
+        Использует приватный буфер ридера; если его нет (другая версия aiohttp),
+        просто читаем по одному кадру, как async for.
+        """
+        buf = getattr(getattr(ws, "_reader", None), "_buffer", None)
+        return bool(buf)
 
     async def _safe_call(self, cb: KlineCallback, kline: Dict[str, Any]) -> None:
         try:
             await cb(kline)
+        except asyncio.CancelledError:
+            # остановка воркера — не ошибка колбека, пробрасываем дальше
+            raise
         except Exception as e:  # pragma: no cover
+            # внешняя граница: ошибка стратегии не должна останавливать воркер
             logger.exception("[WS] error in kline callback: %s", e)
\ No newline at end of file
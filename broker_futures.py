@@ -11,7 +11,9 @@
 import asyncio
 import logging
 import random
-from typing import Any, Dict, List, Optional
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
 
 from binance import AsyncClient  # type: ignore
 
@@ -20,6 +22,19 @@ import config
 logger = logging.getLogger(__name__)
 
 
+@dataclass(slots=True, frozen=True)
+class SymbolInfo:
+    """Торговые параметры символа из exchangeInfo (LOT_SIZE / MIN_NOTIONAL).
+
+    scale — целый масштаб 1/step_size для шагов вида 10^-n, иначе 0.
+    """
+
+    min_qty: float
+    step_size: float
+    min_notional: float
+    scale: int
+
+
 class LiveFuturesBroker:
     """Брокер для Binance USDT-M фьючерсов на базе AsyncClient (python-binance).
 
@@ -40,7 +55,11 @@ class LiveFuturesBroker:
         self.max_retries = max_retries
         self.base_delay = base_delay
         self.max_delay = max_delay
-        self._symbols_info: Dict[str, Dict[str, Any]] = {}
+        self._symbols_info: Dict[str, SymbolInfo] = {}
+        # Короткий кеш futures_account: баланс и позиции в одном цикле опроса
+        # читаются из одного REST-ответа. (monotonic-время получения, ответ)
+        self._account_cache: Tuple[float, Dict[str, Any]] = (0.0, {})
+        self.account_cache_ttl = 2.0
 
     # ====== фабричный метод ======
 
@@ -67,8 +86,14 @@ class LiveFuturesBroker:
     # ====== базовый вызов с retry/backoff ======
 
     async def _call(self, op_name: str, func, *args: Any, **kwargs: Any) -> Any:
-        """Обёртка над вызовами AsyncClient с экспоненциальным backoff."""
+        """Обёртка над вызовами AsyncClient с backoff по схеме Decorrelated Jitter.
+
+        Задержка каждой следующей попытки случайна в [base_delay, 3 * предыдущая]
+        (с потолком max_delay): одновременные ошибки по разным символам не
+        синхронизируют повторы в "залп".
+        """
         attempt = 0
+        sleep_for = self.base_delay
         while True:
             attempt += 1
             try:
@@ -82,9 +107,7 @@ class LiveFuturesBroker:
                         e,
                     )
                     raise
-                delay = min(self.base_delay * (2 ** (attempt - 1)), self.max_delay)
-                jitter = delay * 0.2 * random.random()
-                sleep_for = delay + jitter
+                sleep_for = min(self.max_delay, random.uniform(self.base_delay, sleep_for * 3))
                 logger.warning(
                     "[FUTURES] %s error on attempt %s/%s: %s — retry in %.2fs",
                     op_name,
@@ -102,26 +125,47 @@ class LiveFuturesBroker:
         logger.info("[FUTURES] loading futures_exchange_info (python-binance)...")
         info = await self._call("futures_exchange_info", self.client.futures_exchange_info)
         symbols = info.get("symbols", [])
+        # Параметры нужны только для торгуемых символов (пустой список — берём все)
+        wanted = set(getattr(config, "FUTURES_SYMBOLS", None) or ())
         for s in symbols:
+            symbol = s["symbol"]
+            if wanted and symbol not in wanted:
+                continue
             if s.get("contractType") != "PERPETUAL":
                 continue
-            symbol = s["symbol"]
-            filters = {f["filterType"]: f for f in s.get("filters", [])}
-            lot = filters.get("LOT_SIZE", {})
+            lot: Dict[str, Any] = {}
+            min_notional_filter = None
+            for f in s.get("filters", ()):
+                ftype = f["filterType"]
+                if ftype == "LOT_SIZE":
+                    lot = f
+                elif ftype == "MIN_NOTIONAL":
+                    min_notional_filter = f
+                else:
+                    continue
+                if lot and min_notional_filter is not None:
+                    break
             min_qty = float(lot.get("minQty", 0.0))
             step_size = float(lot.get("stepSize", 0.0))
             min_notional = 0.0
-            min_notional_filter = filters.get("MIN_NOTIONAL")
             if min_notional_filter is not None:
                 try:
                     min_notional = float(min_notional_filter.get("notional", 0.0))
                 except Exception:
                     min_notional = 0.0
-            self._symbols_info[symbol] = {
-                "min_qty": min_qty,
-                "step_size": step_size,
-                "min_notional": min_notional,
-            }
+            # Для шагов вида 10^-n храним целый масштаб 1/step: округление по нему
+            # детерминировано (0.3 при шаге 0.1 -> 0.3, а не 0.2 из-за 2.9999...)
+            scale = 0
+            if 0.0 < step_size <= 1.0:
+                inv = 1.0 / step_size
+                if abs(inv - round(inv)) < 1e-6:
+                    scale = int(round(inv))
+            self._symbols_info[symbol] = SymbolInfo(
+                min_qty=min_qty,
+                step_size=step_size,
+                min_notional=min_notional,
+                scale=scale,
+            )
         logger.info("[FUTURES] exchangeInfo loaded for %s symbols", len(self._symbols_info))
 
     # ====== вспомогательные методы ======
@@ -129,9 +173,13 @@ class LiveFuturesBroker:
     def _adjust_qty(self, symbol: str, qty: float) -> float:
         """Привести количество к шагу биржи (LOT_SIZE.stepSize), округляя вниз."""
         info = self._symbols_info.get(symbol)
-        if not info:
+        if info is None:
             return qty
-        step = info.get("step_size") or 0.0
+        scale = info.scale
+        if scale > 0:
+            # +1e-9 шага гасит ошибку представления (0.29 * 100 = 28.999999999999996)
+            return int(qty * scale + 1e-9) / scale
+        step = info.step_size
         if step <= 0:
             return qty
         steps = int(qty / step)
@@ -139,9 +187,22 @@ class LiveFuturesBroker:
 
     # ====== баланс и позиции ======
 
+    async def _account(self) -> Dict[str, Any]:
+        """futures_account с кешем на account_cache_ttl секунд."""
+        ts, acc = self._account_cache
+        if acc and time.monotonic() - ts < self.account_cache_ttl:
+            return acc
+        acc = await self._call("futures_account", self.client.futures_account)
+        self._account_cache = (time.monotonic(), acc)
+        return acc
+
+    def _invalidate_account(self) -> None:
+        """Сбросить кеш счёта (после ордеров баланс и позиции меняются)."""
+        self._account_cache = (0.0, {})
+
     async def get_balance_usdt(self) -> float:
         """Получить equity/баланс USDT по фьючерсному счёту."""
-        acc = await self._call("futures_account", self.client.futures_account)
+        acc = await self._account()
         balances = acc.get("assets", [])
         for b in balances:
             if b.get("asset") == "USDT":
@@ -155,7 +216,7 @@ class LiveFuturesBroker:
 
     async def get_positions(self) -> List[Dict[str, Any]]:
         """Список открытых позиций по всем символам (ненулевой positionAmt)."""
-        acc = await self._call("futures_account", self.client.futures_account)
+        acc = await self._account()
         positions = acc.get("positions", [])
         out: List[Dict[str, Any]] = []
         for p in positions:
@@ -233,10 +294,14 @@ class LiveFuturesBroker:
             params["positionSide"] = position_side.upper()
 
         logger.info("[FUTURES] creating MARKET order: %s", params)
-        res = await self._call(
-            "futures_create_order",
-            self.client.futures_create_order,
-            **params,
-        )
+        self._invalidate_account()
+        try:
+            res = await self._call(
+                "futures_create_order",
+                self.client.futures_create_order,
+                **params,
+            )
+        finally:
+            self._invalidate_account()
         logger.info("[FUTURES] order result: %s", res)
         return res
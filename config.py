@@ -55,6 +55,12 @@ EMA_FAST = 5
 EMA_SLOW = 13
 ATR_PERIOD = 14
 ADX_PERIOD = 14
+# Считать индикаторы в float32 (вдвое меньше памяти; значения чуть отличаются от float64)
+INDICATORS_FLOAT32 = False
+# Считать индикаторы через TA-Lib (если установлен). ВНИМАНИЕ: ATR/ADX/RSI в TA-Lib
+# сглаживаются по Уайлдеру, а EMA стартует с SMA — значения отличаются от встроенного
+# расчёта, поэтому по умолчанию выключено
+INDICATORS_USE_TALIB = False
 
 ADX_TREND_THRESHOLD = 15.0        # минимальный ADX, чтобы считать рынок трендовым
 ANTI_CHOP_MIN_ATR_PCT = 0.0005    # фильтр "слишком тихого" рынка
@@ -93,6 +99,10 @@ TRADES_LOG_FILE = "trades.log"
 ERROR_LOG_FILE = "errors.log"
 LOG_MAX_BYTES = 5 * 1024 * 1024
 LOG_BACKUP_COUNT = 3
+# Основной лог пишется пачками: до LOG_BUFFER записей или раз в LOG_FLUSH_INTERVAL секунд
+# (ERROR и выше — сразу). 0 = писать каждую запись
+LOG_BUFFER = 512
+LOG_FLUSH_INTERVAL = 2.0
 # === Trend strategy params (Dual Trend Bot) ===
 
 
@@ -116,6 +126,17 @@ RSI_SHORT_MIN = 20.0
 # Максимальное количество одновременно открытых фьючерсных позиций
 MAX_OPEN_POSITIONS = 3
 
+# Общий баланс и лимит позиций на все символы в бэктесте.
+# False — каждый символ считается независимо (своя доля баланса) в отдельном процессе,
+# equity суммируется по барам. Быстрее на многоядерной машине, но без межсимвольного риска.
+CROSS_SYMBOL_RISK = True
+# Число процессов для независимого бэктеста (0 = os.cpu_count())
+BACKTEST_WORKERS = 0
+# Хранить OHLCV и индикаторы бэктеста в float32 (меньше памяти, результаты чуть отличаются)
+BACKTEST_FLOAT32 = False
+# Выходы по позициям внутри бара считать в потоках numba (есть смысл при десятках символов)
+BACKTEST_PARALLEL = False
+
 # ===== ATR-базированные уровни SL/TP/трейлинга (для бэктестера и стратегий) =====
 # Стоп-лосс: entry_price ± ATR * ATR_SL_MULT
 # Для крипты на трендовых системах разумно держать SL шире, чтобы не выбивало шумом.
@@ -234,6 +255,8 @@ BINANCE_API_SECRET = _os.getenv("BINANCE_API_SECRET", "O4o0oORj7wloy6DfeuWbcOVUy
 
 # Файл состояния (его можно переопределять, если нужно вести несколько ботов)
 STATE_FILE = _os.getenv("BOT_STATE_FILE", "bot_state.json")
+# Писать файл состояния с отступами (удобно читать, но больше и медленнее)
+STATE_PRETTY = _os.getenv("STATE_PRETTY", "0") == "1"
 
 # Версия стратегии/конфига — можно использовать в логах и state
 STRATEGY_VERSION = _os.getenv("STRATEGY_VERSION", "mtf_breakout_prod_prep_1")
@@ -243,6 +266,8 @@ STRATEGY_VERSION = _os.getenv("STRATEGY_VERSION", "mtf_breakout_prod_prep_1")
 TELEGRAM_ENABLED = _os.getenv("TELEGRAM_ENABLED", "1") == "1"
 TELEGRAM_BOT_TOKEN = _os.getenv("TELEGRAM_BOT_TOKEN", "8269222363:AAF6vM7-ydXHJjBiq42MDK4jWn5sYbIub7w")
 TELEGRAM_CHAT_ID = _os.getenv("TELEGRAM_CHAT_ID", "351630680")
+# Сколько сообщений может ждать отправки; при переполнении выбрасывается самое старое
+TELEGRAM_QUEUE_SIZE = int(_os.getenv("TELEGRAM_QUEUE_SIZE", "100"))
 
 
 
@@ -259,12 +284,29 @@ MIN_REOPEN_INTERVAL_SEC = int(_os.getenv("MIN_REOPEN_INTERVAL_SEC", "300"))
 # Максимально допустимая "тишина" по WebSocket (сек); 0 = не проверять
 WS_STALE_SECONDS = int(_os.getenv("WS_STALE_SECONDS", "900"))
 
+# Heartbeat: минимальный интервал проверок (сек) сразу после изменения позиций или проблемы;
+# в тишине интервал удваивается до EQUITY_NOTIFY_INTERVAL (0 = всегда EQUITY_NOTIFY_INTERVAL).
+# Уведомление heartbeat в Telegram по-прежнему не чаще раза в EQUITY_NOTIFY_INTERVAL
+HEARTBEAT_MIN_INTERVAL = float(_os.getenv("HEARTBEAT_MIN_INTERVAL", "60"))
+
 # Отключать ли торговлю при рассинхронизации позиций биржа/локальный стейт
 POSITION_MISMATCH_DISABLE = _os.getenv("POSITION_MISMATCH_DISABLE", "1") == "1"
 
 # Логировать сырые сообщения WebSocket (0/1)
 WS_DEBUG = _os.getenv("WS_DEBUG", "0") == "1"
 
+# Сколько секунд live-раннер переиспользует полученный баланс USDT (0 = каждый раз запрос)
+EQUITY_CACHE_TTL = float(_os.getenv("EQUITY_CACHE_TTL", "30"))
+
+# Сколько рыночных ордеров live-раннер может отправлять одновременно (по разным символам)
+ORDER_CONCURRENCY = int(_os.getenv("ORDER_CONCURRENCY", "8"))
+
+# Как часто (сек) сбрасывать на диск несрочные изменения состояния (трейлинг, баланс)
+STATE_FLUSH_INTERVAL = float(_os.getenv("STATE_FLUSH_INTERVAL", "5"))
+
+# Использовать uvloop для asyncio, если пакет установлен (0/1)
+USE_UVLOOP = _os.getenv("USE_UVLOOP", "1") == "1"
+
 # ===== Strategy debug (Step11) =====
 STRATEGY_DEBUG = _os.getenv('STRATEGY_DEBUG', '1') == '1'
 
@@ -272,3 +314,38 @@ STRATEGY_DEBUG = _os.getenv('STRATEGY_DEBUG', '1') == '1'
 PRELOAD_HISTORY = _os.getenv('PRELOAD_HISTORY', '1') == '1'
 PRELOAD_15M_LIMIT = int(_os.getenv('PRELOAD_15M_LIMIT', '500'))
 PRELOAD_1H_LIMIT  = int(_os.getenv('PRELOAD_1H_LIMIT', '200'))
+# Сколько REST-запросов истории выполнять одновременно (символы × таймфреймы)
+PRELOAD_CONCURRENCY = int(_os.getenv('PRELOAD_CONCURRENCY', '8'))
+# OHLCV из utils.fetch_klines_async во float32 (вдвое меньше памяти; точность ~7 значащих цифр)
+KLINES_FP32 = _os.getenv('KLINES_FP32', '0') == '1'
+
+# ===== Целочисленные компаньоны порогов (basis points) =====
+# Источник истины — *_PCT выше; *_BP только производные от них (1 bp = 0.01%),
+# считаются один раз при импорте, чтобы горячие циклы не пересчитывали доли.
+# Менять нужно *_PCT, а не *_BP.
+_BP_SCALE = 10_000
+
+
+def _bp(frac: float) -> int:
+    """Доля (0.004 = 0.4%) -> целые basis points (40)."""
+    return int(round(frac * _BP_SCALE))
+
+
+TAKE_PROFIT_BP = _bp(TAKE_PROFIT_PCT)
+STOP_LOSS_BP = _bp(STOP_LOSS_PCT)
+TRAILING_ACTIVATION_BP = _bp(TRAILING_ACTIVATION_PCT)
+TRAILING_STOP_BP = _bp(TRAILING_STOP_PCT)
+BREAKOUT_BUFFER_BP = _bp(BREAKOUT_BUFFER_PCT)
+ANTI_CHOP_MIN_ATR_BP = _bp(ANTI_CHOP_MIN_ATR_PCT)
+LTF_ATR_MIN_BP = _bp(LTF_ATR_MIN_PCT)
+MTF_ATR_LOW_VOL_BP = _bp(MTF_ATR_LOW_VOL_PCT)
+MTF_ATR_HIGH_VOL_BP = _bp(MTF_ATR_HIGH_VOL_PCT)
+MTF_ATR_SUPER_HIGH_BP = _bp(MTF_ATR_SUPER_HIGH_PCT)
+MTF_DRIFT_MIN_BP = _bp(MTF_DRIFT_MIN_PCT)
+MTF_DRIFT_STRONG_TREND_BP = _bp(MTF_DRIFT_STRONG_TREND_PCT)
+HTF_VOLATILE_ATR_BP = _bp(HTF_VOLATILE_ATR_PCT)
+HTF_VOLATILE_DRIFT_BP = _bp(HTF_VOLATILE_DRIFT_PCT)
+
+# ATR_MIN_PCT / ATR_MAX_PCT заданы уже в процентах (0.1 = 0.1%), поэтому делим на 100
+ATR_MIN_BP = _bp(ATR_MIN_PCT / 100.0)
+ATR_MAX_BP = _bp(ATR_MAX_PCT / 100.0)
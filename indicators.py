@@ -1,9 +1,450 @@
 import pandas as pd
 import numpy as np
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
 import config as cfg
+from numba_compat import NUMBA_AVAILABLE, njit, prange
+
+try:  # TA-Lib опционален: используется только при INDICATORS_USE_TALIB = True
+    import talib  # type: ignore
+except ImportError:  # pragma: no cover
+    talib = None
+
+try:  # bottleneck опционален: быстрые скользящие средние для ветки без numba
+    import bottleneck as bn  # type: ignore
+except ImportError:  # pragma: no cover
+    bn = None
+
+try:  # polars опционален: с ним compute_indicators принимает и pl.DataFrame
+    import polars as pl  # type: ignore
+except ImportError:  # pragma: no cover
+    pl = None
+
+
+# ======================================================================
+# Численные ядра индикаторов (numba, если установлена)
+# ======================================================================
+# Рекуррентность повторяет pandas ewm(span=..., adjust=False).mean() операция
+# в операцию (alpha через com, деление на old_wt + new_wt, пропуск NaN), поэтому
+# результат побитово совпадает с прежним расчётом. fastmath не включаем: он
+# ломает проверки на NaN и меняет порядок операций.
+
+
+def _ewm_alpha(span: int) -> float:
+    """alpha для ewm(span=...) так же, как её считает pandas (через center of mass)."""
+    com = (span - 1) / 2.0
+    return 1.0 / (1.0 + com)
+
+
+@njit(cache=True)
+def _multi_ema(x, alphas, out):
+    """Все EMA по одному ряду за один проход: out[k] — EMA с alphas[k]."""
+    n = x.shape[0]
+    m = alphas.shape[0]
+    if n == 0:
+        return
+    weighted = np.empty(m)
+    # вес накопленного значения: 1 после наблюдения, затухает на пропусках (NaN)
+    old_wt = np.ones(m)
+    x0 = x[0]
+    nobs = 1 if x0 == x0 else 0
+    for k in range(m):
+        weighted[k] = x0
+        out[k, 0] = x0 if nobs >= 1 else np.nan
+    for i in range(1, n):
+        cur = x[i]
+        is_obs = cur == cur
+        if is_obs:
+            nobs += 1
+        for k in range(m):
+            w = weighted[k]
+            if w == w:
+                new_wt = alphas[k]
+                old_wt[k] *= 1.0 - new_wt
+                if is_obs:
+                    if w != cur:
+                        w = old_wt[k] * w + new_wt * cur
+                        w /= old_wt[k] + new_wt
+                        weighted[k] = w
+                    old_wt[k] = 1.0
+            elif is_obs:
+                weighted[k] = cur
+            out[k, i] = weighted[k] if nobs >= 1 else np.nan
+
+
+# Состояние скользящего окна (float64-массив из 7 ячеек), общее для всех
+# скользящих средних: сумма с компенсацией Кэхэна (отдельно для добавлений и
+# удалений), как в pandas rolling(w).mean(). Голый cumsum на длинных рядах
+# копит ошибку округления, а так результат совпадает с pandas побитово.
+_RS_NOBS, _RS_NEG, _RS_SUM, _RS_COMP_ADD, _RS_COMP_REM, _RS_PREV, _RS_SAME = range(7)
+
+
+@njit(cache=True)
+def _roll_reset(st, first):
+    st[_RS_NOBS] = 0.0
+    st[_RS_NEG] = 0.0
+    st[_RS_SUM] = 0.0
+    st[_RS_COMP_ADD] = 0.0
+    st[_RS_COMP_REM] = 0.0
+    st[_RS_PREV] = first
+    st[_RS_SAME] = 0.0
+
+
+@njit(cache=True)
+def _roll_add(st, v):
+    if v == v:
+        st[_RS_NOBS] += 1.0
+        sum_x = st[_RS_SUM]
+        y = v - st[_RS_COMP_ADD]
+        t = sum_x + y
+        st[_RS_COMP_ADD] = t - sum_x - y
+        st[_RS_SUM] = t
+        if np.signbit(v):
+            st[_RS_NEG] += 1.0
+        # серия одинаковых значений: берём само значение, без артефактов суммы
+        if v == st[_RS_PREV]:
+            st[_RS_SAME] += 1.0
+        else:
+            st[_RS_SAME] = 1.0
+        st[_RS_PREV] = v
+
+
+@njit(cache=True)
+def _roll_remove(st, v):
+    if v == v:
+        st[_RS_NOBS] -= 1.0
+        sum_x = st[_RS_SUM]
+        y = -v - st[_RS_COMP_REM]
+        t = sum_x + y
+        st[_RS_COMP_REM] = t - sum_x - y
+        st[_RS_SUM] = t
+        if np.signbit(v):
+            st[_RS_NEG] -= 1.0
+
+
+@njit(cache=True)
+def _roll_mean(st, w):
+    """Текущее среднее окна; NaN, пока наблюдений (не NaN) меньше w."""
+    nobs = st[_RS_NOBS]
+    if nobs >= w and nobs > 0:
+        r = st[_RS_SUM] / nobs
+        if st[_RS_SAME] >= nobs:
+            r = st[_RS_PREV]
+        elif st[_RS_NEG] == 0 and r < 0:
+            r = 0.0
+        elif st[_RS_NEG] == nobs and r > 0:
+            r = 0.0
+        return r
+    return np.nan
+
+
+@njit(cache=True)
+def _rolling_mean_kernel(a, w, out):
+    """Скользящее среднее окна w за O(N): добавляем новый элемент, вычитаем старый."""
+    n = a.shape[0]
+    st = np.empty(7)
+    for i in range(n):
+        s = i + 1 - w
+        if s < 0:
+            s = 0
+        if i == 0 or s >= i:
+            # окно не пересекается с предыдущим (w == 1) — начинаем заново
+            _roll_reset(st, a[s])
+            adds_from = s
+        else:
+            if s > 0:
+                _roll_remove(st, a[s - 1])
+            adds_from = i
+        for j in range(adds_from, i + 1):
+            _roll_add(st, a[j])
+        out[i] = _roll_mean(st, w)
+
+
+@njit(cache=True)
+def _gain_loss(close, j):
+    """gain/loss бара j как close.diff().clip(lower=0) и -clip(upper=0).
+
+    NaN сохраняется (на первом баре — NaN), при d == 0 loss = -0.0, как в pandas.
+    """
+    if j == 0:
+        return np.nan, np.nan
+    d = close[j] - close[j - 1]
+    return (0.0 if d < 0 else d), -(0.0 if d > 0 else d)
+
+
+# error_model="numpy": при нулевом среднем убытке rs = inf и RSI = 100, как в pandas
+@njit(cache=True, error_model="numpy")
+def _rsi_kernel(close, w, out):
+    """RSI за один проход: gain/loss считаются из close на лету, без промежуточных
+    массивов delta/gain/loss, средние ведутся двумя состояниями окна.
+    """
+    n = close.shape[0]
+    gst = np.empty(7)
+    lst = np.empty(7)
+    for i in range(n):
+        s = i + 1 - w
+        if s < 0:
+            s = 0
+        if i == 0 or s >= i:
+            g, l = _gain_loss(close, s)
+            _roll_reset(gst, g)
+            _roll_reset(lst, l)
+            adds_from = s
+        else:
+            if s > 0:
+                g, l = _gain_loss(close, s - 1)
+                _roll_remove(gst, g)
+                _roll_remove(lst, l)
+            adds_from = i
+        for j in range(adds_from, i + 1):
+            g, l = _gain_loss(close, j)
+            _roll_add(gst, g)
+            _roll_add(lst, l)
+        rs = _roll_mean(gst, w) / _roll_mean(lst, w)
+        out[i] = 100 - (100 / (1 + rs))
+
+
+
+@dataclass(frozen=True)
+class _IndicatorParams:
+    """Периоды и alpha индикаторов — читаются из config один раз при импорте."""
+
+    sma_period: int
+    # EMA fast/slow (старый базовый тренд-фильтр), EMA20/50/200 (строгий тренд), MACD 12/26
+    ema_spans: Tuple[int, ...]
+    ema_alphas: np.ndarray
+    signal_alpha: float
+    atr_period: int
+    adx_period: int
+    rsi_period: int
+    dtype: type
+    use_talib: bool
+
+
+def _load_params() -> _IndicatorParams:
+    ema_spans = (
+        int(getattr(cfg, "EMA_FAST_PERIOD", 20)),
+        int(getattr(cfg, "EMA_SLOW_PERIOD", 50)),
+        20,
+        50,
+        200,
+        12,
+        26,
+    )
+    return _IndicatorParams(
+        sma_period=int(getattr(cfg, "SMA_TREND_PERIOD", 200)),
+        ema_spans=ema_spans,
+        ema_alphas=np.array([_ewm_alpha(sp) for sp in ema_spans], dtype=np.float64),
+        signal_alpha=_ewm_alpha(9),
+        atr_period=int(getattr(cfg, "ATR_PERIOD", 14)),
+        adx_period=int(getattr(cfg, "ADX_PERIOD", 14)),
+        rsi_period=int(getattr(cfg, "RSI_PERIOD_SHORT", 7)),
+        dtype=np.float32 if getattr(cfg, "INDICATORS_FLOAT32", False) else np.float64,
+        use_talib=bool(getattr(cfg, "INDICATORS_USE_TALIB", False)) and talib is not None,
+    )
+
+
+_PARAMS = _load_params()
+
+
+# Порядок колонок, которые добавляет compute_indicators (и которые возвращает _compute_all)
+_INDICATOR_COLUMNS = (
+    "SMA_TREND",
+    "EMA_Fast",
+    "EMA_Slow",
+    "EMA20",
+    "EMA50",
+    "EMA200",
+    "MACD",
+    "MACD_Signal",
+    "MACD_Hist",
+    "ATR",
+    "ADX",
+    "RSI",
+)
+# публичное имя: порядок колонок, в котором IndicatorState.values() отдаёт значения
+INDICATOR_COLUMNS = _INDICATOR_COLUMNS
+
+
+# error_model="numpy": деление на 0 даёт inf/NaN (как в pandas), а не ZeroDivisionError
+@njit(cache=True, boundscheck=False, error_model="numpy")
+def _compute_all(high, low, close, ema_alphas, signal_alpha, sma_period, atr_period, adx_period, rsi_period, out):
+    """Все индикаторы по массивам цен за одно обращение к numba.
+
+    ema_alphas — alpha для EMA_Fast, EMA_Slow, EMA20, EMA50, EMA200, MACD 12, MACD 26.
+    Результат пишется в out формы (12, N): строка k — колонка _INDICATOR_COLUMNS[k].
+    Промежуточные массивы имеют dtype out (float64 или float32 при INDICATORS_FLOAT32);
+    накопители EMA и скользящих сумм — скаляры float64.
+    """
+    n = close.shape[0]
+    dt = out.dtype
+
+    # ---- EMA по close: один проход по всем семи ----
+    emas = np.empty((ema_alphas.shape[0], n), dt)
+    _multi_ema(close, ema_alphas, emas)
+    for k in range(5):
+        out[1 + k, :] = emas[k, :]
+
+    macd = out[6]
+    for i in range(n):
+        macd[i] = emas[5, i] - emas[6, i]
+    _multi_ema(macd, np.array([signal_alpha]), out[7:8])
+    for i in range(n):
+        out[8, i] = macd[i] - out[7, i]
+
+    # ---- TR, +DM/-DM: один поэлементный проход ----
+    tr = np.empty(n, dt)
+    plus_dm = np.empty(n, dt)
+    minus_dm = np.empty(n, dt)
+    for i in range(n):
+        hl = abs(high[i] - low[i])
+        if i == 0:
+            # как fmax/max(axis=1) в pandas: NaN предыдущего close пропускается
+            tr[i] = hl
+            plus_dm[i] = 0.0
+            minus_dm[i] = 0.0
+            continue
+        pc = close[i - 1]
+        t = hl
+        hc = abs(high[i] - pc)
+        if hc > t or t != t:
+            t = hc
+        lc = abs(low[i] - pc)
+        if lc > t or t != t:
+            t = lc
+        tr[i] = t
+
+        up = high[i] - high[i - 1]
+        down = low[i - 1] - low[i]
+        plus_dm[i] = up if (up > down and up > 0) else 0.0
+        minus_dm[i] = down if (down > up and down > 0) else 0.0
+
+    # ---- скользящие средние (O(N) каждое) ----
+    # На коротком окне (прогрев, свежие символы) окно не заполняется ни разу:
+    # такие колонки сразу NaN, без проходов скользящих сумм
+    if n < sma_period:
+        out[0, :] = np.nan
+    else:
+        _rolling_mean_kernel(close, sma_period, out[0])
+    if n < atr_period:
+        out[9, :] = np.nan
+    else:
+        _rolling_mean_kernel(tr, atr_period, out[9])
+    if n < rsi_period + 1:
+        out[11, :] = np.nan
+    else:
+        _rsi_kernel(close, rsi_period, out[11])
+
+    # первое значение DX — на баре adx_period - 1, первое ADX — ещё через adx_period - 1
+    if n < 2 * adx_period - 1:
+        out[10, :] = np.nan
+        return
+
+    tr_smooth = np.empty(n, dt)
+    _rolling_mean_kernel(tr, adx_period, tr_smooth)
+    pdm_s = np.empty(n, dt)
+    _rolling_mean_kernel(plus_dm, adx_period, pdm_s)
+    mdm_s = np.empty(n, dt)
+    _rolling_mean_kernel(minus_dm, adx_period, mdm_s)
+    dx = np.empty(n, dt)
+    for i in range(n):
+        plus_di = 100 * pdm_s[i] / tr_smooth[i]
+        minus_di = 100 * mdm_s[i] / tr_smooth[i]
+        # +DI и -DI неотрицательны, поэтому abs у знаменателя не нужен
+        dx[i] = abs(plus_di - minus_di) / (plus_di + minus_di) * 100
+    _rolling_mean_kernel(dx, adx_period, out[10])
+
+
+@njit(cache=True, parallel=True, nogil=True, error_model="numpy")
+def _compute_all_batch(high, low, close, offsets, ema_alphas, signal_alpha,
+                       sma_period, atr_period, adx_period, rsi_period, out):
+    """_compute_all по нескольким рядам, склеенным в один массив.
+
+    Ряд s занимает [offsets[s], offsets[s + 1]); ряды считаются параллельно.
+    out[k, ...] — колонка _INDICATOR_COLUMNS[k].
+    """
+    for s in prange(offsets.shape[0] - 1):
+        a = offsets[s]
+        b = offsets[s + 1]
+        _compute_all(
+            high[a:b], low[a:b], close[a:b], ema_alphas, signal_alpha,
+            sma_period, atr_period, adx_period, rsi_period, out[:, a:b],
+        )
+
+
+def _rmean(a: np.ndarray, w: int) -> np.ndarray:
+    """rolling(w).mean() для ветки без numba: bottleneck.move_mean, если установлен.
+
+    move_mean (C) быстрее pandas, но ведёт сумму без компенсации — значения могут
+    отличаться от pandas/numba в последних знаках. Без bottleneck — pandas.
+    Окно длиннее массива (короткий фрейм на прогреве) — сразу NaN.
+    """
+    if w > a.shape[0]:
+        return np.full(a.shape[0], np.nan)
+    if bn is None:
+        return pd.Series(a).rolling(w).mean().to_numpy()
+    return bn.move_mean(np.asarray(a, dtype=np.float64), window=w, min_count=w)
+
+
+def _compute_all_pandas(high, low, close, ema_spans, sma_period, atr_period, adx_period, rsi_period):
+    """Тот же расчёт без numba: ewm pandas, скользящие средние _rmean и векторный numpy."""
+    close_s = pd.Series(close)
+    emas = [close_s.ewm(span=sp, adjust=False).mean().to_numpy() for sp in ema_spans]
+    macd = emas[5] - emas[6]
+    macd_signal = pd.Series(macd).ewm(span=9, adjust=False).mean().to_numpy()
+
+    # Сдвиги на один бар для close/high/low — один буфер на все три,
+    # переиспользуется в TR, +DM/-DM и RSI
+    prev = np.empty((3, close.shape[0]), dtype=close.dtype)
+    prev[:, :1] = np.nan
+    prev[0, 1:] = close[:-1]
+    prev[1, 1:] = high[:-1]
+    prev[2, 1:] = low[:-1]
+    prev_close, prev_high, prev_low = prev
+
+    # fmax пропускает NaN, как max(axis=1) в pandas: на первом баре TR = high - low
+    tr = np.fmax(np.fmax(np.abs(high - low), np.abs(high - prev_close)), np.abs(low - prev_close))
+
+    up_move = high - prev_high
+    down_move = prev_low - low
+    plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+    minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+
+    delta = close - prev_close
+    gain = np.where(delta < 0, 0.0, delta)
+    loss = -np.where(delta > 0, 0.0, delta)
+
+    # деление на 0 даёт inf/NaN, как и в pandas; предупреждения numpy не нужны
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tr_smooth = _rmean(tr, adx_period)
+        plus_di = 100 * _rmean(plus_dm, adx_period) / tr_smooth
+        minus_di = 100 * _rmean(minus_dm, adx_period) / tr_smooth
+        # DX в одном буфере: |+DI - -DI| / (+DI + -DI) * 100 (DI неотрицательны)
+        den = plus_di + minus_di
+        dx = np.subtract(plus_di, minus_di)
+        np.abs(dx, out=dx)
+        np.divide(dx, den, out=dx)
+        dx *= 100
+        rs = _rmean(gain, rsi_period) / _rmean(loss, rsi_period)
+
+    return (
+        _rmean(close, sma_period),
+        emas[0],
+        emas[1],
+        emas[2],
+        emas[3],
+        emas[4],
+        macd,
+        macd_signal,
+        macd - macd_signal,
+        _rmean(tr, atr_period),
+        _rmean(dx, adx_period),
+        100 - (100 / (1 + rs)),
+    )
 
 
-def compute_indicators(df: pd.DataFrame) -> pd.DataFrame:
+def compute_indicators(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
     """Расчёт набора индикаторов для стратегии.
 
     Ожидает колонки: open, high, low, close, volume.
@@ -15,78 +456,378 @@ def compute_indicators(df: pd.DataFrame) -> pd.DataFrame:
     - ATR
     - ADX
     - RSI (короткий, по умолчанию 7)
+
+    Принимает pandas.DataFrame или (если установлен polars) polars.DataFrame —
+    тогда и возвращается polars.DataFrame.
+
+    inplace=False (по умолчанию): входной df не меняется, возвращается новый
+    фрейм, собранный одним df.assign без предварительной копии всех колонок.
+    inplace=True: колонки добавляются прямо в df, он же и возвращается.
     """
 
+    if pl is not None and isinstance(df, pl.DataFrame):
+        return _compute_indicators_polars(df)
+
     if df is None or len(df) == 0:
         return df
 
-    df = df.copy()
+    p = _PARAMS
+    out, high_a, low_a, close_a = _prepare_inputs(df, p.dtype)
+
+    block = _compute_cols(high_a, low_a, close_a)
+
+    return _attach(df, out, block, inplace)
+
+
+def _compute_cols(high_a: np.ndarray, low_a: np.ndarray, close_a: np.ndarray) -> np.ndarray:
+    """Блок (12, N) индикаторов выбранным способом расчёта; строка k — _INDICATOR_COLUMNS[k]."""
+    p = _PARAMS
+    if p.use_talib:
+        return np.array(_compute_all_talib(high_a, low_a, close_a), dtype=p.dtype)
+    if NUMBA_AVAILABLE:
+        block = np.empty((len(_INDICATOR_COLUMNS), close_a.shape[0]), dtype=p.dtype)
+        _compute_all(
+            high_a, low_a, close_a, p.ema_alphas, p.signal_alpha,
+            p.sma_period, p.atr_period, p.adx_period, p.rsi_period, block,
+        )
+        return block
+    # pandas-ветка считает ewm/rolling в float64 — приводим к запрошенному dtype
+    return np.array(
+        _compute_all_pandas(
+            high_a, low_a, close_a, p.ema_spans,
+            p.sma_period, p.atr_period, p.adx_period, p.rsi_period,
+        ),
+        dtype=p.dtype,
+    )
+
+
+def _compute_all_talib(high_a: np.ndarray, low_a: np.ndarray, close_a: np.ndarray):
+    """Те же колонки через C-функции TA-Lib (ATR/ADX/RSI — сглаживание Уайлдера)."""
+    p = _PARAMS
+    h = np.ascontiguousarray(high_a, dtype=np.float64)
+    l = np.ascontiguousarray(low_a, dtype=np.float64)
+    c = np.ascontiguousarray(close_a, dtype=np.float64)
+    emas = [talib.EMA(c, timeperiod=sp) for sp in p.ema_spans[:5]]
+    macd, macd_signal, macd_hist = talib.MACD(c, fastperiod=12, slowperiod=26, signalperiod=9)
+    return (
+        talib.SMA(c, timeperiod=p.sma_period),
+        emas[0],
+        emas[1],
+        emas[2],
+        emas[3],
+        emas[4],
+        macd,
+        macd_signal,
+        macd_hist,
+        talib.ATR(h, l, c, timeperiod=p.atr_period),
+        talib.ADX(h, l, c, timeperiod=p.adx_period),
+        talib.RSI(c, timeperiod=p.rsi_period),
+    )
+
+
+def _compute_indicators_polars(df: "pl.DataFrame") -> "pl.DataFrame":
+    """compute_indicators для polars.DataFrame без конвертации в pandas.
+
+    Колонки OHLC забираются как numpy-массивы, считаются тем же ядром, а
+    результат добавляется одним with_columns. Нечисловые OHLCV приводятся к
+    Float64 (невалидные значения -> null), как pd.to_numeric(errors="coerce").
+    inplace для polars не поддерживается — фреймы неизменяемые.
+    """
+    if df.height == 0:
+        return df
+
+    p = _PARAMS
+    casts = [
+        pl.col(col).cast(pl.Float64, strict=False)
+        for col in ("open", "high", "low", "close", "volume")
+        if col in df.columns and not df.schema[col].is_numeric()
+    ]
+    if casts:
+        df = df.with_columns(casts)
+
+    def _arr(name: str) -> np.ndarray:
+        # null -> NaN: так же, как пропуски в pandas-ветке
+        values = df.get_column(name).cast(pl.Float64).fill_null(float("nan")).to_numpy()
+        return np.ascontiguousarray(values, dtype=p.dtype)
+
+    high_a, low_a, close_a = _arr("high"), _arr("low"), _arr("close")
+    block = _compute_cols(high_a, low_a, close_a)
+    return df.with_columns([pl.Series(name, block[k]) for k, name in enumerate(_INDICATOR_COLUMNS)])
+
+
+def compute_indicators_batch(dfs: List[pd.DataFrame], inplace: bool = False) -> List[pd.DataFrame]:
+    """compute_indicators для списка фреймов (обычно — по одному на символ).
+
+    С numba все ряды склеиваются в один массив со смещениями и считаются
+    ядром _compute_all_batch параллельно по символам (prange, без GIL).
+    Результат тот же, что у compute_indicators для каждого фрейма по отдельности.
+    """
+    p = _PARAMS
+    if not NUMBA_AVAILABLE or p.use_talib:
+        return [compute_indicators(df, inplace=inplace) for df in dfs]
+
+    idx = [i for i, df in enumerate(dfs) if df is not None and len(df) > 0]
+    prepared = [_prepare_inputs(dfs[i], p.dtype) for i in idx]
+    offsets = np.zeros(len(prepared) + 1, dtype=np.int64)
+    for j, (_, h, _, _) in enumerate(prepared):
+        offsets[j + 1] = offsets[j] + h.shape[0]
+
+    result = list(dfs)
+    if not prepared:
+        return result
+    high = np.concatenate([x[1] for x in prepared])
+    low = np.concatenate([x[2] for x in prepared])
+    close = np.concatenate([x[3] for x in prepared])
+    packed = np.empty((len(_INDICATOR_COLUMNS), close.shape[0]), dtype=close.dtype)
+    _compute_all_batch(
+        high, low, close, offsets, p.ema_alphas, p.signal_alpha,
+        p.sma_period, p.atr_period, p.adx_period, p.rsi_period, packed,
+    )
+    for j, i in enumerate(idx):
+        a, b = offsets[j], offsets[j + 1]
+        result[i] = _attach(dfs[i], prepared[j][0], packed[:, a:b], inplace)
+    return result
+
 
+def _prepare_inputs(df: pd.DataFrame, dtype):
+    """Привести OHLCV к числам (только нечисловые колонки) и достать high/low/close.
+
+    Возвращает (dict приведённых колонок, high, low, close) — массивы непрерывные, dtype.
+    """
+    out = {}
     for col in ["open", "high", "low", "close", "volume"]:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-
-    close = df["close"]
-    high = df["high"]
-    low = df["low"]
-
-    # ---------------- SMA TREND ----------------
-    sma_period = int(getattr(cfg, "SMA_TREND_PERIOD", 200))
-    df["SMA_TREND"] = close.rolling(sma_period).mean()
-
-    # ---------------- EMA fast/slow (старый базовый тренд-фильтр) ----------------
-    ema_fast_period = int(getattr(cfg, "EMA_FAST_PERIOD", 20))
-    ema_slow_period = int(getattr(cfg, "EMA_SLOW_PERIOD", 50))
-    df["EMA_Fast"] = close.ewm(span=ema_fast_period, adjust=False).mean()
-    df["EMA_Slow"] = close.ewm(span=ema_slow_period, adjust=False).mean()
-
-    # ---------------- EMA20 / EMA50 / EMA200 (для строгого тренда, вариант C) -----
-    df["EMA20"] = close.ewm(span=20, adjust=False).mean()
-    df["EMA50"] = close.ewm(span=50, adjust=False).mean()
-    df["EMA200"] = close.ewm(span=200, adjust=False).mean()
-
-    # ---------------- MACD (12/26/9) ---------------------------------------------
-    ema_fast_macd = close.ewm(span=12, adjust=False).mean()
-    ema_slow_macd = close.ewm(span=26, adjust=False).mean()
-    macd = ema_fast_macd - ema_slow_macd
-    macd_signal = macd.ewm(span=9, adjust=False).mean()
-    df["MACD"] = macd
-    df["MACD_Signal"] = macd_signal
-    df["MACD_Hist"] = macd - macd_signal
-
-    # ---------------- ATR --------------------------------------------------------
-    atr_period = int(getattr(cfg, "ATR_PERIOD", 14))
-    prev_close = close.shift(1)
-    tr1 = (high - low).abs()
-    tr2 = (high - prev_close).abs()
-    tr3 = (low - prev_close).abs()
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    df["ATR"] = tr.rolling(atr_period).mean()
-
-    # ---------------- ADX --------------------------------------------------------
-    adx_period = int(getattr(cfg, "ADX_PERIOD", 14))
-    up_move = high - high.shift(1)
-    down_move = low.shift(1) - low
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+            out[col] = pd.to_numeric(df[col], errors="coerce")
 
-    plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
-    minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+    def _col(name: str) -> pd.Series:
+        return out[name] if name in out else df[name]
 
-    tr_smooth = tr.rolling(adx_period).mean()
-    plus_di = 100 * pd.Series(plus_dm, index=df.index).rolling(adx_period).mean() / tr_smooth
-    minus_di = 100 * pd.Series(minus_dm, index=df.index).rolling(adx_period).mean() / tr_smooth
+    close_a = np.ascontiguousarray(_col("close").to_numpy(dtype=dtype))
+    high_a = np.ascontiguousarray(_col("high").to_numpy(dtype=dtype))
+    low_a = np.ascontiguousarray(_col("low").to_numpy(dtype=dtype))
+    return out, high_a, low_a, close_a
 
-    dx = (plus_di - minus_di).abs() / (plus_di + minus_di).abs() * 100
-    df["ADX"] = dx.rolling(adx_period).mean()
 
-    # ---------------- RSI (короткий, по умолчанию 7) ----------------------------
-    rsi_period = int(getattr(cfg, "RSI_PERIOD_SHORT", 7))
-    delta = close.diff()
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
+def _attach(df: pd.DataFrame, out: dict, block: np.ndarray, inplace: bool) -> pd.DataFrame:
+    """Добавить блок индикаторов (12, N) и приведённые OHLCV из out к df.
+
+    Если колонок индикаторов в df ещё нет, блок подклеивается одним pd.concat
+    как единый float-блок (block.T — F-порядок, pandas хранит его без копии).
+    Иначе колонки перезаписываются на своих местах, как при df[name] = ...
+    """
+    if inplace:
+        for name, values in out.items():
+            df[name] = values
+        for k, name in enumerate(_INDICATOR_COLUMNS):
+            df[name] = block[k]
+        return df
+
+    base = df.assign(**out) if out else df
+    if not any(name in df.columns for name in _INDICATOR_COLUMNS):
+        ind = pd.DataFrame(block.T, index=df.index, columns=list(_INDICATOR_COLUMNS), copy=False)
+        return pd.concat([base, ind], axis=1)
+    return base.assign(**{name: block[k] for k, name in enumerate(_INDICATOR_COLUMNS)})
+
+
+# ======================================================================
+# Инкрементальный (online) расчёт: O(1) на новый бар
+# ======================================================================
+# Скользящие окна состояния IndicatorState (строки _ON_* в массивах rst/rbuf)
+_ON_SMA, _ON_ATR, _ON_TR_ADX, _ON_PDM, _ON_MDM, _ON_DX, _ON_GAIN, _ON_LOSS = range(8)
+
+
+@njit(cache=True)
+def _ema_step(weighted, old_wt, k0, k1, alphas, cur, first, nobs):
+    """Один шаг _multi_ema для слотов [k0, k1). Возвращает новое число наблюдений."""
+    is_obs = cur == cur
+    if first:
+        for k in range(k0, k1):
+            weighted[k] = cur
+            old_wt[k] = 1.0
+        return 1 if is_obs else 0
+    if is_obs:
+        nobs += 1
+    for k in range(k0, k1):
+        w = weighted[k]
+        if w == w:
+            new_wt = alphas[k - k0]
+            old_wt[k] *= 1.0 - new_wt
+            if is_obs:
+                if w != cur:
+                    w = old_wt[k] * w + new_wt * cur
+                    w /= old_wt[k] + new_wt
+                    weighted[k] = w
+                old_wt[k] = 1.0
+        elif is_obs:
+            weighted[k] = cur
+    return nobs
+
+
+@njit(cache=True)
+def _roll_step(st, buf, i, w, v):
+    """Один шаг _rolling_mean_kernel: бар i со значением v, кольцевой буфер окна buf."""
+    s = i + 1 - w
+    if s < 0:
+        s = 0
+    if i == 0 or s >= i:
+        _roll_reset(st, v)
+    elif s > 0:
+        _roll_remove(st, buf[(i - w) % w])
+    buf[i % w] = v
+    _roll_add(st, v)
+    return _roll_mean(st, w)
+
+
+@njit(cache=True, error_model="numpy")
+def _indicator_step(h, l, c, i, prev, weighted, old_wt, nobs, ema_alphas, signal_alpha,
+                    windows, rst, rbuf, out):
+    """Бар i (high, low, close) -> out в порядке _INDICATOR_COLUMNS.
+
+    Та же арифметика, что и в _compute_all, поэтому значения совпадают побитово.
+    prev = [close, high, low] предыдущего бара, nobs = [наблюдения close, наблюдения MACD].
+    """
+    first = i == 0
+    m = ema_alphas.shape[0]
+    nobs[0] = _ema_step(weighted, old_wt, 0, m, ema_alphas, c, first, nobs[0])
+    for k in range(5):
+        out[1 + k] = weighted[k] if nobs[0] >= 1 else np.nan
+    e12 = weighted[5] if nobs[0] >= 1 else np.nan
+    e26 = weighted[6] if nobs[0] >= 1 else np.nan
+    macd = e12 - e26
+    sig_alpha = np.empty(1)
+    sig_alpha[0] = signal_alpha
+    nobs[1] = _ema_step(weighted, old_wt, m, m + 1, sig_alpha, macd, first, nobs[1])
+    sig = weighted[m] if nobs[1] >= 1 else np.nan
+    out[6] = macd
+    out[7] = sig
+    out[8] = macd - sig
+
+    hl = abs(h - l)
+    if first:
+        tr = hl
+        pdm = 0.0
+        mdm = 0.0
+        gain = np.nan
+        loss = np.nan
+    else:
+        pc = prev[0]
+        tr = hl
+        hc = abs(h - pc)
+        if hc > tr or tr != tr:
+            tr = hc
+        lc = abs(l - pc)
+        if lc > tr or tr != tr:
+            tr = lc
+        up = h - prev[1]
+        down = prev[2] - l
+        pdm = up if (up > down and up > 0) else 0.0
+        mdm = down if (down > up and down > 0) else 0.0
+        d = c - pc
+        gain = 0.0 if d < 0 else d
+        loss = -(0.0 if d > 0 else d)
+
+    out[0] = _roll_step(rst[_ON_SMA], rbuf[_ON_SMA], i, windows[_ON_SMA], c)
+    out[9] = _roll_step(rst[_ON_ATR], rbuf[_ON_ATR], i, windows[_ON_ATR], tr)
+    tr_s = _roll_step(rst[_ON_TR_ADX], rbuf[_ON_TR_ADX], i, windows[_ON_TR_ADX], tr)
+    pdm_s = _roll_step(rst[_ON_PDM], rbuf[_ON_PDM], i, windows[_ON_PDM], pdm)
+    mdm_s = _roll_step(rst[_ON_MDM], rbuf[_ON_MDM], i, windows[_ON_MDM], mdm)
+    plus_di = 100 * pdm_s / tr_s
+    minus_di = 100 * mdm_s / tr_s
+    dx = abs(plus_di - minus_di) / (plus_di + minus_di) * 100
+    out[10] = _roll_step(rst[_ON_DX], rbuf[_ON_DX], i, windows[_ON_DX], dx)
+    rs = (_roll_step(rst[_ON_GAIN], rbuf[_ON_GAIN], i, windows[_ON_GAIN], gain)
+          / _roll_step(rst[_ON_LOSS], rbuf[_ON_LOSS], i, windows[_ON_LOSS], loss))
+    out[11] = 100 - (100 / (1 + rs))
+
+    prev[0] = c
+    prev[1] = h
+    prev[2] = l
+
+
+class IndicatorState:
+    """Состояние индикаторов для live: новый бар обновляется за O(1), без пересчёта истории.
+
+    Хранит скаляры EMA (7 по close + сигнальная MACD), кольцевые буферы и
+    компенсированные суммы скользящих окон (SMA/ATR/ADX/RSI) и предыдущий бар.
+    Значения совпадают с compute_indicators по той же истории (считается в float64;
+    INDICATORS_USE_TALIB здесь не учитывается — всегда встроенный расчёт).
+
+    Использование:
+        state = IndicatorState.from_frame(df_history)
+        values = state.update(o, h, l, c, v)   # dict колонка -> значение
+    """
+
+    def __init__(self) -> None:
+        p = _PARAMS
+        n_ema = p.ema_alphas.shape[0]
+        self._weighted = np.full(n_ema + 1, np.nan)
+        self._old_wt = np.ones(n_ema + 1)
+        self._nobs = np.zeros(2, dtype=np.int64)
+        self._prev = np.full(3, np.nan)
+        self._windows = np.array(
+            [p.sma_period, p.atr_period, p.adx_period, p.adx_period, p.adx_period,
+             p.adx_period, p.rsi_period, p.rsi_period],
+            dtype=np.int64,
+        )
+        self._rst = np.zeros((self._windows.shape[0], 7))
+        self._rbuf = np.full((self._windows.shape[0], int(self._windows.max())), np.nan)
+        self._out = np.empty(len(_INDICATOR_COLUMNS))
+        self.n_bars = 0
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "IndicatorState":
+        """Прогнать историю df (high/low/close) через состояние и вернуть его."""
+        state = cls()
+        if df is None or len(df) == 0:
+            return state
+        _, high_a, low_a, close_a = _prepare_inputs(df, np.float64)
+        for h, l, c in zip(high_a, low_a, close_a):
+            state._step(h, l, c)
+        return state
+
+    def _step(self, h: float, l: float, c: float) -> None:
+        p = _PARAMS
+        if NUMBA_AVAILABLE:
+            _indicator_step(
+                float(h), float(l), float(c), self.n_bars, self._prev, self._weighted, self._old_wt,
+                self._nobs, p.ema_alphas, p.signal_alpha, self._windows, self._rst, self._rbuf, self._out,
+            )
+        else:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                _indicator_step(
+                    np.float64(h), np.float64(l), np.float64(c), self.n_bars, self._prev, self._weighted,
+                    self._old_wt, self._nobs, p.ema_alphas, p.signal_alpha, self._windows, self._rst,
+                    self._rbuf, self._out,
+                )
+        self.n_bars += 1
+
+    def update(self, o: float, h: float, l: float, c: float, v: float) -> Dict[str, float]:
+        """Добавить закрытый бар и вернуть значения индикаторов на нём.
+
+        open и volume в текущем наборе индикаторов не участвуют (сигнатура под OHLCV).
+        """
+        self._step(h, l, c)
+        return self.values()
+
+    def values(self) -> Dict[str, float]:
+        """Значения индикаторов на последнем обработанном баре."""
+        if self.n_bars == 0:
+            return {name: float("nan") for name in _INDICATOR_COLUMNS}
+        return {name: float(x) for name, x in zip(_INDICATOR_COLUMNS, self._out)}
+
+
+def _warmup() -> None:
+    """Загрузить/скомпилировать ядра при импорте, чтобы первый бар не ждал JIT.
+
+    Прогреваются и пакетный расчёт, и пошаговый IndicatorState (live-путь).
+    """
+    x = np.linspace(1.0, 2.0, 8)
+    out = np.empty((len(_INDICATOR_COLUMNS), x.shape[0]))
+    _compute_all(x + 0.1, x - 0.1, x, np.full(7, 0.5), 0.2, 3, 3, 3, 3, out)
+    state = IndicatorState()
+    for c in x[:3]:
+        state.update(c, c + 0.1, c - 0.1, c, 1.0)
 
-    avg_gain = gain.rolling(rsi_period).mean()
-    avg_loss = loss.rolling(rsi_period).mean()
-    rs = avg_gain / avg_loss
-    df["RSI"] = 100 - (100 / (1 + rs))
 
-    return df
+if NUMBA_AVAILABLE:
+    _warmup()
@@ -0,0 +1,115 @@
+"""Буфер закрытых свечей OHLCV для LIVE-раннера.
+
+Свечи хранятся в типизированном структурированном массиве NumPy фиксированной
+ёмкости: добавление — запись по индексу головы, без словарей и DataFrame на каждую
+свечу. DataFrame собирается только по запросу (один раз за тик стратегии).
+Дополнительные float-колонки (например, индикаторы) хранятся в тех же строках.
+
+Инвариант, который поддерживает вызывающий код: open_time строго возрастает
+(повтор бара — replace_last, а не append), поэтому окно не нужно чистить от
+дубликатов и сортировать.
+"""
+
+from typing import Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+OHLCV_DTYPE = np.dtype([
+    ("open_time", "i8"),
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("volume", "f8"),
+])
+
+
+class KlineBuffer:
+    """Последние ``maxlen`` свечей символа.
+
+    Массив выделяется с запасом (2 * maxlen): пока есть место, свеча пишется в
+    следующую ячейку; когда массив заполнен, последние maxlen - 1 свечей
+    сдвигаются в начало. Сдвиг случается раз в maxlen добавлений — амортизированно O(1).
+
+    extra — имена дополнительных float-колонок; при добавлении свечи они NaN,
+    значения записываются через set_extra.
+    """
+
+    __slots__ = ("maxlen", "extra", "_arr", "_n")
+
+    def __init__(self, maxlen: int, extra: Sequence[str] = ()) -> None:
+        if maxlen <= 0:
+            raise ValueError("maxlen must be positive")
+        self.maxlen = int(maxlen)
+        self.extra = tuple(extra)
+        dtype = np.dtype(OHLCV_DTYPE.descr + [(name, "f8") for name in self.extra]) if self.extra else OHLCV_DTYPE
+        self._arr = np.empty(2 * self.maxlen, dtype=dtype)
+        self._n = 0
+
+    def __len__(self) -> int:
+        return min(self._n, self.maxlen)
+
+    def append(self, open_time: int, o: float, h: float, l: float, c: float, v: float) -> None:
+        """Добавить закрытую свечу."""
+        i = self._n
+        if i == self._arr.shape[0]:
+            keep = self.maxlen - 1
+            self._arr[:keep] = self._arr[i - keep:i]
+            i = keep
+        self._arr[i] = (open_time, o, h, l, c, v) + (np.nan,) * len(self.extra)
+        self._n = i + 1
+
+    @property
+    def last_open_time(self) -> int | None:
+        """open_time последней свечи (None, если буфер пуст)."""
+        return int(self._arr["open_time"][self._n - 1]) if self._n else None
+
+    def replace_last(self, open_time: int, o: float, h: float, l: float, c: float, v: float) -> None:
+        """Перезаписать последнюю свечу (повтор того же бара); extra снова NaN."""
+        if not self._n:
+            raise IndexError("replace_last on empty buffer")
+        self._arr[self._n - 1] = (open_time, o, h, l, c, v) + (np.nan,) * len(self.extra)
+
+    def extend(self, rows: Iterable[Sequence]) -> None:
+        """Добавить свечи кортежами (open_time, open, high, low, close, volume)."""
+        for r in rows:
+            self.append(*r)
+
+    def extend_records(self, rec: np.ndarray) -> None:
+        """Добавить свечи массивом с полями OHLCV_DTYPE — копированием по колонкам, без цикла."""
+        rec = rec[-self.maxlen:]
+        k = rec.shape[0]
+        if self._n + k > self._arr.shape[0]:
+            keep = min(len(self), self.maxlen - k)
+            self._arr[:keep] = self._arr[self._n - keep:self._n]
+            self._n = keep
+        block = self._arr[self._n:self._n + k]
+        for name in OHLCV_DTYPE.names:
+            block[name] = rec[name]
+        for name in self.extra:
+            block[name] = np.nan
+        self._n += k
+
+    def set_extra(self, pos: int, values: Sequence[float]) -> None:
+        """Записать дополнительные колонки свечи pos окна (отрицательный pos — с конца)."""
+        window = self.view()
+        j = pos % window.shape[0]
+        row = window[j:j + 1]
+        for name, x in zip(self.extra, values):
+            row[name] = x
+
+    def view(self) -> np.ndarray:
+        """Окно последних свечей — представление массива без копии."""
+        return self._arr[max(0, self._n - self.maxlen):self._n]
+
+    def to_frame(self, last: int | None = None) -> pd.DataFrame:
+        """DataFrame с колонками open_time/open/high/low/close/volume и extra.
+
+        last — взять только последние last свечей окна (None — всё окно).
+        """
+        window = self.view()
+        if last:
+            window = window[-last:]
+        return pd.DataFrame.from_records(window)
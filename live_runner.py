@@ -14,28 +14,140 @@
 
 import asyncio
 import logging
-from logger_setup import setup_logging
+from logger_setup import setup_logging, shutdown_logging
 import os
 import signal
 import time
-from typing import Dict, List
+from collections import deque
+from dataclasses import dataclass, field
+from functools import reduce
+from operator import or_
+from typing import Deque, Dict, List, Tuple
 
+import numpy as np
 import pandas as pd
 
+try:  # uvloop — опционально: быстрее стандартного цикла asyncio (не поддерживается на Windows)
+    import uvloop  # type: ignore
+except ImportError:  # pragma: no cover
+    uvloop = None
+
 import config
 
 from state_manager import StateManager
 from telegram_notifier import TelegramNotifier
 from broker_futures import LiveFuturesBroker
 from binance_ws_manager import BinanceWSManager
-from strategy import signal_from_indicators
+from strategy import reload_strategy_config, signal_from_bars, signal_lookback, signal_prefilter
+from strategies.base import BarWindow
 from risk import RiskManager
 from position import PositionState
-from indicators import compute_indicators  # type: ignore
+from indicators import INDICATOR_COLUMNS, IndicatorState, compute_indicators  # type: ignore
+from kline_buffer import OHLCV_DTYPE, KlineBuffer
 
 
 logger = logging.getLogger(__name__)
 
+
+def _kline_row(k: dict) -> Tuple[int, float, float, float, float, float]:
+    """Строка OHLCV (open_time, open, high, low, close, volume) из закрытой kline WebSocket.
+
+    Числа уже приведены BinanceWSManager при разборе кадра (см. KlineCallback).
+    """
+    return k["t"], k["o"], k["h"], k["l"], k["c"], k["v"]
+
+
+def _klines_to_records(raw: list) -> np.ndarray:
+    """REST klines -> массив OHLCV_DTYPE одним приведением по колонкам.
+
+    raw: [ [open_time, open, high, low, close, volume, close_time, ...], ... ] (числа строками).
+    Строки с NaN/inf отбрасываются; нечисловое значение — ValueError (preload символа пропускается).
+    Результат упорядочен по open_time без повторов (при повторе остаётся последний),
+    как того требует KlineBuffer.
+    """
+    a = np.asarray(raw, dtype=object)
+    if a.ndim != 2 or a.shape[0] == 0 or a.shape[1] < 6:
+        return np.empty(0, dtype=OHLCV_DTYPE)
+    ohlcv = a[:, 1:6].astype(np.float64)
+    ok = np.isfinite(ohlcv).all(axis=1)
+    rec = np.empty(int(ok.sum()), dtype=OHLCV_DTYPE)
+    rec["open_time"] = a[ok, 0].astype(np.int64)
+    for j, name in enumerate(OHLCV_DTYPE.names[1:]):
+        rec[name] = ohlcv[ok, j]
+    t = rec["open_time"]
+    if t.shape[0] > 1 and not (t[1:] > t[:-1]).all():
+        rec = rec[np.argsort(t, kind="stable")]
+        t = rec["open_time"]
+        rec = rec[np.append(t[1:] != t[:-1], True)]
+    return rec
+
+
+# H1 индикаторы, которые переносятся на M15 с префиксом HTF_
+_HTF_COLS = ("SMA_TREND", "EMA20", "EMA50", "EMA200", "ATR", "ADX", "RSI")
+_HTF_RENAME = {col: f"HTF_{col}" for col in _HTF_COLS}
+# Баров H1 в буфере для прогрева HTF-индикаторов: EMA200 пересчитывается с нуля по буферу,
+# и при 4×200 барах вклад стартового значения ~e^-8 — результат совпадает с бэктестом
+_HTF_WARMUP_BARS = 4 * 200
+
+# Биты расхождения позиции биржа / локальный стейт (сверка в heartbeat)
+MISMATCH_EXISTS = 1  # позиция есть только с одной стороны
+MISMATCH_QTY = 2  # разный размер или направление
+MISMATCH_PRICE = 4  # цена входа отличается больше чем на _MISMATCH_PRICE_TOL
+_MISMATCH_NAMES = ((MISMATCH_EXISTS, "EXISTS"), (MISMATCH_QTY, "QTY"), (MISMATCH_PRICE, "PRICE"))
+# торговлю отключают только расхождения по наличию и размеру: цена входа локально —
+# цена сигнала, а не средняя цена исполнения, и с биржевой может расходиться на проскальзывание
+_MISMATCH_DISABLE = MISMATCH_EXISTS | MISMATCH_QTY
+_MISMATCH_QTY_TOL = 1e-6  # относительная погрешность размера (округления float)
+_MISMATCH_PRICE_TOL = 0.005
+
+
+def _mismatch_names(mask: int) -> str:
+    """Имена битов маски расхождения через "|" (для логов и уведомлений)."""
+    return "|".join(name for bit, name in _MISMATCH_NAMES if mask & bit)
+
+
+def _put_kline(buf: KlineBuffer, row: Tuple[int, float, float, float, float, float], tf: str, symbol: str) -> bool | None:
+    """Добавить свечу, сохраняя строго возрастающий open_time в буфере.
+
+    True — новый бар, False — повтор последнего бара (перезаписан, как keep="last"),
+    None — бар старее последнего (пропущен).
+    """
+    last = buf.last_open_time
+    if last is not None and row[0] <= last:
+        if row[0] == last:
+            logger.warning("[MTF] duplicate %s kline, replacing last bar (symbol=%s)", tf, symbol)
+            buf.replace_last(*row)
+            return False
+        logger.warning("[MTF] out-of-order %s kline ignored (symbol=%s, t=%s < %s)", tf, symbol, row[0], last)
+        return None
+    buf.append(*row)
+    return True
+
+
+@dataclass(slots=True)
+class SymbolState:
+    """Всё live-состояние одного символа: одна запись вместо отдельного словаря на каждое поле."""
+
+    # окна свечей M15 (с колонками индикаторов) и H1
+    buf_15m: KlineBuffer
+    buf_1h: KlineBuffer
+    # сколько баров M15 получено за всё время: номер бара для open_time позиции и
+    # тайм-стопа (длина окна после заполнения буфера не растёт)
+    bars_15m: int = 0
+    # инкрементальные индикаторы M15 и сколько баров (из bars_15m) они уже учли
+    ind_15m: IndicatorState | None = None
+    ind_bars_15m: int = 0
+    # open_time баров H1 и HTF_* индикаторы (массивы); None — пересчитать (пришёл новый бар H1)
+    htf: Tuple[np.ndarray, Dict[str, np.ndarray]] | None = None
+    # время последнего открытия (анти-луп) и последней полученной свечи (watchdog WS), monotonic
+    last_open: float | None = None
+    last_kline: float | None = None
+    # тики символа идут по очереди; seq — счётчик принятых свечей M15, ticked_seq — обработанный тиком
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    kline_seq: int = 0
+    ticked_seq: int = -1
+
+
 class LiveRunner:
     def __init__(self) -> None:
         self.symbols: List[str] = getattr(config, "FUTURES_SYMBOLS", [])
@@ -44,9 +156,16 @@ class LiveRunner:
         self._broker: LiveFuturesBroker | None = None
         self._ws_manager: BinanceWSManager | None = None
 
-        # локальные хранилища данных по символам и таймфреймам (LTF/HTF)
-        self._data_15m: Dict[str, pd.DataFrame] = {}
-        self._data_1h: Dict[str, pd.DataFrame] = {}
+        # локальные хранилища данных по символам и таймфреймам (LTF/HTF):
+        # KlineBuffer (структурированный массив NumPy), DataFrame собирается только в _run_strategy_if_ready
+        # (не меньше прогрева стратегии: 200 баров M15; H1 — _HTF_WARMUP_BARS, чтобы HTF_EMA200
+        # сошлась так же, как в бэктесте на полной истории)
+        self._maxlen_15m: int = max(int(getattr(config, "PRELOAD_15M_LIMIT", 500)), 200)
+        self._maxlen_1h: int = max(int(getattr(config, "PRELOAD_1H_LIMIT", 200)), _HTF_WARMUP_BARS)
+        # состояние по символам (буферы, кэши индикаторов, таймстемпы); кэш индикаторов:
+        # M15 досчитываются по новым барам через IndicatorState прямо в колонки буфера,
+        # H1 (с префиксом HTF_) пересчитываются только при закрытии бара H1
+        self._symbols_state: Dict[str, SymbolState] = {s: self._new_symbol_state() for s in self.symbols}
 
         # риск-менеджер и локальный кэш позиций
         self._risk = RiskManager()
@@ -56,14 +175,71 @@ class LiveRunner:
         # ===== Protective layer (Step9) =====
         # флаг, запрещающий открытие новых позиций (по рискам / несоответствию позиций)
         self._trading_disabled: bool = False
-        # таймстемпы открытий позиций (для лимита сделок в час)
-        self._trade_timestamps: List[float] = []
-        # время последнего открытия по символу (анти-луп)
-        self._last_open_time: Dict[str, float] = {}
-        # время последней полученной свечи по символу (watchdog WS)
-        self._last_kline_ts: Dict[str, float] = {}
+        # таймстемпы открытий позиций (для лимита сделок в час), по возрастанию.
+        # Все интервальные проверки ведутся по time.monotonic(): переводы системных часов на них не влияют
+        self._trade_timestamps: Deque[float] = deque()
+        # кэш equity: (значение, момент истечения по time.monotonic()); сбрасывается после ордеров
+        self._equity_cache: Tuple[float, float] | None = None
+        # параллельные тики: символы обрабатываются независимо (каскад SL по разным символам
+        # не ждёт ордеров друг друга), один символ — по очереди под SymbolState.lock
+        self._tick_tasks: set = set()
+        # остановка: start() ждёт это событие вместо «вечного» sleep
+        self._shutdown_event = asyncio.Event()
+        # открытие позиций — последовательно (общие лимиты); ордера — не больше ORDER_CONCURRENCY сразу
+        self._entry_lock = asyncio.Lock()
+        self._order_sem = asyncio.Semaphore(max(1, int(getattr(config, "ORDER_CONCURRENCY", 8))))
+        # параметры торговли из config, которые нужны на каждом тике
+        self.reload_config()
+
+    def _new_symbol_state(self) -> SymbolState:
+        return SymbolState(
+            buf_15m=KlineBuffer(self._maxlen_15m, extra=INDICATOR_COLUMNS),
+            buf_1h=KlineBuffer(self._maxlen_1h),
+        )
+
+    def _sym(self, symbol: str) -> SymbolState:
+        """Состояние символа (создаётся при первом обращении, если символа нет в FUTURES_SYMBOLS)."""
+        st = self._symbols_state.get(symbol)
+        if st is None:
+            st = self._symbols_state[symbol] = self._new_symbol_state()
+        return st
+
+    def reload_config(self) -> None:
+        """Снять значения config, читаемые на каждом тике, в типизированные атрибуты.
+
+        Вызывается из __init__; если config поменяли на лету — вызвать повторно.
+        """
+        self._risk.reload_config()
+        self._risk_per_trade = float(getattr(config, "RISK_PER_TRADE", 0.01))
+        self._leverage = int(getattr(config, "FUTURES_LEVERAGE_DEFAULT", 5))
+        self._atr_sl_mult = float(getattr(config, "ATR_SL_MULT", 4.0))
+        self._atr_tp_mult_1 = float(getattr(config, "ATR_TP_MULT_1", 8.0))
+        self._atr_ts_mult = float(getattr(config, "ATR_TS_MULT", 4.0))
+        try:
+            self._hard_dd_pct = float(getattr(config, "HARD_MAX_DRAWDOWN_PCT", 0.0) or 0.0)
+        except Exception:
+            self._hard_dd_pct = 0.0
+        self._mtf_max_bars = int(getattr(config, "MTF_MAX_BARS_IN_POSITION", 0) or 0)
+        try:
+            self._min_reopen_sec = int(getattr(config, "MIN_REOPEN_INTERVAL_SEC", 0) or 0)
+        except Exception:
+            self._min_reopen_sec = 0
         # лимит сделок в час (0 = без лимита)
-        self._max_trades_per_hour: int = int(getattr(config, "MAX_TRADES_PER_HOUR", 0) or 0)
+        self._max_trades_per_hour = int(getattr(config, "MAX_TRADES_PER_HOUR", 0) or 0)
+        # эффективный лимит одновременных позиций (для MTF-стратегии — не больше MTF_MAX_OPEN_POSITIONS)
+        max_positions = int(getattr(config, "MAX_OPEN_POSITIONS", 3))
+        strategy_name = str(getattr(config, "STRATEGY_NAME", "htf_breakout")).lower()
+        mtf_max_pos = int(getattr(config, "MTF_MAX_OPEN_POSITIONS", max_positions))
+        if strategy_name in {"mtf_breakout", "mtf"}:
+            self._max_open_positions = min(max_positions, mtf_max_pos)
+        else:
+            self._max_open_positions = max_positions
+        self._equity_cache_ttl = float(getattr(config, "EQUITY_CACHE_TTL", 30.0) or 0.0)
+        # параметры стратегии тоже снимаются из config один раз
+        reload_strategy_config()
+        # сколько последних баров нужно активной стратегии (None — вся история)
+        self._signal_lookback = signal_lookback()
+
     async def _init_broker(self) -> None:
         """Инициализация брокера и проверка API ключей."""
         api_key = getattr(config, "BINANCE_API_KEY", "") or getattr(config, "API_KEY", "")
@@ -85,72 +261,79 @@ class LiveRunner:
             raise RuntimeError("Broker is not initialized")
 
         limit_15 = int(getattr(config, "PRELOAD_15M_LIMIT", 500))
-        limit_1h = int(getattr(config, "PRELOAD_1H_LIMIT", 200))
+        # H1 грузим на весь буфер: HTF-индикаторы пересчитываются по нему целиком
+        limit_1h = self._maxlen_1h
 
-        async def fetch_df(symbol: str, interval: str, limit: int) -> pd.DataFrame:
-            raw = await self._broker.client.futures_klines(symbol=symbol, interval=interval, limit=limit)
-            # raw: [ [open_time, open, high, low, close, volume, close_time, qav, trades, tbbav, tbqav, ignore], ... ]
-            rows = []
-            for r in raw:
-                try:
-                    rows.append({
-                        "open_time": int(r[0]),
-                        "open": float(r[1]),
-                        "high": float(r[2]),
-                        "low": float(r[3]),
-                        "close": float(r[4]),
-                        "volume": float(r[5]),
-                    })
-                except Exception:
-                    continue
-            df = pd.DataFrame(rows)
-            return df
+        # запросы идут параллельно, но не больше PRELOAD_CONCURRENCY одновременно (лимит веса Binance)
+        rest_sem = asyncio.Semaphore(max(1, int(getattr(config, "PRELOAD_CONCURRENCY", 8))))
 
-        logger.info("[RUNNER] preloading history via REST: 15m=%d, 1h=%d (per symbol)", limit_15, limit_1h)
-        for sym in self.symbols:
+        async def fetch_rows(symbol: str, interval: str, limit: int) -> np.ndarray:
+            async with rest_sem:
+                raw = await self._broker.client.futures_klines(symbol=symbol, interval=interval, limit=limit)
+            return _klines_to_records(raw)
+
+        async def load(sym: str) -> None:
             try:
-                df15 = await fetch_df(sym, "15m", limit_15)
-                df1h = await fetch_df(sym, "1h", limit_1h)
-                if not df15.empty:
-                    self._data_15m[sym] = df15
-                if not df1h.empty:
-                    self._data_1h[sym] = df1h
-                logger.info("[RUNNER] preload %s: 15m=%d 1h=%d", sym, len(df15), len(df1h))
+                rows15, rows1h = await asyncio.gather(
+                    fetch_rows(sym, "15m", limit_15),
+                    fetch_rows(sym, "1h", limit_1h),
+                )
+                st = self._sym(sym)
+                if len(rows15):
+                    st.buf_15m.extend_records(rows15)
+                    st.bars_15m += len(rows15)
+                if len(rows1h):
+                    st.buf_1h.extend_records(rows1h)
+                logger.info("[RUNNER] preload %s: 15m=%d 1h=%d", sym, len(rows15), len(rows1h))
             except Exception as e:
                 logger.exception("[RUNNER] preload failed for %s: %s", sym, e)
 
+        logger.info("[RUNNER] preloading history via REST: 15m=%d, 1h=%d (per symbol)", limit_15, limit_1h)
+        await asyncio.gather(*(load(sym) for sym in self.symbols))
+
     async def _on_kline_15m(self, k: dict) -> None:
         """Колбек на приход новых kline M15.
 
         Здесь мы смотрим только на закрытые свечи (k['x'] == True),
-        обновляем локальный DataFrame и запускаем логику.
+        добавляем строку в буфер символа и запускаем логику.
         """
         if not k.get("x"):  # свеча ещё не закрыта
             return
         symbol = k.get("s")
         if not symbol:
             return
+        st = self._sym(symbol)
         # отметим время последней полученной свечи для watchdog
-        try:
-            self._last_kline_ts[symbol] = time.time()
-        except Exception:
-            pass
-        df = self._data_15m.get(symbol)
-        row = {
-            "open_time": int(k["t"]),
-            "open": float(k["o"]),
-            "high": float(k["h"]),
-            "low": float(k["l"]),
-            "close": float(k["c"]),
-            "volume": float(k["v"]),
-        }
-        if df is None:
-            df = pd.DataFrame([row])
+        st.last_kline = time.monotonic()
+        added = _put_kline(st.buf_15m, _kline_row(k), "LTF", symbol)
+        if added is None:
+            return
+        if added:
+            st.bars_15m += 1
         else:
-            df = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
-        self._data_15m[symbol] = df
-
-        await self._run_strategy_if_ready(symbol)
+            # последний бар изменился — инкрементальное состояние индикаторов его уже учло
+            st.ind_15m = None
+        st.kline_seq += 1
+
+        self._schedule_tick(symbol)
+
+    def _schedule_tick(self, symbol: str) -> None:
+        """Запустить тик стратегии символа отдельной задачей, не блокируя очередь WS."""
+        task = asyncio.create_task(self._run_tick(symbol))
+        self._tick_tasks.add(task)
+        task.add_done_callback(self._tick_tasks.discard)
+
+    async def _run_tick(self, symbol: str) -> None:
+        """Тик символа под его блокировкой; уже обработанное состояние буфера пропускается."""
+        st = self._sym(symbol)
+        async with st.lock:
+            if st.ticked_seq == st.kline_seq:
+                return
+            st.ticked_seq = st.kline_seq
+            try:
+                await self._run_strategy_if_ready(symbol)
+            except Exception as e:
+                logger.exception("[RUNNER] strategy tick failed for %s: %s", symbol, e)
 
     async def _on_kline_1h(self, k: dict) -> None:
         if not k.get("x"):
@@ -158,149 +341,160 @@ class LiveRunner:
         symbol = k.get("s")
         if not symbol:
             return
-        try:
-            self._last_kline_ts[symbol] = time.time()
-        except Exception:
-            pass
-        df = self._data_1h.get(symbol)
-        row = {
-            "open_time": int(k["t"]),
-            "open": float(k["o"]),
-            "high": float(k["h"]),
-            "low": float(k["l"]),
-            "close": float(k["c"]),
-            "volume": float(k["v"]),
-        }
-        if df is None:
-            df = pd.DataFrame([row])
-        else:
-            df = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
-        self._data_1h[symbol] = df
+        st = self._sym(symbol)
+        st.last_kline = time.monotonic()
+        if _put_kline(st.buf_1h, _kline_row(k), "HTF", symbol) is not None:
+            # новый (или повторный) бар H1 — кэш HTF-индикаторов устарел
+            st.htf = None
+
+    @staticmethod
+    def _sync_ltf_indicators(st: SymbolState) -> None:
+        """Досчитать индикаторы M15 в колонках буфера только по новым барам (O(1) на бар).
+
+        При первом вызове или если отставание больше окна буфера — прогон всего окна заново.
+        """
+        buf = st.buf_15m
+        state = st.ind_15m
+        lag = st.bars_15m - st.ind_bars_15m
+        if state is None or not 0 <= lag <= len(buf):
+            state = st.ind_15m = IndicatorState()
+            lag = len(buf)
+        window = buf.view()
+        for pos in range(-lag, 0):
+            r = window[pos]
+            values = state.update(r["open"], r["high"], r["low"], r["close"], r["volume"])
+            buf.set_extra(pos, values.values())
+        st.ind_bars_15m = st.bars_15m
+
+    @staticmethod
+    def _htf_arrays(st: SymbolState) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """open_time и HTF_* индикаторы H1 массивами; считаются один раз на закрытый бар H1."""
+        if st.htf is None:
+            df_1h_ind = compute_indicators(st.buf_1h.to_frame())
+            st.htf = (
+                df_1h_ind["open_time"].to_numpy(),
+                {_HTF_RENAME[col]: df_1h_ind[col].to_numpy() for col in _HTF_COLS},
+            )
+        return st.htf
+
+    def _build_bar_window(self, st: SymbolState) -> BarWindow:
+        """Хвост M15 (signal_lookback баров) с растянутыми на него HTF_* колонками.
+
+        Для каждого бара M15 берётся последний бар H1 с open_time <= его open_time
+        (как merge_asof(direction="backward")): индексы — один searchsorted, колонки
+        выбираются из кэша H1. Бары M15 раньше первого бара H1 получают NaN.
+        Колонки M15 — представления буфера без копии; DataFrame не строится.
+        """
+        window = st.buf_15m.view()
+        if self._signal_lookback:
+            window = window[-self._signal_lookback:]
+        htf_time, htf_cols = self._htf_arrays(st)
+        idx = np.searchsorted(htf_time, window["open_time"], side="right") - 1
+        missing = idx < 0
+        has_missing = bool(missing.any())
+        if has_missing:
+            idx[missing] = 0
+
+        cols: Dict[str, np.ndarray] = {name: window[name] for name in st.buf_15m.extra}
+        for name, values in htf_cols.items():
+            col = values[idx]
+            if has_missing:
+                col[missing] = np.nan
+            cols[name] = col
+        return BarWindow(
+            window["open_time"], window["open"], window["high"], window["low"],
+            window["close"], window["volume"], cols,
+        )
 
 
     async def _run_strategy_if_ready(self, symbol: str) -> None:
         """Запускается при закрытии M15 свечи.
 
         Здесь мы:
-        - строим MTF-DataFrame (H1 индикаторы растянуты по времени M15),
+        - строим MTF-окно BarWindow (H1 индикаторы растянуты по времени M15),
         - считаем LTF-индикаторы,
         - получаем сигнал стратегии,
         - управляем открытой позицией (SL/TP/трейлинг/реверс),
         - при отсутствии позиции открываем новую по сигналу с учётом риска.
         """
-        df_15 = self._data_15m.get(symbol)
-        df_1h = self._data_1h.get(symbol)
-        if df_15 is None or df_1h is None:
-            return
-        if df_15.empty or df_1h.empty:
+        st = self._sym(symbol)
+        buf_15 = st.buf_15m
+        buf_1h = st.buf_1h
+        if not buf_15 or not buf_1h:
             return
 
         # Минимальный прогрев данных (как в бэктесте примерно)
-        if len(df_15) < 200 or len(df_1h) < 50:
-            logger.debug("[RUNNER] not enough data yet for %s (len_15m=%s, len_1h=%s)", symbol, len(df_15), len(df_1h))
+        if len(buf_15) < 200 or len(buf_1h) < 50:
+            logger.debug("[RUNNER] not enough data yet for %s (len_15m=%s, len_1h=%s)", symbol, len(buf_15), len(buf_1h))
             return
 
+        bars: BarWindow | None = None
         try:
-            # --- строим MTF DataFrame (аналог run_backtest_mtf.py) ---
-            df_1h_ind = compute_indicators(df_1h.copy())
-
-            if "open_time" not in df_1h_ind.columns or "open_time" not in df_15.columns:
-                logger.warning("[RUNNER] open_time missing for %s", symbol)
-                return
-
-            df_1h_ind = df_1h_ind.set_index("open_time")
-            df_15_idx = df_15.set_index("open_time")
-
-            if df_1h_ind.index.has_duplicates:
-                logger.warning("[MTF] duplicate HTF index detected, cleaning (symbol=%s)", symbol)
-                df_1h_ind = df_1h_ind[~df_1h_ind.index.duplicated(keep="last")].sort_index()
-
-            if df_15_idx.index.has_duplicates:
-                logger.warning("[MTF] duplicate LTF index detected, cleaning (symbol=%s)", symbol)
-                df_15_idx = df_15_idx[~df_15_idx.index.duplicated(keep="last")].sort_index()
-
-            df_1h_sync = df_1h_ind.reindex(df_15_idx.index, method="pad")
-
-            htf_cols = [
-                "SMA_TREND",
-                "EMA20",
-                "EMA50",
-                "EMA200",
-                "ATR",
-                "ADX",
-                "RSI",
-            ]
-            for col in htf_cols:
-                hcol = f"HTF_{col}"
-                if col in df_1h_sync.columns:
-                    df_15_idx[hcol] = df_1h_sync[col]
-                else:
-                    df_15_idx[hcol] = pd.NA
-
-            df_mtf = df_15_idx.reset_index()
-            # считаем LTF-индикаторы (ATR/RSI и др.)
-            df_mtf = compute_indicators(df_mtf)
+            # --- строим MTF-окно (аналог run_backtest_mtf.py) ---
+            # LTF-индикаторы (ATR/RSI и др.) уже лежат в буфере: досчитываем только новые бары
+            # (нужны и без сигнала — ATR для управления позицией)
+            self._sync_ltf_indicators(st)
+            # префильтр по закрытиям M15: если сигнала точно не будет, HTF-индикаторы и окно не строим
+            closes = buf_15.view()["close"]
+            if self._signal_lookback:
+                closes = closes[-self._signal_lookback:]
+            if signal_prefilter(closes):
+                # open_time в буферах строго возрастает (_put_kline) — чистка и сортировка не нужны.
+                # Стратегии нужен только хвост signal_lookback(): его и собираем (результат тот же)
+                bars = self._build_bar_window(st)
         except Exception as e:
-            logger.exception("[RUNNER] failed to build MTF frame for %s: %s", symbol, e)
+            logger.exception("[RUNNER] failed to build MTF window for %s: %s", symbol, e)
             return
 
-        if df_mtf.empty:
-            return
+        # номер текущего бара M15 за всё время работы (окно буфера ограничено)
+        i = st.bars_15m - 1
 
-        i = len(df_mtf) - 1
-        row = df_mtf.iloc[-1]
-
-        try:
-            price = float(row["close"])
-            atr = float(row.get("ATR", 0.0))
-        except Exception:
-            return
+        # скаляры последнего бара — прямо из буфера, без Series строки
+        last_bar = buf_15.view()[-1]
+        price = float(last_bar["close"])
+        atr = float(last_bar["ATR"])
 
         if price <= 0 or atr <= 0:
             return
 
-        # --- базовые параметры из конфига ---
-        risk_per_trade = float(getattr(config, "RISK_PER_TRADE", 0.01))
-        leverage = int(getattr(config, "FUTURES_LEVERAGE_DEFAULT", 5))
-        atr_sl_mult = float(getattr(config, "ATR_SL_MULT", 4.0))
-        atr_tp_mult_1 = float(getattr(config, "ATR_TP_MULT_1", 8.0))
-        atr_ts_mult = float(getattr(config, "ATR_TS_MULT", 4.0))
-
-        # Текущий сигнал стратегии (по полной истории df_mtf)
-        logger.debug("[RUNNER] calling strategy for %s, len(df_mtf)=%d", symbol, len(df_mtf))
-        signal = signal_from_indicators(df_mtf)
-        logger.debug("[RUNNER] strategy returned signal=%r for %s", signal, symbol)
+        # --- базовые параметры из конфига (сняты в reload_config) ---
+        risk_per_trade = self._risk_per_trade
+        leverage = self._leverage
+        atr_sl_mult = self._atr_sl_mult
+        atr_tp_mult_1 = self._atr_tp_mult_1
+        atr_ts_mult = self._atr_ts_mult
+
+        # Текущий сигнал стратегии (по хвосту истории длины signal_lookback())
+        if bars is None:
+            signal = None
+            logger.debug("[RUNNER] strategy prefilter rejected %s", symbol)
+        else:
+            logger.debug("[RUNNER] calling strategy for %s, len(bars)=%d", symbol, len(bars))
+            signal = signal_from_bars(bars)
+            logger.debug("[RUNNER] strategy returned signal=%r for %s", signal, symbol)
 
         # --- оценка текущей equity и обновление пика ---
         equity = 0.0
         if self._broker is not None:
             try:
-                equity = float(await self._broker.get_balance_usdt())
+                equity = await self._get_equity_cached()
             except Exception as e:
                 logger.exception("[RUNNER] failed to get balance for equity calc: %s", e)
                 equity = 0.0
 
         if equity > 0:
-            self.state.update_balance("USDT", free=equity, equity=equity)
-            self.state.update_equity_peak(equity)
+            # баланс на каждом тике пишется только в память; на диск — в StateManager.run_writer
+            with self.state.batch():
+                self.state.update_balance("USDT", free=equity, equity=equity, persist=False)
+                self.state.update_equity_peak(equity)
 
         # === Hard equity drawdown guard (Step9) ===
         dd_pct = 0.0
-        try:
-            peak = self.state.data.get("equity_peak")
-        except Exception:
-            peak = None
-        try:
-            hard_dd = float(getattr(config, "HARD_MAX_DRAWDOWN_PCT", 0.0) or 0.0)
-        except Exception:
-            hard_dd = 0.0
-        if peak is not None and hard_dd > 0 and equity > 0:
-            try:
-                peak_val = float(peak)
-                if peak_val > 0:
-                    dd_pct = max(0.0, (peak_val - equity) / peak_val * 100.0)
-            except Exception:
-                dd_pct = 0.0
+        peak = self.state.data.get("equity_peak")
+        hard_dd = self._hard_dd_pct
+        # пик пишет update_equity_peak (float); нечисловое значение из старого файла игнорируем
+        if hard_dd > 0 and equity > 0 and isinstance(peak, (int, float)) and peak > 0:
+            dd_pct = max(0.0, (peak - equity) / peak * 100.0)
         if hard_dd > 0 and dd_pct >= hard_dd:
             if not self._trading_disabled:
                 logger.error(
@@ -355,10 +549,12 @@ class LiveRunner:
 
             # Трейлинговый стоп
             if pos.trailing_stop is not None and pos.qty > 0:
+                ts_moved = False
                 if pos.side == "long":
                     new_ts = price - atr_ts_mult * atr
                     if new_ts > pos.trailing_stop:
                         pos.trailing_stop = new_ts
+                        ts_moved = True
                     if price <= pos.trailing_stop:
                         await self._close_position_live(symbol, pos, price, reason="trailing_stop")
                         return
@@ -366,18 +562,19 @@ class LiveRunner:
                     new_ts = price + atr_ts_mult * atr
                     if new_ts < pos.trailing_stop:
                         pos.trailing_stop = new_ts
+                        ts_moved = True
                     if price >= pos.trailing_stop:
                         await self._close_position_live(symbol, pos, price, reason="trailing_stop")
                         return
-                self._update_position_state(symbol, pos)
+                if ts_moved:
+                    # подтяжка трейлинга — частое обновление, на диск уходит пакетно
+                    self._update_position_state(symbol, pos, persist=False)
 
             # Ограничение максимального времени жизни позиции (тайм-стоп)
-            mtf_max_bars = int(getattr(config, "MTF_MAX_BARS_IN_POSITION", 0) or 0)
+            mtf_max_bars = self._mtf_max_bars
             if mtf_max_bars > 0:
-                try:
-                    age_bars = int(i - pos.open_time)
-                except Exception:
-                    age_bars = 0
+                # open_time — номер бара, записанный при открытии (у старых состояний может не быть)
+                age_bars = int(i - pos.open_time) if pos.open_time is not None else 0
                 if age_bars >= mtf_max_bars:
                     await self._close_position_live(symbol, pos, price, reason="time_stop")
                     return
@@ -398,16 +595,31 @@ class LiveRunner:
         if signal not in {"buy", "sell"}:
             return
 
+        # вход — под общей блокировкой: лимиты позиций и сделок проверяются и
+        # обновляются атомарно относительно параллельных тиков других символов
+        async with self._entry_lock:
+            await self._open_on_signal(symbol, signal, price, atr, equity, i)
+
+
+    async def _open_on_signal(self, symbol: str, signal: str, price: float, atr: float, equity: float, i: int) -> None:
+        """Открыть позицию по сигналу, если позволяют risk guard и лимиты (вызывается под _entry_lock)."""
+        risk_per_trade = self._risk_per_trade
+        leverage = self._leverage
+        atr_sl_mult = self._atr_sl_mult
+        atr_tp_mult_1 = self._atr_tp_mult_1
+
         # если risk guard отключил торговлю — новые позиции не открываем
         if self._trading_disabled:
             logger.info("[RUNNER] trading disabled by risk guard, skip opening %s", symbol)
             return
 
         # ===== trade rate limiter =====
-        now_ts = time.time()
+        now_ts = time.monotonic()
         if self._max_trades_per_hour > 0:
-            # очищаем старые записи старше часа
-            self._trade_timestamps = [t for t in self._trade_timestamps if now_ts - t < 3600]
+            # очищаем старые записи старше часа: они в начале очереди
+            ts = self._trade_timestamps
+            while ts and now_ts - ts[0] >= 3600:
+                ts.popleft()
             if len(self._trade_timestamps) >= self._max_trades_per_hour:
                 logger.warning(
                     "[RUNNER] trade rate limit reached (%s trades/h), skip opening %s",
@@ -417,12 +629,9 @@ class LiveRunner:
                 return
 
         # ===== anti-loop per symbol =====
-        try:
-            min_reopen = int(getattr(config, "MIN_REOPEN_INTERVAL_SEC", 0) or 0)
-        except Exception:
-            min_reopen = 0
+        min_reopen = self._min_reopen_sec
         if min_reopen > 0:
-            last_open = self._last_open_time.get(symbol)
+            last_open = self._sym(symbol).last_open
             if last_open is not None and now_ts - last_open < min_reopen:
                 logger.info(
                     "[RUNNER] anti-loop: last %s open was %.1fs ago (<%ss), skip re-open",
@@ -433,14 +642,9 @@ class LiveRunner:
                 return
 
         # Ограничение по количеству одновременных позиций
-        open_count = sum(1 for p in self._positions.values() if p is not None)
-        max_positions = int(getattr(config, "MAX_OPEN_POSITIONS", 3))
-        strategy_name = str(getattr(config, "STRATEGY_NAME", "htf_breakout")).lower()
-        mtf_max_pos = int(getattr(config, "MTF_MAX_OPEN_POSITIONS", max_positions))
-        if strategy_name in {"mtf_breakout", "mtf"}:
-            eff_max_positions = min(max_positions, mtf_max_pos)
-        else:
-            eff_max_positions = max_positions
+        # None в _positions не хранится (_update_position_state удаляет закрытые)
+        open_count = len(self._positions)
+        eff_max_positions = self._max_open_positions
 
         if open_count >= eff_max_positions:
             logger.info("[RUNNER] cannot open %s: max open positions reached (%s)", symbol, eff_max_positions)
@@ -470,7 +674,7 @@ class LiveRunner:
                 return
 
             order_side = "BUY" if side == "long" else "SELL"
-            await self._broker.create_market_order(
+            await self._market_order(
                 symbol=symbol,
                 side=order_side,
                 qty=qty,
@@ -483,6 +687,8 @@ class LiveRunner:
             except Exception:
                 logger.exception("[RUNNER] failed to send order error notification for %s", symbol)
             return
+        finally:
+            self._equity_cache = None
 
         if side == "long":
             stop_loss = price - atr_sl_mult * atr
@@ -499,6 +705,7 @@ class LiveRunner:
             side=side,
             mode="futures",
             open_time=float(i),
+            open_time_wall=time.time(),
             stop_loss=stop_loss,
             tp1=tp1,
             tp2=None,
@@ -533,21 +740,69 @@ class LiveRunner:
 
         # зарегистрируем открытие в защитном слое
         try:
-            open_ts = time.time()
-            self._last_open_time[symbol] = open_ts
+            open_ts = time.monotonic()
+            self._sym(symbol).last_open = open_ts
             self._trade_timestamps.append(open_ts)
         except Exception:
             logger.exception("[RUNNER] failed to register trade timestamp for %s", symbol)
 
+    async def _market_order(self, **kwargs) -> None:
+        """Рыночный ордер через брокера с ограничением числа одновременных запросов."""
+        async with self._order_sem:
+            await self._broker.create_market_order(**kwargs)
 
-    def _update_position_state(self, symbol: str, pos: PositionState | None) -> None:
-        """Сохранить позицию в локальный кэш и файл состояния."""
+    async def _get_equity_cached(self) -> float:
+        """Баланс USDT с кэшем на EQUITY_CACHE_TTL секунд: закрытия M15 по всем символам
+        приходят почти одновременно, и каждому не нужен свой REST-запрос.
+        """
+        now = time.monotonic()
+        cached = self._equity_cache
+        if cached is not None and cached[1] > now:
+            return cached[0]
+        value = float(await self._broker.get_balance_usdt())
+        self._equity_cache = (value, time.monotonic() + self._equity_cache_ttl)
+        return value
+
+    def _compute_mismatch_mask(self, exch_positions: Dict[str, Tuple[float, float]]) -> Tuple[Dict[str, int], int]:
+        """Маска расхождения (MISMATCH_*) по каждому символу с позицией хотя бы с одной стороны.
+
+        exch_positions: symbol -> (positionAmt со знаком, entryPrice) открытых позиций биржи.
+        Возвращает (маски, число открытых локальных позиций) — за один проход по self._positions.
+        """
+        masks: Dict[str, int] = {}
+        open_count = 0
+        for sym, pos in self._positions.items():
+            if pos.qty <= 0:
+                continue
+            open_count += 1
+            exch = exch_positions.get(sym)
+            if exch is None:
+                masks[sym] = MISMATCH_EXISTS
+                continue
+            exch_qty, exch_entry = exch
+            local_qty = pos.qty * pos.sign
+            mask = 0
+            if abs(local_qty - exch_qty) > _MISMATCH_QTY_TOL * max(abs(local_qty), abs(exch_qty)):
+                mask |= MISMATCH_QTY
+            if exch_entry > 0 and abs(pos.entry_price - exch_entry) > _MISMATCH_PRICE_TOL * exch_entry:
+                mask |= MISMATCH_PRICE
+            masks[sym] = mask
+        for sym in exch_positions:
+            if sym not in masks:
+                masks[sym] = MISMATCH_EXISTS
+        return masks, open_count
+
+    def _update_position_state(self, symbol: str, pos: PositionState | None, persist: bool = True) -> None:
+        """Сохранить позицию в локальный кэш и файл состояния.
+
+        persist=False — только в памяти StateManager, на диск при следующем flush.
+        """
         if pos is None:
             self._positions.pop(symbol, None)
             self.state.del_position(symbol)
         else:
             self._positions[symbol] = pos
-            self.state.set_position(symbol, pos)
+            self.state.set_position(symbol, pos, persist=persist)
 
     async def _close_position_live(self, symbol: str, pos: PositionState, price: float, reason: str) -> None:
         """Полное закрытие позиции рыночным ордером."""
@@ -561,7 +816,7 @@ class LiveRunner:
         order_side = "SELL" if pos.side == "long" else "BUY"
         qty = pos.qty
         try:
-            await self._broker.create_market_order(
+            await self._market_order(
                 symbol=symbol,
                 side=order_side,
                 qty=qty,
@@ -574,6 +829,8 @@ class LiveRunner:
             except Exception:
                 logger.exception("[RUNNER] failed to send order error notification for %s", symbol)
             return
+        finally:
+            self._equity_cache = None
 
         logger.info(
             "[RUNNER] CLOSE %s %s qty=%.6f price=%.4f reason=%s",
@@ -584,20 +841,26 @@ class LiveRunner:
             reason,
         )
 
+        entry = float(pos.entry_price)
+        exit_price = float(price)
+        qty_val = float(qty)
+        pnl = (exit_price - entry) * qty_val * pos.sign
+
+        # реализованный PnL и удаление позиции — одной записью состояния
+        with self.state.batch():
+            self.state.add_realized_pnl(pnl)
+            self._update_position_state(symbol, None)
+
         # Telegram notification about closed position with PnL/ROE
         try:
-            entry = float(pos.entry_price)
-            exit_price = float(price)
-            qty_val = float(qty)
             side = pos.side
-            sign = 1.0 if side == "long" else -1.0
-            pnl = (exit_price - entry) * qty_val * sign
             roe_pct = None
             notional = float(getattr(pos, "notional", 0.0) or 0.0)
             if notional > 0:
                 roe_pct = pnl / notional * 100.0
             duration_str = None
-            open_ts = float(getattr(pos, "open_time", 0.0) or 0.0)
+            # длительность — по времени открытия на часах (open_time хранит номер бара)
+            open_ts = float(pos.open_time_wall or 0.0)
             if open_ts > 0:
                 now_ts = time.time()
                 delta = max(0.0, now_ts - open_ts)
@@ -610,12 +873,6 @@ class LiveRunner:
                 else:
                     duration_str = f"{secs}s"
 
-            # обновим реализованный PnL в состоянии
-            try:
-                self.state.add_realized_pnl(pnl)
-            except Exception:
-                logger.exception("[RUNNER] failed to update realized pnl for %s", symbol)
-
             self.notifier.notify_close_position(
                 symbol=symbol,
                 side=side,
@@ -630,8 +887,6 @@ class LiveRunner:
         except Exception as e:  # pragma: no cover
             logger.exception("[RUNNER] failed to send close position notification for %s: %s", symbol, e)
 
-        self._update_position_state(symbol, None)
-
     async def _close_fraction_live(self, symbol: str, pos: PositionState, price: float, fraction: float, reason: str) -> None:
         """Частичное закрытие позиции (fraction от текущего qty)."""
         if self._broker is None:
@@ -646,7 +901,7 @@ class LiveRunner:
 
         order_side = "SELL" if pos.side == "long" else "BUY"
         try:
-            await self._broker.create_market_order(
+            await self._market_order(
                 symbol=symbol,
                 side=order_side,
                 qty=qty_close,
@@ -655,6 +910,8 @@ class LiveRunner:
         except Exception as e:
             logger.exception("[RUNNER] failed to close fraction for %s (%s): %s", symbol, reason, e)
             return
+        finally:
+            self._equity_cache = None
 
         # обновляем локальное состояние позиции
         pos.qty -= qty_close
@@ -671,13 +928,22 @@ class LiveRunner:
             price,
             reason,
         )
+
+    def request_shutdown(self) -> None:
+        """Попросить start() завершиться (обработчик SIGINT/SIGTERM в main)."""
+        self._shutdown_event.set()
+
     async def start(self) -> None:
-        """Точка входа для live-бота."""
+        """Точка входа для live-бота.
+
+        Работает до request_shutdown() или отмены задачи.
+        """
         self.state.load()
         # Восстанавливаем открытые позиции из файла состояния (если есть)
         try:
             saved_positions = self.state.get_positions()
-            self._positions = dict(saved_positions)
+            # инвариант _positions: только PositionState, без None
+            self._positions = {s: p for s, p in saved_positions.items() if p is not None}
             logger.info("[RUNNER] restored %s positions from state", len(self._positions))
         except Exception as e:
             logger.exception("[RUNNER] failed to restore positions from state: %s", e)
@@ -701,27 +967,31 @@ class LiveRunner:
 
         # Heartbeat: периодически шлём сообщение в логи / Telegram
         async def heartbeat_loop() -> None:
+            # адаптивный интервал: сразу после изменения позиций или проблемы — каждые
+            # HEARTBEAT_MIN_INTERVAL секунд, дальше в тишине удваивается до EQUITY_NOTIFY_INTERVAL
+            max_interval = float(getattr(config, "EQUITY_NOTIFY_INTERVAL", 600))
+            base = float(getattr(config, "HEARTBEAT_MIN_INTERVAL", 60) or 0)
+            if base <= 0 or base > max_interval:
+                base = max_interval
+            last_problem = time.monotonic()
+            last_notify: float | None = None
             while True:
+                problem = False
                 try:
                     if self._broker:
-                        bal = await self._broker.get_balance_usdt()
+                        bal = await self._get_equity_cached()
                     else:
                         bal = 0.0
 
-                    # подсчёт открытых позиций по локальному стейту
-                    try:
-                        open_positions_count = sum(1 for p in self._positions.values() if p.qty > 0)
-                    except Exception:
-                        open_positions_count = 0
-
                     # watchdog по WebSocket: давно ли не было свечей
                     try:
                         stale_sec = int(getattr(config, "WS_STALE_SECONDS", 0) or 0)
                     except Exception:
                         stale_sec = 0
-                    if stale_sec > 0 and self._last_kline_ts:
-                        now_ts = time.time()
-                        latest = max(self._last_kline_ts.values())
+                    seen = [st.last_kline for st in self._symbols_state.values() if st.last_kline is not None]
+                    if stale_sec > 0 and seen:
+                        now_ts = time.monotonic()
+                        latest = max(seen)
                         if now_ts - latest > stale_sec:
                             lag = now_ts - latest
                             logger.warning(
@@ -738,7 +1008,7 @@ class LiveRunner:
                                 logger.exception("[RUNNER] failed to send ws_watchdog notification")
 
                     # проверка соответствия позиций биржа / локальный стейт
-                    exch_positions_syms: List[str] = []
+                    exch_positions: Dict[str, Tuple[float, float]] = {}
                     try:
                         if self._broker:
                             raw_positions = await self._broker.get_positions()
@@ -747,52 +1017,72 @@ class LiveRunner:
                                 if sym in self.symbols:
                                     try:
                                         qty = float(p.get("positionAmt", 0.0))
+                                        entry = float(p.get("entryPrice", 0.0) or 0.0)
                                     except Exception:
-                                        qty = 0.0
+                                        qty, entry = 0.0, 0.0
                                     if qty != 0.0:
-                                        exch_positions_syms.append(sym)
+                                        exch_positions[sym] = (qty, entry)
                     except Exception as e:
+                        problem = True
                         logger.exception("[RUNNER] heartbeat: failed to fetch exchange positions: %s", e)
 
-                    local_syms = [s for s, p in self._positions.items() if p.qty > 0]
                     try:
                         mismatch_disable = getattr(config, "POSITION_MISMATCH_DISABLE", True)
                     except Exception:
                         mismatch_disable = True
-                    if set(exch_positions_syms) != set(local_syms):
-                        logger.warning(
-                            "[RUNNER] position mismatch: exchange=%s, local=%s",
-                            exch_positions_syms,
-                            local_syms,
-                        )
-                        if mismatch_disable and not self._trading_disabled:
+                    # маски расхождений и число открытых позиций по локальному стейту
+                    masks, open_positions_count = self._compute_mismatch_mask(exch_positions)
+                    any_mismatch = reduce(or_, masks.values(), 0)
+                    if any_mismatch:
+                        problem = True
+                        details = {sym: _mismatch_names(m) for sym, m in sorted(masks.items()) if m}
+                        logger.warning("[RUNNER] position mismatch: %s", details)
+                        if mismatch_disable and any_mismatch & _MISMATCH_DISABLE and not self._trading_disabled:
                             self._trading_disabled = True
                             try:
                                 self.notifier.notify_error(
                                     "position_mismatch",
-                                    f"Exchange positions {exch_positions_syms} != local {local_syms}. Trading disabled.",
+                                    f"Exchange/local positions differ: {details}. Trading disabled.",
                                 )
                             except Exception:
                                 logger.exception("[RUNNER] failed to send position_mismatch notification")
 
-                    self.notifier.notify_heartbeat(
-                        equity=bal,
-                        open_positions_count=open_positions_count,
-                    )
+                    now_ts = time.monotonic()
+                    if last_notify is None or now_ts - last_notify >= max_interval:
+                        last_notify = now_ts
+                        self.notifier.notify_heartbeat(
+                            equity=bal,
+                            open_positions_count=open_positions_count,
+                        )
                 except Exception as e:
+                    problem = True
                     logger.exception("[RUNNER] heartbeat error: %s", e)
-                await asyncio.sleep(getattr(config, "EQUITY_NOTIFY_INTERVAL", 600))
+
+                now_ts = time.monotonic()
+                if problem:
+                    last_problem = now_ts
+                quiet = now_ts - max(last_problem, self.state.positions_changed_at)
+                interval = min(base * 2 ** min(int(quiet // base), 6), max_interval)
+                await asyncio.sleep(interval)
 
         hb_task = asyncio.create_task(heartbeat_loop())
 
-        # Ожидание сигналов, основная работа идёт в колбеках WS.
+        # Фоновая запись состояния: изменения одного тика — одной записью в потоке,
+        # несрочные (трейлинг, баланс) — раз в STATE_FLUSH_INTERVAL
+        flush_interval = float(getattr(config, "STATE_FLUSH_INTERVAL", 5.0) or 5.0)
+        flush_task = asyncio.create_task(self.state.run_writer(flush_interval))
+
+        # Ожидание сигнала остановки, основная работа идёт в колбеках WS.
         try:
-            while True:
-                await asyncio.sleep(3600)  # просто держим процесс живым
+            await self._shutdown_event.wait()
+            logger.info("[RUNNER] shutdown requested, shutting down...")
         except asyncio.CancelledError:
             logger.info("[RUNNER] cancelled, shutting down...")
         finally:
             hb_task.cancel()
+            flush_task.cancel()
+            for task in list(self._tick_tasks):
+                task.cancel()
             if self._ws_manager:
                 await self._ws_manager.stop()
             if self._broker is not None:
@@ -807,31 +1097,39 @@ class LiveRunner:
             except Exception as e:  # pragma: no cover
                 logger.exception("[RUNNER] failed to send bot stopped notification: %s", e)
 
-def main() -> None:
-    setup_logging()
-    runner = LiveRunner()
-
-    loop = asyncio.get_event_loop()
 
-    # Корректная обработка SIGINT/SIGTERM
+async def _amain(runner: LiveRunner) -> None:
+    # SIGINT/SIGTERM только выставляют событие: start() штатно завершает свои задачи
+    loop = asyncio.get_running_loop()
     for sig in (signal.SIGINT, signal.SIGTERM):
         try:
-            loop.add_signal_handler(sig, loop.stop)
+            loop.add_signal_handler(sig, runner.request_shutdown)
         except NotImplementedError:
             # Windows
             pass
 
+    await runner.start()
+
+
+def main() -> None:
+    setup_logging()
+    runner = LiveRunner()
+
+    # политику цикла нужно поставить до его создания — поэтому здесь, а не в start()
+    if uvloop is not None and getattr(config, "USE_UVLOOP", True):
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info("[RUNNER] using uvloop event loop")
+
     try:
-        loop.run_until_complete(runner.start())
+        # asyncio.run сам отменяет и дожидается оставшихся задач и закрывает цикл
+        asyncio.run(_amain(runner))
     finally:
-        pending = asyncio.all_tasks(loop)
-        for task in pending:
-            task.cancel()
-        try:
-            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
-        except Exception:
-            pass
-        loop.close()
+        # несохранённые изменения состояния — на диск перед выходом
+        runner.state.flush_if_dirty()
+        # отправить уведомления, ещё стоящие в очереди (в т.ч. BOT STOPPED)
+        runner.notifier.close()
+        # дописать в файлы записи, ещё стоящие в очереди логгера
+        shutdown_logging()
 
 
 if __name__ == "__main__":
@@ -1,6 +1,107 @@
+import atexit
+import functools
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import time
+from logging.handlers import MemoryHandler, QueueHandler, QueueListener, RotatingFileHandler
+from typing import List, Optional
+
+import config
+
+# background thread that owns the file/console handlers (see setup_logging)
+_listener: Optional[QueueListener] = None
+# every handler created by setup_logging, closed in this order by shutdown_logging
+_handlers: List[logging.Handler] = []
+
+
+@functools.lru_cache(maxsize=4)
+def _strftime_sec(sec: int) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(sec))
+
+
+class FastFormatter(logging.Formatter):
+    """Formatter whose default asctime is formatted once per second, not once per record.
+
+    Output matches logging.Formatter ("2024-01-02 03:04:05,678"); an explicit
+    datefmt falls back to the stock implementation.
+    """
+
+    def formatTime(self, record: logging.LogRecord, datefmt: Optional[str] = None) -> str:
+        if datefmt:
+            return super().formatTime(record, datefmt)
+        return "%s,%03d" % (_strftime_sec(int(record.created)), record.msecs)
+
+
+# shared by all handlers and by repeated setup_logging() calls
+_FORMATTER = FastFormatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+
+
+class SizeTrackingRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that tracks the file size itself.
+
+    The stock shouldRollover() formats the record and does seek()+tell() on every
+    emit (and emit() formats it a second time). Here the record is formatted once,
+    its encoded size is added to a counter and the filesystem is only consulted
+    when the file is (re)opened.
+    """
+
+    def _open(self):
+        stream = super()._open()
+        try:
+            self._cur_size = os.path.getsize(self.baseFilename)
+        except OSError:
+            self._cur_size = 0
+        return stream
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        return self.maxBytes > 0 and self._cur_size >= self.maxBytes
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self._cur_size = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            msg = self.format(record) + self.terminator
+            size = len(msg.encode(self.encoding or "utf-8", "replace"))
+            if self.stream is None:
+                self.stream = self._open()
+            # same rule as RotatingFileHandler: rotate if this record would reach maxBytes
+            if self.maxBytes > 0 and self._cur_size > 0 and self._cur_size + size >= self.maxBytes:
+                self.doRollover()
+                if self.stream is None:
+                    self.stream = self._open()
+            self.stream.write(msg)
+            self.flush()
+            self._cur_size += size
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+
+class _BufferedHandler(MemoryHandler):
+    """MemoryHandler that also flushes when the buffer is older than flush_interval.
+
+    Plain MemoryHandler keeps INFO records until the buffer is full, so on a quiet
+    bot the file could lag by hours; the age check runs on the next record.
+    """
+
+    def __init__(self, capacity: int, flush_interval: float, target: logging.Handler) -> None:
+        super().__init__(capacity, flushLevel=logging.ERROR, target=target, flushOnClose=True)
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+
+    def shouldFlush(self, record: logging.LogRecord) -> bool:
+        return (
+            super().shouldFlush(record)
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        )
+
+    def flush(self) -> None:
+        super().flush()
+        self._last_flush = time.monotonic()
 
 
 def setup_logging(
@@ -17,49 +118,79 @@ def setup_logging(
     - rotating main log
     - rotating error log
     - console log
+
+    The handlers are not attached to ROOT directly: ROOT gets a QueueHandler and
+    a QueueListener thread does the actual writes, so a log call on the event
+    loop costs a queue put instead of file I/O. Call shutdown_logging() on exit
+    to drain the queue (it is also registered with atexit).
+
+    The main log is buffered (config.LOG_BUFFER / LOG_FLUSH_INTERVAL) and written
+    in bursts; ERROR records flush it immediately. The error log is not buffered.
     """
+    global _listener
 
     os.makedirs(log_dir, exist_ok=True)
     path_main = os.path.join(log_dir, log_file)
     path_err = os.path.join(log_dir, "errors.log")
 
-    fmt = logging.Formatter(
-        "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
-    )
-
     root = logging.getLogger()
     root.setLevel(level)
 
     # clear previous handlers to avoid duplicates
+    shutdown_logging()
     root.handlers.clear()
 
     # main rotating file
-    fh = RotatingFileHandler(
+    fh = SizeTrackingRotatingFileHandler(
         path_main,
         maxBytes=10_000_000,
         backupCount=7,
         encoding="utf-8"
     )
-    fh.setFormatter(fmt)
+    fh.setFormatter(_FORMATTER)
     fh.setLevel(level)
 
     # error-only file
-    eh = RotatingFileHandler(
+    eh = SizeTrackingRotatingFileHandler(
         path_err,
         maxBytes=10_000_000,
         backupCount=7,
         encoding="utf-8"
     )
-    eh.setFormatter(fmt)
+    eh.setFormatter(_FORMATTER)
     eh.setLevel(logging.ERROR)
 
     # console
     ch = logging.StreamHandler()
-    ch.setFormatter(fmt)
+    ch.setFormatter(_FORMATTER)
     ch.setLevel(level)
 
-    root.addHandler(fh)
-    root.addHandler(eh)
-    root.addHandler(ch)
+    main_handler: logging.Handler = fh
+    capacity = int(getattr(config, "LOG_BUFFER", 512))
+    if capacity > 0:
+        main_handler = _BufferedHandler(capacity, float(getattr(config, "LOG_FLUSH_INTERVAL", 2.0)), fh)
+        main_handler.setLevel(level)
+    # buffer first: its close() flushes into fh before fh is closed
+    _handlers[:] = [main_handler, fh, eh, ch] if main_handler is not fh else [fh, eh, ch]
+
+    q: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root.addHandler(QueueHandler(q))
+    _listener = QueueListener(q, main_handler, eh, ch, respect_handler_level=True)
+    _listener.start()
 
     logging.getLogger(__name__).info("Logging initialized -> %s", path_main)
+
+
+def shutdown_logging() -> None:
+    """Stop the logging thread: flush queued records and close the handlers."""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    for h in _handlers:
+        h.close()
+    _handlers.clear()
+
+
+atexit.register(shutdown_logging)
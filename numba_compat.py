@@ -0,0 +1,32 @@
+"""Опциональная поддержка numba.
+
+numba не входит в обязательные зависимости: если она установлена, отдаём
+настоящие ``njit``/``prange``, иначе ``njit`` становится no-op декоратором
+и функции выполняются как обычный Python (медленнее, но с той же логикой).
+
+Использование:
+
+    from numba_compat import njit
+
+    @njit(cache=True)
+    def kernel(a):
+        ...
+"""
+
+try:
+    from numba import njit, prange  # type: ignore
+
+    NUMBA_AVAILABLE = True
+except Exception:  # pragma: no cover - numba может быть не установлена
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):  # type: ignore
+        """Заглушка njit: поддерживает формы ``@njit`` и ``@njit(...)``."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def wrap(func):
+            return func
+
+        return wrap
@@ -1,9 +1,12 @@
-import time
 from dataclasses import dataclass, asdict
-from typing import Optional
+from typing import Any, Callable, Optional, Tuple
 
+# значения по умолчанию в _FIELDS, которые нельзя задать константой
+_REQUIRED = object()  # поле обязательно: нет ключа — KeyError
+_NOTIONAL = object()  # entry_price * qty
 
-@dataclass
+
+@dataclass(slots=True)
 class PositionState:
     """Состояние фьючерсной позиции.
 
@@ -23,7 +26,8 @@ class PositionState:
 
     side: str = "short"
     mode: str = "futures"
-    open_time: float = None
+    # номер бара M15 при открытии: возраст позиции (тайм-стоп) считается в барах
+    open_time: Optional[float] = None
 
     # Уровни управления риском
     stop_loss: Optional[float] = None
@@ -35,24 +39,54 @@ class PositionState:
 
     pyramid_level: int = 0
 
+    # время открытия по часам (time.time()) — только для отображения длительности сделки;
+    # не monotonic, т.к. значение переживает перезапуск процесса через файл состояния
+    open_time_wall: Optional[float] = None
+
+    @property
+    def sign(self) -> float:
+        """Знак позиции для PnL без ветвлений: +1.0 для long, -1.0 для short."""
+        return 1.0 if self.side == "long" else -1.0
+
     def to_dict(self) -> dict:
         return asdict(self)
 
     @classmethod
     def from_dict(cls, d: dict) -> "PositionState":
-        """Восстановление из словаря, совместимое со старыми версиями состояния."""
-        return cls(
-            symbol=d["symbol"],
-            entry_price=float(d["entry_price"]),
-            qty=float(d["qty"]),
-            notional=float(d.get("notional", float(d["entry_price"]) * float(d["qty"]))),
-            side=d.get("side", "short"),
-            mode=d.get("mode", "futures"),
-            open_time=d.get("open_time", time.time()),
-            stop_loss=d.get("stop_loss"),
-            tp1=d.get("tp1"),
-            tp2=d.get("tp2"),
-            peak_price=d.get("peak_price"),
-            trailing_stop=d.get("trailing_stop"),
-            pyramid_level=int(d.get("pyramid_level", 0)),
-        )
+        """Восстановление из словаря, совместимое со старыми версиями состояния.
+
+        Отсутствующий ключ — значение по умолчанию из _FIELDS; приведение типа
+        применяется только к не-None значениям.
+        """
+        kw = {}
+        for name, cast, default in _FIELDS:
+            value = d.get(name, default)
+            if value is _REQUIRED:
+                raise KeyError(name)
+            if value is _NOTIONAL:
+                value = kw["entry_price"] * kw["qty"]
+            elif value is not None and cast is not None:
+                value = cast(value)
+            kw[name] = value
+        return cls(**kw)
+
+
+# (поле, приведение типа или None, значение по умолчанию) в порядке полей PositionState;
+# entry_price и qty идут раньше notional — он вычисляется из них
+_FIELDS: Tuple[Tuple[str, Optional[Callable[[Any], Any]], Any], ...] = (
+    ("symbol", None, _REQUIRED),
+    ("entry_price", float, _REQUIRED),
+    ("qty", float, _REQUIRED),
+    ("notional", float, _NOTIONAL),
+    ("side", None, "short"),
+    ("mode", None, "futures"),
+    # в старых состояниях номера бара может не быть: тогда тайм-стоп позицию не трогает
+    ("open_time", None, None),
+    ("stop_loss", None, None),
+    ("tp1", None, None),
+    ("tp2", None, None),
+    ("peak_price", None, None),
+    ("trailing_stop", None, None),
+    ("pyramid_level", int, 0),
+    ("open_time_wall", float, None),
+)
@@ -1,3 +1,7 @@
+from typing import Tuple
+
+import numpy as np
+
 import config as cfg
 from utils import round_down
 
@@ -12,10 +16,17 @@ class RiskManager:
     """
 
     def __init__(self):
+        self.reload_config()
+
+    def reload_config(self) -> None:
+        """Снять параметры из config один раз (вызывается из __init__; повторно — если config поменяли)."""
         # Минимальный допустимый номинал ордера (ограничение биржи)
         self.min_notional = float(getattr(cfg, "MIN_NOTIONAL_USDT", 5.0))
         # Шаг количества контрактов
         self.qty_step = float(getattr(cfg, "QTY_STEP", 0.0001))
+        # Значения по умолчанию для calc_futures_size_from_risk
+        self._default_risk = float(getattr(cfg, "RISK_PER_TRADE", 0.01))
+        self._default_lev = int(getattr(cfg, "FUTURES_LEVERAGE_DEFAULT", 5))
 
     # ------------------------------------------------------------------
     def calc_size(self, notional: float, price: float):
@@ -45,6 +56,27 @@ class RiskManager:
 
         return float(notional), float(qty)
 
+    # ------------------------------------------------------------------
+    def calc_size_batch(self, notional, price) -> Tuple[np.ndarray, np.ndarray]:
+        """calc_size для массивов (например, кандидаты по всем символам) без цикла Python.
+
+        notional и price — массивы одной формы (или скаляры). Возвращает массивы
+        (notional, qty); там, где размер слишком мал или вход некорректен, — 0.0.
+        Результат поэлементно совпадает с calc_size.
+        """
+        notional = np.asarray(notional, dtype=np.float64)
+        price = np.asarray(price, dtype=np.float64)
+        valid = (price > 0) & (notional > 0)
+
+        # Минимальный размер по notional
+        want = np.maximum(notional, self.min_notional)
+        qty = np.divide(want, price, out=np.zeros(np.broadcast(want, price).shape), where=valid)
+        qty = round_down(qty, self.qty_step)
+
+        sized = qty * price
+        ok = valid & (qty > 0) & (sized >= self.min_notional)
+        return np.where(ok, sized, 0.0), np.where(ok, qty, 0.0)
+
     # ------------------------------------------------------------------
     def futures_notional_by_leverage(self, balance_usdt: float, leverage: int) -> float:
         """Максимальный номинал позиции по балансу и плечу.
@@ -75,9 +107,9 @@ class RiskManager:
         Возвращает (notional, qty).
         """
         if risk_per_trade is None:
-            risk_per_trade = float(getattr(cfg, "RISK_PER_TRADE", 0.01))
+            risk_per_trade = self._default_risk
         if leverage is None:
-            leverage = int(getattr(cfg, "FUTURES_LEVERAGE_DEFAULT", 5))
+            leverage = self._default_lev
 
         if (
             equity <= 0
@@ -1,11 +1,36 @@
+import asyncio
 import json
 import os
 import logging
-from typing import Dict, Optional, Any
+import pickle
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Any
 
 from position import PositionState
 import config
 
+# отступы в файле состояния — только для чтения глазами; по умолчанию компактный JSON
+_PRETTY = bool(getattr(config, "STATE_PRETTY", False))
+
+try:  # orjson: C-сериализация, в разы быстрее stdlib json; numpy-скаляры пишет как числа
+    import orjson
+
+    _DUMPS_OPTION = orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_INDENT_2 if _PRETTY else 0)
+
+    def _dumps(payload: Dict[str, Any]) -> bytes:
+        return orjson.dumps(payload, option=_DUMPS_OPTION)
+
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - orjson опционален
+    def _dumps(payload: Dict[str, Any]) -> bytes:
+        if _PRETTY:
+            return json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    _loads = json.loads
+
 logger = logging.getLogger(__name__)
 
 
@@ -44,6 +69,21 @@ class StateManager:
             "realized_pnl": 0.0,
             "strategy_version": getattr(config, "STRATEGY_VERSION", "")
         }
+        # есть изменения в памяти, ещё не записанные на диск (см. persist=False)
+        self._dirty = False
+        # time.monotonic() последнего изменения позиций (для адаптивного heartbeat)
+        self.positions_changed_at = time.monotonic()
+        # фоновая запись (run_writer): срочные изменения будят её через событие
+        self._dirty_event = asyncio.Event()
+        self._writer_running = False
+        # вложенность batch() и было ли внутри пакета срочное изменение
+        self._batch_depth = 0
+        self._batch_urgent = False
+        # запись из потока run_writer и синхронный save() не должны пересекаться на .tmp
+        self._write_lock = threading.Lock()
+        # pickle-снимок разобранного файла: при перезапуске без изменений файла JSON не парсим
+        self.cache_file = f"{self.state_file}.cache"
+        self._cache_present = os.path.exists(self.cache_file)
 
     # ===== Базовые операции с файлом =====
 
@@ -53,39 +93,198 @@ class StateManager:
             logger.info("[STATE] no state file (%s) — starting fresh", self.state_file)
             return
         try:
-            with open(self.state_file, "r", encoding="utf-8") as f:
-                raw = json.load(f)
+            st = os.stat(self.state_file)
+            key = (st.st_mtime_ns, st.st_size)
+            raw = self._load_cache(key)
+            if raw is None:
+                with open(self.state_file, "rb") as f:
+                    raw = _loads(f.read())
+                snap = self._snapshot(raw)
+                if snap is not None:
+                    self._store_cache(key, snap)
             if isinstance(raw, dict):
                 # Мягко обновляем текущий словарь, не теряя новых полей по умолчанию
                 self.data.update(raw)
+                # positions/balances всегда словари — методы ниже обращаются к ним напрямую
+                for key in ("positions", "balances"):
+                    if not isinstance(self.data.get(key), dict):
+                        self.data[key] = {}
             logger.info("[STATE] loaded state from %s", self.state_file)
         except Exception as e:
             logger.exception("[STATE] failed to load state %s: %s", self.state_file, e)
 
+    def _load_cache(self, key: tuple) -> Optional[Any]:
+        """Разобранное состояние из pickle-снимка, если он снят с файла той же версии (mtime, size).
+
+        Формат снимка: ключ версии файла, за ним отдельный pickle с данными —
+        при несовпадении ключа сами данные не распаковываем.
+        """
+        if not self._cache_present:
+            return None
+        try:
+            with open(self.cache_file, "rb") as f:
+                if pickle.load(f) != key:
+                    return None
+                return pickle.load(f)
+        except Exception as e:
+            logger.debug("[STATE] state cache %s unusable: %s", self.cache_file, e)
+            return None
+
+    @staticmethod
+    def _snapshot(payload: Any) -> Optional[bytes]:
+        """pickle-снимок состояния для кэша; None — снять не удалось (кэш просто не обновится)."""
+        try:
+            return pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.debug("[STATE] failed to pickle state snapshot: %s", e)
+            return None
+
+    def _store_cache(self, key: tuple, snap: bytes) -> None:
+        """Сохранить pickle-снимок под ключом версии файла состояния; ошибки не критичны."""
+        try:
+            with open(self.cache_file, "wb") as f:
+                pickle.dump(key, f, protocol=pickle.HIGHEST_PROTOCOL)
+                f.write(snap)
+            self._cache_present = True
+        except Exception as e:
+            logger.debug("[STATE] failed to write state cache %s: %s", self.cache_file, e)
+            self._drop_cache()
+
+    def _drop_cache(self) -> None:
+        """Удалить pickle-снимок: файл состояния изменился (вызывать под _write_lock)."""
+        if not self._cache_present:
+            return
+        self._cache_present = False
+        try:
+            os.remove(self.cache_file)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.debug("[STATE] failed to remove state cache %s: %s", self.cache_file, e)
+
     def _atomic_write(self, payload: Dict[str, Any]) -> None:
         """Атомарная запись состояния.
 
         Пишем во временный файл и затем делаем os.replace.
         Это защищает от порчи файла при падении процесса.
         """
+        try:
+            blob = _dumps(payload)
+        except Exception as e:
+            logger.exception("[STATE] failed to save state %s: %s", self.state_file, e)
+            return
+        self._write_bytes(blob, self._snapshot(payload))
+
+    def _write_bytes(self, blob: bytes, snap: Optional[bytes] = None) -> None:
+        """Записать уже сериализованное состояние (можно вызывать из потока).
+
+        После записи pickle-снимок перезаписывается под новой версией файла,
+        чтобы следующий запуск взял состояние из него без разбора JSON.
+        """
         tmp_path = f"{self.state_file}.tmp"
         try:
-            with open(tmp_path, "w", encoding="utf-8") as f:
-                json.dump(payload, f, ensure_ascii=False, indent=2)
-            os.replace(tmp_path, self.state_file)
+            with self._write_lock:
+                # старый снимок убираем до записи: при падении посередине он не должен пережить файл
+                self._drop_cache()
+                with open(tmp_path, "wb") as f:
+                    f.write(blob)
+                os.replace(tmp_path, self.state_file)
+                if snap is not None:
+                    st = os.stat(self.state_file)
+                    self._store_cache((st.st_mtime_ns, st.st_size), snap)
         except Exception as e:
             logger.exception("[STATE] failed to save state %s: %s", self.state_file, e)
 
     def save(self) -> None:
         """Сохраняет текущее состояние на диск."""
+        self._dirty = False
         self._atomic_write(self.data)
         logger.debug("[STATE] saved state to %s", self.state_file)
 
+    @property
+    def dirty(self) -> bool:
+        """Есть ли несохранённые изменения."""
+        return self._dirty
+
+    def _commit(self, persist: bool) -> None:
+        """Пометить состояние «грязным»; persist=True — записать как можно скорее.
+
+        Если работает run_writer, срочное изменение только будит его: все изменения,
+        сделанные до ближайшего await, уходят на диск одной записью. Без фоновой
+        записи (скрипты, тесты) persist=True пишет файл сразу.
+        Частые некритичные обновления (трейлинг, баланс) копятся в памяти до
+        следующего интервала run_writer или flush_if_dirty().
+        """
+        self._dirty = True
+        if not persist:
+            return
+        if self._batch_depth:
+            self._batch_urgent = True
+            return
+        if self._writer_running:
+            self._dirty_event.set()
+        else:
+            self.save()
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Несколько изменений подряд — одна запись при выходе из внешнего batch().
+
+        Внутри блока не должно быть await: пакет общий для всех задач.
+        """
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._batch_urgent:
+                self._batch_urgent = False
+                self._commit(True)
+
+    def flush_if_dirty(self) -> None:
+        """Сохранить состояние, если есть несохранённые изменения (синхронно, для остановки)."""
+        if self._dirty:
+            self.save()
+
+    async def run_writer(self, interval: float) -> None:
+        """Фоновая запись состояния: срочные изменения — сразу, остальные — раз в interval секунд.
+
+        Снимок сериализуется в цикле событий (данные не меняются во время json.dumps и pickle),
+        запись на диск идёт в потоке.
+        """
+        self._writer_running = True
+        # asyncio.wait, а не wait_for: wait_for может проглотить отмену задачи,
+        # если событие выставлено в тот же момент (остановка бота зависла бы)
+        waiter: Optional[asyncio.Future] = None
+        try:
+            while True:
+                if waiter is None:
+                    waiter = asyncio.ensure_future(self._dirty_event.wait())
+                await asyncio.wait((waiter,), timeout=interval)
+                if waiter.done():
+                    waiter = None
+                self._dirty_event.clear()
+                if not self._dirty:
+                    continue
+                self._dirty = False
+                try:
+                    blob = _dumps(self.data)
+                except Exception as e:
+                    logger.exception("[STATE] failed to save state %s: %s", self.state_file, e)
+                    continue
+                # снимок для кэша тоже снимаем здесь, пока данные не меняются
+                await asyncio.to_thread(self._write_bytes, blob, self._snapshot(self.data))
+                logger.debug("[STATE] saved state to %s", self.state_file)
+        finally:
+            self._writer_running = False
+            if waiter is not None:
+                waiter.cancel()
+
     # ===== Позиции =====
 
     def get_positions(self) -> Dict[str, PositionState]:
         """Возвращает словарь symbol -> PositionState."""
-        positions = self.data.get("positions") or {}
+        positions = self.data["positions"]
         out: Dict[str, PositionState] = {}
         for sym, p in positions.items():
             try:
@@ -94,41 +293,46 @@ class StateManager:
                 logger.error("[STATE] bad position for %s: %s", sym, e)
         return out
 
-    def set_position(self, symbol: str, pos: PositionState) -> None:
-        """Сохраняет/обновляет позицию по символу."""
-        self.data.setdefault("positions", {})
+    def set_position(self, symbol: str, pos: PositionState, persist: bool = True) -> None:
+        """Сохраняет/обновляет позицию по символу (persist=False — только в памяти до flush).
+
+        persist=False — частые подтяжки стопов без изменения стороны/размера: они не сдвигают
+        positions_changed_at, иначе heartbeat сбрасывал бы интервал на каждом баре.
+        """
         self.data["positions"][symbol] = pos.to_dict()
-        self.save()
+        if persist:
+            self.positions_changed_at = time.monotonic()
+        self._commit(persist)
 
     def del_position(self, symbol: str) -> None:
         """Удаляет позицию по символу, если она есть."""
-        if symbol in self.data.get("positions", {}):
-            del self.data["positions"][symbol]
-            self.save()
+        positions = self.data["positions"]
+        if symbol in positions:
+            del positions[symbol]
+            self.positions_changed_at = time.monotonic()
+            self._commit(True)
 
     # ===== Балансы и PnL =====
 
-    def update_balance(self, asset: str, free: float, equity: Optional[float] = None, ts: Optional[float] = None) -> None:  # noqa: E501
+    def update_balance(self, asset: str, free: float, equity: Optional[float] = None, ts: Optional[float] = None, persist: bool = True) -> None:  # noqa: E501
         """Обновляет информацию о балансе одного актива (обычно USDT)."""
-        self.data.setdefault("balances", {})
         self.data["balances"][asset] = {
             "free": float(free),
             "equity": float(equity) if equity is not None else None,
             "update_time": float(ts) if ts is not None else None,
         }
-        self.save()
+        self._commit(persist)
 
     def get_balance(self, asset: str = "USDT") -> Optional[Dict[str, float]]:
         """Возвращает словарь с данными по активу или None, если его нет."""
-        balances = self.data.get("balances") or {}
-        return balances.get(asset)
+        return self.data["balances"].get(asset)
 
     def update_equity_peak(self, equity: float) -> None:
         """Обновить пик эквити (используется для расчёта текущей DD)."""
         cur_peak = self.data.get("equity_peak")
         if cur_peak is None or equity > cur_peak:
             self.data["equity_peak"] = float(equity)
-            self.save()
+            self._commit(True)
 
     def add_realized_pnl(self, pnl_delta: float) -> None:
         """Увеличить накопленный реализованный PnL."""
@@ -137,4 +341,4 @@ class StateManager:
         except (TypeError, ValueError):
             cur = 0.0
         self.data["realized_pnl"] = cur + float(pnl_delta)
-        self.save()
+        self._commit(True)
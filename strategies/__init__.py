@@ -11,7 +11,6 @@ from typing import Optional
 import logging
 
 from .base import BaseStrategy
-from .mtf_breakout import MTFBreakoutStrategy
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +21,17 @@ def get_active_strategy() -> BaseStrategy:
     """Вернуть единственную активную стратегию (MTFBreakoutStrategy)."""
     global _ACTIVE_STRATEGY
     if _ACTIVE_STRATEGY is None:
+        from .mtf_breakout import MTFBreakoutStrategy
+
         logger.info("[STRATEGIES] Using single active strategy: MTFBreakoutStrategy (v6.0)")
         _ACTIVE_STRATEGY = MTFBreakoutStrategy()
     return _ACTIVE_STRATEGY
+
+
+def __getattr__(name: str):
+    """Ленивый импорт стратегий (PEP 562): pandas/numpy грузятся только при первом обращении."""
+    if name == "MTFBreakoutStrategy":
+        from .mtf_breakout import MTFBreakoutStrategy
+
+        return MTFBreakoutStrategy
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
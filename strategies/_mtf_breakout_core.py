@@ -0,0 +1,333 @@
+"""Численное ядро MTFBreakoutStrategy.signal (numba, если установлена).
+
+Стратегия достаёт из BarWindow значения последнего бара и массивы OHLCV,
+а всё дерево фильтров считается здесь — скалярным кодом без pandas и без
+обращений к config. Параметры передаются одним массивом params
+(индексы P_*), который собирает MTFBreakoutStrategy.reload_config().
+"""
+
+import math
+
+import numpy as np
+
+from numba_compat import NUMBA_AVAILABLE, njit
+
+# индексы параметров в массиве params
+P_MIN_ATR_PCT = 0
+P_ADX_MIN = 1
+P_HTF_VOLATILE_ATR = 2
+P_HTF_VOLATILE_DRIFT = 3
+P_HTF_VOLATILE_ADX = 4
+P_HTF_DRIFT_LOOKBACK = 5
+P_SUPER_HIGH_ATR_PCT = 6
+P_DISABLE_VOLATILE_FLAT = 7
+P_DRIFT_LOOKBACK = 8
+P_DRIFT_MIN_PCT = 9
+P_DRIFT_STRONG_PCT = 10
+P_DRIFT_ADAPTIVE = 11
+P_LOOSEN_FACTOR = 12
+P_STRONG_TREND_ADX_MARGIN = 13
+P_BASE_LOOKBACK = 14
+P_LOW_VOL_PCT = 15
+P_HIGH_VOL_PCT = 16
+P_LB_MIN = 17
+P_LB_MAX = 18
+P_BUF = 19
+P_VOL_MULT = 20
+P_LTF_ATR_MIN = 21
+P_MICRO_ATR_PCT = 22
+P_SLOPE_LOOKBACK = 23
+P_SLOPE_MIN_ABS = 24
+P_VOLATILE_SLOPE_FACTOR = 25
+P_RSI_LONG_MIN = 26
+P_RSI_LONG_MAX = 27
+P_RSI_SHORT_MIN = 28
+P_RSI_SHORT_MAX = 29
+P_RSI_LONG_TIGHTEN = 30
+P_RSI_SHORT_TIGHTEN = 31
+N_PARAMS = 32
+
+# коды результата mtf_eval
+SIG_NONE = 0
+SIG_BUY = 1
+SIG_SELL = 2
+SKIP_VOLATILE_FLAT = 3  # отсечка «взрывного флэта» (для debug-лога)
+SKIP_LOW_DRIFT = 4  # отсечка по дрейфу (для debug-лога)
+
+
+@njit(cache=True)
+def mtf_eval(
+    closes, highs, lows, vols,
+    volume, rsi_ltf, atr_ltf,
+    ema20_h, ema50_h, ema200_h, atr_h, adx_h, rsi_h, sma_trend_h,
+    p,
+):
+    """Сигнал по последнему бару окна.
+
+    closes/highs/lows/vols — float64-массивы окна (последний элемент — текущий бар),
+    остальные скаляры — значения текущего бара. Возвращает
+    (код, range_high, range_low, vol_ma, drift, drift_min_eff, atr_pct_h);
+    значения после кода нужны только для debug-логов и могут быть NaN.
+    """
+    nan = np.nan
+    n = closes.shape[0]
+    close = closes[n - 1]
+
+    if (
+        math.isnan(close) or math.isnan(ema20_h) or math.isnan(ema50_h) or math.isnan(ema200_h)
+        or math.isnan(atr_h) or math.isnan(adx_h) or math.isnan(rsi_h) or math.isnan(sma_trend_h)
+    ):
+        return SIG_NONE, nan, nan, nan, nan, nan, nan
+
+    # ======================================================
+    # 1) HTF-тренд (строгий вариант C): 1 — bull, -1 — bear
+    # ======================================================
+    regime = 0
+    if ema20_h > ema50_h and ema50_h > ema200_h:
+        regime = 1
+    elif ema20_h < ema50_h and ema50_h < ema200_h:
+        regime = -1
+
+    if regime == 0:
+        return SIG_NONE, nan, nan, nan, nan, nan, nan
+
+    # Фильтр слишком тихого рынка по HTF ATR
+    if close <= 0 or atr_h <= 0:
+        return SIG_NONE, nan, nan, nan, nan, nan, nan
+    atr_pct_h = atr_h / close
+    min_atr_pct = p[P_MIN_ATR_PCT]
+    if atr_pct_h < min_atr_pct:
+        return SIG_NONE, nan, nan, nan, nan, nan, atr_pct_h
+
+    # Фильтр силы тренда по HTF ADX
+    adx_min = p[P_ADX_MIN]
+    if adx_h < adx_min:
+        return SIG_NONE, nan, nan, nan, nan, nan, atr_pct_h
+
+    # HTF volatile-trendless filter; "HTF-like" drift по закрытиям M15
+    htf_volatile_atr = p[P_HTF_VOLATILE_ATR]
+    drift_h = 0.0
+    htf_drift_lookback = int(p[P_HTF_DRIFT_LOOKBACK])
+    if n > htf_drift_lookback + 1:
+        prev_h = closes[n - htf_drift_lookback - 1]
+        if close > 0 and prev_h > 0:
+            drift_h = abs(close - prev_h) / close
+
+    if atr_pct_h > htf_volatile_atr and drift_h < p[P_HTF_VOLATILE_DRIFT] and adx_h < p[P_HTF_VOLATILE_ADX]:
+        return SIG_NONE, nan, nan, nan, nan, nan, atr_pct_h
+
+    # Фильтр "взрывного флэта": при экстремальной волатильности на H1 новые входы блокируем
+    if p[P_DISABLE_VOLATILE_FLAT] != 0.0 and atr_pct_h > p[P_SUPER_HIGH_ATR_PCT]:
+        return SKIP_VOLATILE_FLAT, nan, nan, nan, nan, nan, atr_pct_h
+
+    # Drift-фильтр по суточному движению цены (примерно 96 баров M15).
+    drift_lookback = int(p[P_DRIFT_LOOKBACK])
+    drift_min_pct = p[P_DRIFT_MIN_PCT]
+    drift_strong_pct = p[P_DRIFT_STRONG_PCT]
+
+    drift = 0.0
+    if n > drift_lookback + 1:
+        prev_price = closes[n - drift_lookback - 1]
+        if close > 0 and prev_price > 0:
+            drift = abs(close - prev_price) / close
+
+    # Адаптивный порог дрейфа: в сильном тренде (ADX заметно выше минимума,
+    # ATR не в "супер-тихом" и не в экстремальном режиме) слегка ослабляем фильтр.
+    drift_min_eff = drift_min_pct
+    if p[P_DRIFT_ADAPTIVE] != 0.0:
+        if (
+            adx_h >= adx_min + p[P_STRONG_TREND_ADX_MARGIN]
+            and atr_pct_h >= min_atr_pct * 1.5
+            and atr_pct_h <= htf_volatile_atr
+        ):
+            drift_min_eff = drift_min_pct * p[P_LOOSEN_FACTOR]
+
+    if drift < drift_min_eff:
+        return SKIP_LOW_DRIFT, nan, nan, nan, drift, drift_min_eff, atr_pct_h
+
+    # ======================================================
+    # 2) LTF breakout (M15)
+    # ======================================================
+    # Динамический lookback по HTF-волатильности и силе тренда (дрейфу)
+    base_lookback = int(p[P_BASE_LOOKBACK])
+    lb_min = int(p[P_LB_MIN])
+    lb_max = int(p[P_LB_MAX])
+
+    lookback_ltf = base_lookback
+    if atr_pct_h < p[P_LOW_VOL_PCT]:
+        # рынок очень спокойный -> расширяем диапазон
+        lookback_ltf = min(lb_max, int(base_lookback * 1.3))
+    elif atr_pct_h > p[P_HIGH_VOL_PCT]:
+        # рынок очень волатильный -> чуть сужаем диапазон
+        lookback_ltf = max(lb_min, int(base_lookback * 0.7))
+
+    # слабый тренд -> шире диапазон (реже шумовые пробои), сильный -> уже (вход раньше)
+    if drift > drift_min_pct and drift < drift_strong_pct:
+        lookback_ltf = min(lb_max, int(lookback_ltf * 1.2))
+    elif drift >= drift_strong_pct:
+        lookback_ltf = max(lb_min, int(lookback_ltf * 0.85))
+
+    if n < lookback_ltf + 2:
+        return SIG_NONE, nan, nan, nan, drift, drift_min_eff, atr_pct_h
+
+    # ======================================================
+    # 3) LTF ATR-фильтр + RSI-фильтр (вариант B — сбалансированный)
+    # ======================================================
+    # Эти фильтры от диапазона не зависят — проверяем их до прохода по окну.
+    if close <= 0 or atr_ltf <= 0:
+        return SIG_NONE, nan, nan, nan, drift, drift_min_eff, atr_pct_h
+    atr_pct_ltf = atr_ltf / close
+    if atr_pct_ltf < p[P_LTF_ATR_MIN]:
+        return SIG_NONE, nan, nan, nan, drift, drift_min_eff, atr_pct_h
+
+    # Volatile driftless filter: высокая ATR, но низкий наклон -> волатильная пила без направления.
+    slope_lookback = int(p[P_SLOPE_LOOKBACK])
+    if n > slope_lookback + 1:
+        prev_price_ltf = closes[n - slope_lookback - 1]
+        slope_abs = abs(close - prev_price_ltf) / close
+        if (
+            atr_pct_ltf > p[P_MICRO_ATR_PCT]
+            and slope_abs < p[P_SLOPE_MIN_ABS] * p[P_VOLATILE_SLOPE_FACTOR]
+        ):
+            return SIG_NONE, nan, nan, nan, drift, drift_min_eff, atr_pct_h
+
+    rsi_long_min = p[P_RSI_LONG_MIN]
+    rsi_long_max = p[P_RSI_LONG_MAX]
+    rsi_short_min = p[P_RSI_SHORT_MIN]
+    rsi_short_max = p[P_RSI_SHORT_MAX]
+
+    # Адаптивные RSI-диапазоны: при слабом тренде ужесточаем, при очень сильном — ослабляем
+    if drift > drift_min_pct and drift < drift_strong_pct:
+        rsi_long_min += p[P_RSI_LONG_TIGHTEN]
+        rsi_short_max -= p[P_RSI_SHORT_TIGHTEN]
+    elif drift >= drift_strong_pct:
+        rsi_long_min = max(40.0, rsi_long_min - p[P_RSI_LONG_TIGHTEN] * 0.5)
+        rsi_short_max = min(60.0, rsi_short_max + p[P_RSI_SHORT_TIGHTEN] * 0.5)
+
+    # RSI только той стороны, которую разрешает HTF-режим
+    if regime == 1:
+        if not (rsi_long_min <= rsi_ltf and rsi_ltf <= rsi_long_max):
+            return SIG_NONE, nan, nan, nan, drift, drift_min_eff, atr_pct_h
+    elif not (rsi_short_min <= rsi_ltf and rsi_ltf <= rsi_short_max):
+        return SIG_NONE, nan, nan, nan, drift, drift_min_eff, atr_pct_h
+
+    # ======================================================
+    # 4) Пробой диапазона предыдущих lookback_ltf баров (без текущего) + объём
+    # ======================================================
+    # Буфер по цене: BREAKOUT_BUFFER_PCT трактуем как долю (0.001 = 0.1%)
+    buf = p[P_BUF]
+    long_mult = 1.0 + buf
+    short_mult = 1.0 - buf
+
+    # Диапазон и средний объём — одним проходом; NaN пропускаются, как в pandas.
+    # Как только один бар окна перекрывает триггер своей стороны, пробоя уже не будет:
+    # max(high) * (1 + buf) >= close (min(low) — симметрично), остальное не считаем.
+    start = n - lookback_ltf - 1
+    range_high = -np.inf
+    range_low = np.inf
+    vol_sum = 0.0
+    vol_cnt = 0
+    for i in range(start, n - 1):
+        h = highs[i]
+        lo = lows[i]
+        if regime == 1 and long_mult > 0 and h * long_mult >= close:
+            return SIG_NONE, nan, nan, nan, drift, drift_min_eff, atr_pct_h
+        if regime == -1 and short_mult > 0 and lo * short_mult <= close:
+            return SIG_NONE, nan, nan, nan, drift, drift_min_eff, atr_pct_h
+        if h > range_high:
+            range_high = h
+        if lo < range_low:
+            range_low = lo
+        v = vols[i]
+        if not math.isnan(v):
+            vol_sum += v
+            vol_cnt += 1
+    if range_high == -np.inf:
+        range_high = nan
+    if range_low == np.inf:
+        range_low = nan
+    vol_ma = vol_sum / vol_cnt if vol_cnt else nan
+
+    # Объёмный фильтр на LTF
+    if vol_ma > 0 and volume < vol_ma * p[P_VOL_MULT]:
+        return SIG_NONE, range_high, range_low, vol_ma, drift, drift_min_eff, atr_pct_h
+
+    # LONG: H1 bull-тренд + пробой вверх на M15
+    if regime == 1 and close > range_high * long_mult:
+        return SIG_BUY, range_high, range_low, vol_ma, drift, drift_min_eff, atr_pct_h
+
+    # SHORT: H1 bear-тренд + пробой вниз на M15
+    if regime == -1 and close < range_low * short_mult:
+        return SIG_SELL, range_high, range_low, vol_ma, drift, drift_min_eff, atr_pct_h
+
+    return SIG_NONE, range_high, range_low, vol_ma, drift, drift_min_eff, atr_pct_h
+
+
+@njit(cache=True)
+def mtf_drift_prefilter(closes, p):
+    """Может ли mtf_eval дать сигнал по этому окну, судя только по закрытиям M15.
+
+    Drift-фильтр mtf_eval отсекает бар при drift < drift_min_eff, а drift_min_eff
+    не меньше drift_min_pct (с адаптацией — drift_min_pct * loosen_factor).
+    False — сигнала точно не будет, HTF-индикаторы и окно можно не строить.
+    """
+    n = closes.shape[0]
+    drift_min_pct = p[P_DRIFT_MIN_PCT]
+    lowest = drift_min_pct
+    if p[P_DRIFT_ADAPTIVE] != 0.0:
+        lowest = min(drift_min_pct, drift_min_pct * p[P_LOOSEN_FACTOR])
+
+    drift = 0.0
+    drift_lookback = int(p[P_DRIFT_LOOKBACK])
+    if n > drift_lookback + 1:
+        close = closes[n - 1]
+        prev_price = closes[n - drift_lookback - 1]
+        if close > 0 and prev_price > 0:
+            drift = abs(close - prev_price) / close
+    return not drift < lowest
+
+
+@njit(cache=True)
+def mtf_eval_series(
+    closes, highs, lows, vols,
+    rsi_ltf, atr_ltf,
+    ema20_h, ema50_h, ema200_h, atr_h, adx_h, rsi_h, sma_trend_h,
+    p, first, window, out,
+):
+    """mtf_eval для каждого бара i >= first одним вызовом (бэктест: вся история символа).
+
+    Все аргументы-массивы — колонки одной длины; окно бара i — последние window баров
+    до i включительно (window <= 0 — вся история). В out[i] пишется +1 buy, -1 sell, 0.
+    """
+    n = closes.shape[0]
+    for i in range(first, n):
+        start = max(0, i + 1 - window) if window > 0 else 0
+        out[i] = 0
+        # signal() не торгует на окне короче 100 баров
+        if i + 1 - start < 100:
+            continue
+        code = mtf_eval(
+            closes[start:i + 1], highs[start:i + 1], lows[start:i + 1], vols[start:i + 1],
+            vols[i], rsi_ltf[i], atr_ltf[i],
+            ema20_h[i], ema50_h[i], ema200_h[i], atr_h[i], adx_h[i], rsi_h[i], sma_trend_h[i],
+            p,
+        )[0]
+        if code == SIG_BUY:
+            out[i] = 1
+        elif code == SIG_SELL:
+            out[i] = -1
+
+
+def _warmup() -> None:
+    """Скомпилировать mtf_eval при импорте (с cache=True — загрузить из кэша), а не на первом баре."""
+    params = np.zeros(N_PARAMS)
+    dense = np.ones(128, dtype=np.float64)
+    # колонки буфера LIVE-раннера — представления структурированного массива (с шагом)
+    strided = np.ones(128, dtype=[("open_time", "i8"), ("close", "f8")])["close"]
+    for x in (dense, strided):
+        mtf_eval(x, x, x, x, 1.0, 50.0, 0.01, 1.0, 1.0, 1.0, 0.01, 20.0, 50.0, 1.0, params)
+        mtf_drift_prefilter(x, params)
+
+
+if NUMBA_AVAILABLE:
+    _warmup()
@@ -1,6 +1,71 @@
 import abc
-from typing import Optional
-import pandas as pd
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:  # numpy/pandas нужны только для аннотаций — не импортируем их вместе с пакетом
+    import numpy as np
+    import pandas as pd
+
+
+# поля BarWindow с рыночными данными бара (остальные колонки — в BarWindow.columns)
+_BAR_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+@dataclass(slots=True)
+class BarWindow:
+    """Окно баров для стратегии: колонки — массивы NumPy одной длины (struct of arrays).
+
+    timestamp — open_time баров; columns — индикаторы (RSI, ATR, HTF_* и т.д.).
+    Последний элемент каждого массива — текущий бар. Массивы могут быть
+    представлениями чужих буферов: стратегия их только читает.
+    """
+
+    timestamp: "np.ndarray"
+    open: "np.ndarray"
+    high: "np.ndarray"
+    low: "np.ndarray"
+    close: "np.ndarray"
+    volume: "np.ndarray"
+    columns: Dict[str, "np.ndarray"] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    def __contains__(self, name: str) -> bool:
+        return name in _BAR_FIELDS or name in self.columns
+
+    def get(self, name: str) -> Optional["np.ndarray"]:
+        """Колонка по имени (OHLCV или индикатор); None, если её нет."""
+        if name in _BAR_FIELDS:
+            return getattr(self, name)
+        return self.columns.get(name)
+
+    def slice(self, start: int, stop: int) -> "BarWindow":
+        """Бары [start, stop) — срезы-представления, без копирования данных."""
+        return BarWindow(
+            self.timestamp[start:stop],
+            self.open[start:stop],
+            self.high[start:stop],
+            self.low[start:stop],
+            self.close[start:stop],
+            self.volume[start:stop],
+            {name: col[start:stop] for name, col in self.columns.items()},
+        )
+
+    @classmethod
+    def from_frame(cls, df: "pd.DataFrame") -> "BarWindow":
+        """Окно из DataFrame с колонками open/high/low/close/volume (+ индикаторы).
+
+        timestamp — колонка open_time, если она есть, иначе индекс.
+        """
+        skip = set(_BAR_FIELDS)
+        skip.add("open_time")
+        ts = df["open_time"].to_numpy() if "open_time" in df.columns else df.index.to_numpy()
+        return cls(
+            ts,
+            *(df[name].to_numpy() for name in _BAR_FIELDS),
+            {name: df[name].to_numpy() for name in df.columns if name not in skip},
+        )
 
 
 class BaseStrategy(abc.ABC):
@@ -15,7 +80,52 @@ class BaseStrategy(abc.ABC):
 
     name: str = "base"
 
+    def reload_config(self) -> None:
+        """Перечитать параметры из config (если стратегия их кэширует)."""
+
+    def lookback(self) -> Optional[int]:
+        """Сколько последних баров нужно ``signal`` (None — вся история).
+
+        Вызывающий код может передавать в ``signal`` только хвост такой длины:
+        результат не меняется, а срез не растёт вместе с историей.
+        """
+        return None
+
     @abc.abstractmethod
-    def signal(self, df: pd.DataFrame) -> Optional[str]:
-        """Вернуть торговый сигнал по последним данным df."""
+    def signal(self, bars: BarWindow) -> Optional[str]:
+        """Вернуть торговый сигнал по последнему бару окна bars."""
         raise NotImplementedError
+
+    def prefilter(self, closes: "np.ndarray") -> bool:
+        """Дешёвая проверка по закрытиям окна до расчёта HTF-индикаторов и сборки BarWindow.
+
+        closes — close тех же баров, что попадут в signal(). False означает, что
+        signal() на этом окне точно вернёт None; True — «может быть сигнал».
+        """
+        return True
+
+    def signal_series(self, bars: BarWindow, first: int = 0) -> "np.ndarray":
+        """Сигналы по каждому бару i >= first окна bars: int8, +1 buy, -1 sell, 0 — нет.
+
+        Сигнал бара i — signal() по хвосту длины lookback() до i включительно.
+        Базовая версия так и вызывает signal() бар за баром; стратегии с
+        численным ядром считают всю серию одним вызовом.
+        """
+        import numpy as np
+
+        k = self.lookback()
+        out = np.zeros(len(bars), dtype=np.int8)
+        for i in range(first, len(bars)):
+            start = max(0, i + 1 - k) if k else 0
+            sig = self.signal(bars.slice(start, i + 1))
+            if sig == "buy":
+                out[i] = 1
+            elif sig == "sell":
+                out[i] = -1
+        return out
+
+    def signal_df(self, df: "pd.DataFrame") -> Optional[str]:
+        """Совместимость со старым контрактом: сигнал по DataFrame с индикаторами."""
+        if df is None:
+            return None
+        return self.signal(BarWindow.from_frame(df))
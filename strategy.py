@@ -7,9 +7,11 @@
 
 from typing import Optional
 
+import numpy as np
 import pandas as pd
 
 from strategies import get_active_strategy
+from strategies.base import BarWindow
 
 
 def signal_from_indicators(df: pd.DataFrame) -> Optional[str]:
@@ -19,5 +21,29 @@ def signal_from_indicators(df: pd.DataFrame) -> Optional[str]:
     - вход: DataFrame c колонками индикаторов
     - выход: "buy" / "sell" / None
     """
-    strategy = get_active_strategy()
-    return strategy.signal(df)
+    return get_active_strategy().signal_df(df)
+
+
+def signal_from_bars(bars: BarWindow) -> Optional[str]:
+    """То же по окну массивов BarWindow — без построения DataFrame."""
+    return get_active_strategy().signal(bars)
+
+
+def signal_prefilter(closes: np.ndarray) -> bool:
+    """False — активная стратегия по этим закрытиям сигнала точно не даст."""
+    return get_active_strategy().prefilter(closes)
+
+
+def signal_series_from_bars(bars: BarWindow, first: int = 0) -> np.ndarray:
+    """Сигналы (+1/-1/0, int8) по каждому бару i >= first — для бэктеста."""
+    return get_active_strategy().signal_series(bars, first)
+
+
+def reload_strategy_config() -> None:
+    """Перечитать параметры активной стратегии из config."""
+    get_active_strategy().reload_config()
+
+
+def signal_lookback() -> Optional[int]:
+    """Сколько последних баров нужно активной стратегии (None — вся история)."""
+    return get_active_strategy().lookback()
@@ -6,70 +6,152 @@
 - TELEGRAM_CHAT_ID
 
 Если TELEGRAM_ENABLED = False или не заданы токен/чат, методы молча пишут в лог.
+
+Отправка идёт в фоновом потоке через одно keep-alive HTTPS-соединение:
+методы notify_* только кладут текст в очередь и сразу возвращаются.
 """
 
+import http.client
 import logging
 import json
-import urllib.parse
-import urllib.request
+import queue
+import threading
 from typing import Optional
 
 import config
 
+try:  # orjson: C-сериализация, сразу bytes без отдельного encode
+    import orjson
+
+    _dumps = orjson.dumps
+except ImportError:  # pragma: no cover - orjson опционален
+    def _dumps(payload: dict) -> bytes:
+        return json.dumps(payload).encode("utf-8")
+
 logger = logging.getLogger(__name__)
 
 
+_API_HOST = "api.telegram.org"
+# обрыв keep-alive соединения сервером: переподключаемся и повторяем запрос один раз
+_RECONNECT_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionResetError, BrokenPipeError)
+
+
 class TelegramNotifier:
-    """Синхронный Telegram-notifier.
+    """Telegram-notifier с фоновой отправкой.
 
-    Использует обычный HTTP-запрос к Telegram Bot API.
-    В продакшене этого более чем достаточно, т.к. объём уведомлений небольшой.
+    Сообщения уходят в Telegram Bot API из daemon-потока по одному
+    keep-alive HTTPS-соединению (TLS-рукопожатие — один раз, а не на каждое
+    сообщение). Очередь ограничена TELEGRAM_QUEUE_SIZE: при переполнении
+    выбрасывается самое старое сообщение. close() дожидается отправки очереди.
     """
 
     def __init__(self) -> None:
         self.enabled: bool = bool(getattr(config, "TELEGRAM_ENABLED", False))
         self.token: Optional[str] = getattr(config, "TELEGRAM_BOT_TOKEN", None)
         self.chat_id: Optional[str] = getattr(config, "TELEGRAM_CHAT_ID", None)
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._conn: Optional[http.client.HTTPSConnection] = None
 
         if not self.enabled:
             logger.info("[TG] telegram notifications disabled via TELEGRAM_ENABLED")
         elif not self.token or not self.chat_id:
             logger.warning("[TG] TELEGRAM_ENABLED=True, но не задан токен или chat_id")
+        else:
+            self._queue = queue.Queue(maxsize=int(getattr(config, "TELEGRAM_QUEUE_SIZE", 100) or 100))
+            self._thread = threading.Thread(target=self._worker, name="telegram-notifier", daemon=True)
+            self._thread.start()
 
     # ====== низкоуровневый отправитель ======
 
     def _send_raw(self, text: str) -> None:
-        """Отправить сырое Markdown-сообщение в Telegram.
+        """Поставить сырое Markdown-сообщение в очередь на отправку в Telegram.
 
-        Безопасен: при любой ошибке просто пишет в лог и не падает.
+        Не блокирует и не падает: ошибки отправки пишутся в лог из фонового потока.
         """
         if not self.enabled:
             logger.debug("[TG] disabled, skip message: %s", text)
             return
-        if not self.token or not self.chat_id:
+        if self._queue is None:
             logger.debug("[TG] token/chat_id not set, skip message: %s", text)
             return
 
-        url = f"https://api.telegram.org/bot{self.token}/sendMessage"
+        while True:
+            try:
+                self._queue.put_nowait(text)
+                return
+            except queue.Full:
+                try:
+                    dropped = self._queue.get_nowait()
+                except queue.Empty:
+                    continue
+                self._queue.task_done()
+                logger.warning("[TG] queue full, dropped oldest message: %s", dropped)
+
+    def _worker(self) -> None:
+        """Фоновый поток: отправляет сообщения из очереди до получения None."""
+        assert self._queue is not None
+        while True:
+            text = self._queue.get()
+            try:
+                if text is None:
+                    return
+                self._post(text)
+            except Exception as e:  # pragma: no cover
+                logger.exception("[TG] failed to send telegram message: %s", e)
+            finally:
+                self._queue.task_done()
+
+    def _post(self, text: str) -> None:
+        """sendMessage по keep-alive соединению (вызывается только из _worker)."""
         payload = {
             "chat_id": self.chat_id,
             "text": text,
             "parse_mode": "Markdown",
             "disable_web_page_preview": True,
         }
-        data = json.dumps(payload).encode("utf-8")
-        req = urllib.request.Request(
-            url,
-            data=data,
-            headers={"Content-Type": "application/json"},
-        )
+        body = _dumps(payload)
+        path = f"/bot{self.token}/sendMessage"
+        headers = {"Content-Type": "application/json"}
+
+        for attempt in range(2):
+            if self._conn is None:
+                self._conn = http.client.HTTPSConnection(_API_HOST, timeout=10)
+            try:
+                self._conn.request("POST", path, body, headers)
+                resp = self._conn.getresponse()
+                # ответ нужно дочитать, иначе соединение нельзя использовать повторно
+                resp.read()
+            except _RECONNECT_ERRORS:
+                self._conn.close()
+                self._conn = None
+                if attempt:
+                    raise
+                continue
+            except Exception:
+                self._conn.close()
+                self._conn = None
+                raise
+            if resp.status != 200:
+                logger.warning("[TG] non-200 response: %s", resp.status)
+            return
 
+    def close(self, timeout: float = 10.0) -> None:
+        """Дождаться отправки очереди (не дольше timeout секунд) и остановить поток."""
+        if self._thread is None or self._queue is None:
+            return
         try:
-            with urllib.request.urlopen(req, timeout=10) as resp:  # noqa: S310
-                if resp.status != 200:
-                    logger.warning("[TG] non-200 response: %s", resp.status)
-        except Exception as e:  # pragma: no cover
-            logger.exception("[TG] failed to send telegram message: %s", e)
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning("[TG] queue still full at shutdown, unsent messages dropped")
+            return
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning("[TG] notifier thread did not finish in %.1fs", timeout)
+        elif self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        self._thread = None
 
     # ====== базовые уведомления, которые уже использовались ранее ======
 
@@ -1,6 +1,9 @@
 import math
+import numpy as np
 import pandas as pd
 
+import config
+
 async def fetch_klines_async(client, symbol: str, interval: str, limit: int = 200) -> pd.DataFrame:
     """Асинхронная обёртка над client.get_klines.
 
@@ -11,16 +14,30 @@ async def fetch_klines_async(client, symbol: str, interval: str, limit: int = 20
     if not raw:
         return pd.DataFrame(columns=["open_time","open","high","low","close","volume"])
 
-    df = pd.DataFrame(raw, columns=[
-        "open_time","open","high","low","close","volume",
-        "close_time","qav","num_trades","taker_base","taker_quote","ignore",
-    ])
-    df["open_time"] = pd.to_datetime(df["open_time"], unit="ms")
-    for col in ["open","high","low","close","volume"]:
-        df[col] = df[col].astype(float)
-    return df[["open_time","open","high","low","close","volume"]]
+    # сразу типизированные колонки: без 12-колоночного object-DataFrame и astype по колонкам
+    arr = np.asarray(raw, dtype=object)
+    fdtype = np.float32 if getattr(config, "KLINES_FP32", False) else np.float64
+    return pd.DataFrame({
+        "open_time": pd.to_datetime(arr[:, 0].astype(np.int64), unit="ms"),
+        "open": arr[:, 1].astype(fdtype),
+        "high": arr[:, 2].astype(fdtype),
+        "low": arr[:, 3].astype(fdtype),
+        "close": arr[:, 4].astype(fdtype),
+        "volume": arr[:, 5].astype(fdtype),
+    })
+
 
-def round_down(value: float, step: float) -> float:
+def round_down(value, step: float):
+    """Округлить вниз до шага step (step <= 0 — без округления).
+
+    Скаляр — быстрый путь через math.floor, возвращает float; массив (или список) —
+    поэлементно одним вызовом numpy, возвращает ndarray float64.
+    """
+    if np.isscalar(value):
+        if step <= 0:
+            return float(value)
+        return math.floor(value / step) * step
+    arr = np.asarray(value, dtype=np.float64)
     if step <= 0:
-        return float(value)
-    return math.floor(value / step) * step
+        return arr.copy()
+    return np.floor(arr / step) * step